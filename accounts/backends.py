@@ -0,0 +1,32 @@
+"""Authentication backend that loads the signed-in user from the shared cache.
+
+AuthenticationMiddleware calls ``get_user`` on every request that has a
+session, and ModelBackend answers it with a SELECT on accounts_user. Most
+pages then run a second query for ``user.profile``. CachedModelBackend
+keeps the user row, with its profile, in the cache for USER_CACHE_TTL
+seconds. Saving or deleting a User or its UserProfile drops the entry (see
+accounts.models.invalidate_cached_user), so a password change or
+deactivation takes effect on the next request. Writes through
+``QuerySet.update()`` skip those signals and show up once the entry
+expires.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import User, user_cache_key
+
+DEFAULT_TTL = 300  # seconds
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = User._default_manager.select_related('profile').get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(key, user, getattr(settings, 'USER_CACHE_TTL', DEFAULT_TTL))
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import KYCVerification
+from accounts.provisioning import NO_LONGER_PENDING, provision_kyc_accounts
+from accounts.tasks import BULK_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Approve pending KYC verifications, reserving their Monnify accounts on a thread pool, '
+        'and report each user as it finishes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='KYC verification ids')
+        parser.add_argument('--all-pending', action='store_true', help='Approve every pending KYC')
+        parser.add_argument('--workers', type=int, help='Concurrent Monnify calls (default KYC_PROVISIONING_WORKERS)')
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE, help='KYCs written per transaction')
+        parser.add_argument('--reviewer', help='Username recorded as the reviewer')
+
+    def handle(self, *args, **options):
+        if not (options['ids'] or options['all_pending']):
+            raise CommandError('Pass KYC ids or --all-pending')
+        reviewer = None
+        if options['reviewer']:
+            reviewer = get_user_model().objects.filter(username=options['reviewer']).first()
+            if reviewer is None:
+                raise CommandError(f"No user named {options['reviewer']}")
+
+        kycs = KYCVerification.objects.select_related('user').filter(status='pending').order_by('pk')
+        if options['ids']:
+            kycs = kycs.filter(pk__in=options['ids'])
+        kycs = list(kycs)
+        total = len(kycs)
+        approved = failed = 0
+
+        def report(result, done, batch_total):
+            status = self.style.SUCCESS('ok') if result.ok else self.style.ERROR(f'failed: {result.error}')
+            self.stdout.write(f'  [{approved + failed + done}/{total}] {result.kyc.user.username}: {status}')
+
+        for start in range(0, total, options['batch_size']):
+            results = provision_kyc_accounts(kycs[start:start + options['batch_size']], reviewer,
+                                             options['workers'], on_result=report)
+            # A KYC changed while Monnify was being called only shows up as failed once the batch is written
+            for result in results:
+                if result.error == NO_LONGER_PENDING:
+                    self.stdout.write(f'  {result.kyc.user.username}: {self.style.WARNING(result.error)}')
+            batch_ok = sum(result.ok for result in results)
+            approved += batch_ok
+            failed += len(results) - batch_ok
+
+        self.stdout.write(self.style.SUCCESS(f'Approved {approved} of {total} KYC verification(s), {failed} failed'))
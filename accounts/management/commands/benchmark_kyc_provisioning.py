@@ -0,0 +1,110 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from accounts.models import KYCVerification, VirtualAccount
+from accounts.provisioning import provision_kyc_accounts
+from payments.fake_monnify import FakeMonnifyServer
+from payments.monnify_client import reset_monnify_clients
+from payments.monnify_service import MonnifyService
+from site_core.models import MonnifyBank
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark bulk KYC approval against a local fake Monnify server: the previous one-at-a-time '
+        'approval loop against the thread-pooled, bulk-inserting pipeline (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kycs', type=int, default=300)
+        parser.add_argument('--latency', type=float, default=0.05, help='Seconds the fake server takes per request')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16])
+        parser.add_argument('--sequential-kycs', type=int, default=100,
+                            help='KYCs for the one-at-a-time comparison (0 to skip)')
+
+    def handle(self, *args, **options):
+        with FakeMonnifyServer(latency=options['latency']) as server:
+            with override_settings(MONNIFY_BASE_URL=server.url, MONNIFY_API_KEY=server.api_key,
+                                   MONNIFY_SECRET_KEY=server.secret_key, MONNIFY_CONTRACT_CODE='0000000000'):
+                try:
+                    self.run_all(server, options)
+                finally:
+                    reset_monnify_clients()
+
+    def run_all(self, server, options):
+        with transaction.atomic():
+            MonnifyBank.objects.get_or_create(bank_code='035', defaults={'bank_name': 'Wema Bank'})
+            if options['sequential_kycs']:
+                kycs = self.seed(options['sequential_kycs'])
+                self.measure('one at a time', server, kycs, lambda: self.sequential(kycs))
+            for workers in options['workers']:
+                kycs = self.seed(options['kycs'])
+                self.measure(f'pool of {workers}', server, kycs,
+                             lambda: provision_kyc_accounts(kycs, max_workers=workers))
+                pending = KYCVerification.objects.filter(pk__in=[kyc.pk for kyc in kycs], status='pending').count()
+                if pending:
+                    raise CommandError(f'{pending} KYC(s) were not approved')
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        stamp = time.time_ns()
+        users = User.objects.bulk_create([
+            User(username=f'kyc-bench-{stamp}-{n}', email=f'kyc{n}@example.com',
+                 referral_code=f'K{stamp % 10**9}{n}', password='!')
+            for n in range(count)
+        ])
+        return list(KYCVerification.objects.bulk_create([
+            KYCVerification(user=user, id_type='nin', id_number=str(n), legal_first_name='Bench',
+                            legal_last_name=f'User{n}', date_of_birth='1990-01-01', address='1 Road',
+                            city='Lagos', state='Lagos', id_document_front='kyc_documents/bench.jpg')
+            for n, user in enumerate(users)
+        ]))
+
+    def sequential(self, kycs):
+        """What kyc_detail did per approval: one Monnify call, then one INSERT per account"""
+        for kyc in kycs:
+            monnify_service = MonnifyService()
+            kyc_data = {'legal_first_name': kyc.legal_first_name, 'legal_last_name': kyc.legal_last_name}
+            preferred_banks = list(kyc.user.bank_preferences.filter(is_active=True).values_list('bank__bank_code', flat=True))
+            if not preferred_banks:
+                preferred_banks = list(MonnifyBank.objects.filter(is_active=True).values_list('bank_code', flat=True))
+            account_data, error = monnify_service.create_reserved_account(kyc.user, kyc_data, preferred_banks)
+            if not account_data:
+                raise CommandError(error)
+            VirtualAccount.objects.filter(user=kyc.user).delete()
+            for account in account_data['accounts']:
+                VirtualAccount.objects.create(
+                    user=kyc.user, account_number=account['accountNumber'], account_name=account['accountName'],
+                    bank_name=account['bankName'], bank_code=account['bankCode'],
+                    reference=account_data['accountReference'],
+                )
+            kyc.status = 'approved'
+            kyc.reviewed_at = timezone.now()
+            kyc.save()
+
+    def measure(self, name, server, kycs, func):
+        queries = 0
+
+        def count(execute, *args):
+            nonlocal queries
+            queries += 1
+            return execute(*args)
+
+        before = dict(server.stats)
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        logins = server.stats['logins'] - before.get('logins', 0)
+        connections = server.stats['connections'] - before.get('connections', 0)
+        self.stdout.write(
+            f'{name:<14} {len(kycs):>5} KYCs {elapsed:8.2f}s {len(kycs) / elapsed:8.1f} KYC/s '
+            f'{queries:>7} queries  {logins} login(s)  {connections} new connection(s)'
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_kycverification_virtualaccount_userbankpreference'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['date_joined'], name='accounts_us_date_jo_ff39bb_idx'),
+        ),
+    ]
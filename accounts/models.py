@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
 from django.utils.crypto import get_random_string
@@ -34,6 +35,11 @@ class User(AbstractUser):
         blank=True
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined']),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.referral_code:
             self.referral_code = self._generate_referral_code()
@@ -152,11 +158,36 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    if hasattr(instance, 'profile'):
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
+    # Partial saves such as login's last_login update never touch the profile
+    if update_fields is None and hasattr(instance, 'profile'):
         instance.profile.save()
 
 
+def user_cache_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop the copy accounts.backends.CachedModelBackend keeps of a signed-in user"""
+    cache.delete(user_cache_key(user_id))
+    if transaction.get_connection().in_atomic_block:
+        # A request may re-cache the old row before we commit; drop it again afterwards
+        transaction.on_commit(lambda: cache.delete(user_cache_key(user_id)))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_cache_for_profile(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
 
 
 
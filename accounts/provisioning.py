@@ -0,0 +1,166 @@
+"""Monnify reserved-account provisioning for approved KYC submissions, one or hundreds at a time.
+
+Approving used to call Monnify and then insert the user's accounts one row at
+a time, per KYC. The Monnify calls now run on a bounded thread pool sharing
+one MonnifyService, and therefore one access token and one keep-alive
+connection pool. The threads never touch the database. Everything is written
+afterwards on the calling thread in one transaction: a DELETE of the users'
+old accounts, one bulk INSERT of the new ones, a bulk UPDATE of the KYC rows
+and a bulk INSERT of the users' notifications.
+"""
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from payments.monnify_service import MonnifyService
+from site_core.models import MonnifyBank
+from transactions.models import Notification
+
+from .models import KYCVerification, UserBankPreference, VirtualAccount
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+NO_LONGER_PENDING = 'KYC is no longer pending; the reserved accounts were not saved'
+
+
+class ProvisionResult:
+    """Outcome of provisioning one KYC; ``error`` is set when it failed"""
+
+    def __init__(self, kyc, account_data=None, error=None):
+        self.kyc = kyc
+        self.account_data = account_data
+        self.error = error
+
+    def __repr__(self):
+        return f'<ProvisionResult {self.kyc.user.username}: {self.error or "ok"}>'
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def accounts(self):
+        return self.account_data['accounts'] if self.account_data else []
+
+
+def _preferred_banks(kycs):
+    """user id -> bank codes to reserve with: the user's active preferences, else every active bank"""
+    preferences = defaultdict(list)
+    rows = UserBankPreference.objects.filter(
+        user_id__in=[kyc.user_id for kyc in kycs], is_active=True
+    ).values_list('user_id', 'bank__bank_code')
+    for user_id, bank_code in rows:
+        preferences[user_id].append(bank_code)
+    active_banks = None
+    for kyc in kycs:
+        if not preferences[kyc.user_id]:
+            if active_banks is None:
+                active_banks = [bank.bank_code for bank in MonnifyBank.get_active()]
+            preferences[kyc.user_id] = active_banks
+    return preferences
+
+
+def _reserve(service, kyc, preferred_banks):
+    kyc_data = {
+        'legal_first_name': kyc.legal_first_name,
+        'legal_last_name': kyc.legal_last_name,
+    }
+    try:
+        account_data, error = service.create_reserved_account(kyc.user, kyc_data, preferred_banks)
+    except Exception as e:
+        logger.exception("Reserving accounts for %s failed", kyc.user.username)
+        return ProvisionResult(kyc, error=str(e))
+    if not (account_data and account_data.get('accounts')):
+        return ProvisionResult(kyc, error=error or 'Monnify returned no accounts')
+    return ProvisionResult(kyc, account_data)
+
+
+def provision_kyc_accounts(kycs, reviewer=None, max_workers=None, on_result=None):
+    """Reserve accounts for the pending KYCs in ``kycs`` and approve those that got them.
+
+    ``on_result(result, done, total)`` is called on the calling thread as each
+    Monnify call finishes. Returns a ProvisionResult per pending KYC.
+    """
+    kycs = [kyc for kyc in kycs if kyc.status == 'pending']
+    if not kycs:
+        return []
+    if max_workers is None:
+        max_workers = getattr(settings, 'KYC_PROVISIONING_WORKERS', DEFAULT_WORKERS)
+
+    service = MonnifyService()
+    banks = _preferred_banks(kycs)
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(kycs)))) as pool:
+        futures = [pool.submit(_reserve, service, kyc, banks[kyc.user_id]) for kyc in kycs]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if on_result:
+                on_result(results[-1], len(results), len(kycs))
+
+    _save([result for result in results if result.ok], reviewer)
+    return results
+
+
+def _save(results, reviewer):
+    if not results:
+        return
+    with transaction.atomic():
+        # Rejected or approved by someone else while Monnify was being called
+        pending = set(
+            KYCVerification.objects.select_for_update()
+            .filter(pk__in=[result.kyc.pk for result in results], status='pending')
+            .values_list('pk', flat=True)
+        )
+        for result in results:
+            if result.kyc.pk not in pending:
+                result.error = NO_LONGER_PENDING
+        results = [result for result in results if result.ok]
+        if not results:
+            return
+
+        # Delete old accounts if any, to prevent duplicates on re-approval
+        VirtualAccount.objects.filter(user_id__in=[result.kyc.user_id for result in results]).delete()
+        VirtualAccount.objects.bulk_create([
+            VirtualAccount(
+                user_id=result.kyc.user_id,
+                account_number=account['accountNumber'],
+                account_name=account['accountName'],
+                bank_name=account['bankName'],
+                bank_code=account['bankCode'],
+                reference=result.account_data['accountReference'],
+                is_primary=index == 0,
+            )
+            for result in results
+            for index, account in enumerate(result.accounts)
+        ], batch_size=500)
+
+        now = timezone.now()
+        for result in results:
+            kyc = result.kyc
+            kyc.status = 'approved'
+            kyc.rejection_reason = ''
+            kyc.monnify_customer_reference = result.account_data.get('customerReference', '')
+            kyc.reviewed_at = now
+            kyc.reviewed_by = reviewer
+        KYCVerification.objects.bulk_update(
+            [result.kyc for result in results],
+            ['status', 'rejection_reason', 'monnify_customer_reference', 'reviewed_at', 'reviewed_by'],
+            batch_size=500,
+        )
+
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=result.kyc.user_id,
+                notification_type='approval',
+                title='KYC approved',
+                message='Your identity verification was approved and your virtual accounts are ready.',
+                related_object_id=result.kyc.pk,
+                related_content_type='kycverification',
+            )
+            for result in results
+        ], batch_size=500)
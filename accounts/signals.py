@@ -1,7 +1,6 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
+from site_core.tasks import send_email
 from .models import User, UserProfile
 
 @receiver(post_save, sender=User)
@@ -12,12 +11,10 @@ def handle_referral_on_user_creation(sender, instance, created, **kwargs):
             instance.profile.referred_by = referrer
             instance.profile.save()
             
-            send_mail(
-                'New Referral Signup',
-                f'User {instance.username} has signed up using your referral code.',
-                settings.DEFAULT_FROM_EMAIL,
-                [referrer.email],
-                fail_silently=True,
+            send_email.enqueue(
+                subject='New Referral Signup',
+                message=f'User {instance.username} has signed up using your referral code.',
+                recipient_list=[referrer.email],
             )
         except User.DoesNotExist:
             pass
\ No newline at end of file
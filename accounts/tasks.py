@@ -0,0 +1,66 @@
+import logging
+
+from django.core.mail import mail_admins
+
+from site_core.task_queue import TaskError, task
+
+from .models import KYCVerification, User
+from .provisioning import provision_kyc_accounts
+
+logger = logging.getLogger(__name__)
+
+# KYCs per bulk provisioning task; each task fans out over the provisioning thread pool
+BULK_BATCH_SIZE = 100
+
+
+@task('accounts.notify_kyc_submission', queue='mail')
+def notify_kyc_submission(kyc_id):
+    """Tell the site admins that a KYC submission is waiting for review"""
+    kyc = KYCVerification.objects.select_related('user').filter(pk=kyc_id).first()
+    if kyc is None:
+        return
+    logger.info("New KYC submission from %s (ID: %s)", kyc.user.username, kyc.id)
+    mail_admins(
+        'New KYC submission',
+        f'{kyc.user.username} submitted KYC verification #{kyc.id} '
+        f'({kyc.get_id_type_display()}) for review.',
+    )
+
+
+@task('accounts.provision_virtual_accounts', queue='monnify')
+def provision_virtual_accounts(kyc_id, reviewer_id=None):
+    """Reserve the user's Monnify accounts for an approved KYC, then mark it approved"""
+    kyc = KYCVerification.objects.select_related('user').filter(pk=kyc_id).first()
+    reviewer = User.objects.filter(pk=reviewer_id).first() if reviewer_id else None
+    # Rejected or approved again while the task was waiting: nothing to provision
+    for result in provision_kyc_accounts([kyc] if kyc else [], reviewer):
+        if not result.ok:
+            raise TaskError(f"Failed to create virtual accounts for {kyc.user.username}: {result.error}")
+
+
+@task('accounts.provision_virtual_accounts_bulk', queue='monnify', max_attempts=1)
+def provision_virtual_accounts_bulk(kyc_ids, reviewer_id=None):
+    """Provision a batch of KYCs on the thread pool; each failure is retried as its own task"""
+    kycs = KYCVerification.objects.select_related('user').filter(pk__in=kyc_ids, status='pending')
+    reviewer = User.objects.filter(pk=reviewer_id).first() if reviewer_id else None
+    results = provision_kyc_accounts(kycs, reviewer)
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        logger.warning("Provisioning for %s failed, retrying on its own: %s", result.kyc.user.username, result.error)
+        queue_kyc_provisioning(result.kyc, reviewer_id)
+    logger.info("Provisioned %d of %d KYC(s), %d queued for retry", len(results) - len(failed), len(results), len(failed))
+
+
+def queue_kyc_provisioning(kyc, reviewer_id=None):
+    """Queue provisioning for one KYC; approving it twice does not queue a second call"""
+    return provision_virtual_accounts.schedule(
+        {'kyc_id': kyc.pk, 'reviewer_id': reviewer_id}, unique_key=f'kyc:{kyc.pk}'
+    )
+
+
+def queue_bulk_kyc_provisioning(kycs, reviewer_id=None, batch_size=BULK_BATCH_SIZE):
+    """Queue provisioning for many KYCs as batch tasks; returns the number of batches"""
+    kyc_ids = [kyc.pk for kyc in kycs]
+    for start in range(0, len(kyc_ids), batch_size):
+        provision_virtual_accounts_bulk.enqueue(kyc_ids=kyc_ids[start:start + batch_size], reviewer_id=reviewer_id)
+    return -(-len(kyc_ids) // batch_size)
@@ -1,7 +1,19 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
 from django.contrib.auth import get_user_model
-from .models import UserProfile, BankAccount
+from django.contrib.admin.sites import site as admin_site
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.http import HttpResponse
+from .models import UserProfile, BankAccount, KYCVerification, VirtualAccount
+from .provisioning import provision_kyc_accounts
+from payments.fake_monnify import FakeMonnifyServer
 from payments.models import Transaction
+from payments.monnify_client import reset_monnify_clients
+from site_core.models import BackgroundTask, MonnifyBank
+from site_core.task_queue import run_pending
 
 User = get_user_model()
 
@@ -64,4 +76,117 @@ class BalanceTests(TestCase):
         commission_rate = 20  # 20%
         expected_commission = sale_amount * (commission_rate / 100)
         
-        self.assertEqual(expected_commission, 200)
\ No newline at end of file
+        self.assertEqual(expected_commission, 200)
+
+class BulkKYCProvisioningTests(TestCase):
+    def setUp(self):
+        self.server = FakeMonnifyServer(latency=0.01).start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(reset_monnify_clients)
+        settings_override = override_settings(
+            MONNIFY_BASE_URL=self.server.url,
+            MONNIFY_API_KEY=self.server.api_key,
+            MONNIFY_SECRET_KEY=self.server.secret_key,
+            MONNIFY_CONTRACT_CODE='0000000000',
+            KYC_PROVISIONING_WORKERS=4,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        MonnifyBank.invalidate_cache()
+        self.reviewer = User.objects.create_user(username='reviewer', password='x', is_staff=True, is_superuser=True)
+        self.kycs = [
+            KYCVerification.objects.create(
+                user=User.objects.create(username=f'applicant{n}', email=f'a{n}@example.com'),
+                id_type='nin', id_number=str(n), legal_first_name='Ada', legal_last_name=f'Obi{n}',
+                date_of_birth='1990-01-01', address='1 Road', city='Lagos', state='Lagos',
+                id_document_front='kyc_documents/front.jpg',
+            )
+            for n in range(12)
+        ]
+
+    def test_pool_shares_one_token_and_writes_in_bulk(self):
+        progress = []
+        with self.assertNumQueries(9):
+            results = provision_kyc_accounts(
+                self.kycs, self.reviewer, on_result=lambda result, done, total: progress.append((done, total))
+            )
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(progress[-1], (12, 12))
+        self.assertEqual(self.server.stats['logins'], 1)
+        self.assertLessEqual(self.server.stats['connections'], 5)
+        self.assertEqual(KYCVerification.objects.filter(status='approved', reviewed_by=self.reviewer).count(), 12)
+        self.assertEqual(VirtualAccount.objects.count(), 36)
+        self.assertEqual(VirtualAccount.objects.filter(is_primary=True).count(), 12)
+
+    def test_kyc_rejected_during_provisioning_is_left_alone(self):
+        kyc = self.kycs[0]
+        KYCVerification.objects.filter(pk=kyc.pk).update(status='rejected')
+
+        results = provision_kyc_accounts([kyc], self.reviewer)
+
+        self.assertFalse(results[0].ok)
+        self.assertEqual(KYCVerification.objects.get(pk=kyc.pk).status, 'rejected')
+        self.assertFalse(VirtualAccount.objects.exists())
+
+    def test_admin_bulk_action_queues_batches_for_the_worker(self):
+        request = RequestFactory().post('/')
+        request.user = self.reviewer
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        model_admin = admin_site._registry[KYCVerification]
+
+        model_admin.approve_selected_kyc(request, KYCVerification.objects.all())
+
+        self.assertEqual(BackgroundTask.objects.get().payload['kyc_ids'], [kyc.pk for kyc in self.kycs])
+        self.assertEqual(self.server.stats['requests'], 0)
+        run_pending()
+        self.assertEqual(KYCVerification.objects.filter(status='approved').count(), 12)
+        self.assertFalse(BackgroundTask.objects.exists())
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='member', password='testpass123')
+        self.client.force_login(self.user)
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        self.seen = []
+        self.middleware = SessionMiddleware(AuthenticationMiddleware(self.view))
+
+    def request(self):
+        return self.middleware(RequestFactory().get('/', HTTP_COOKIE=self.cookie))
+
+    def view(self, request):
+        user = request.user
+        self.seen.append((user.is_authenticated, user.is_authenticated and user.profile.bio))
+        return HttpResponse()
+
+    def test_warm_requests_need_no_auth_queries(self):
+        self.request()
+        with self.assertNumQueries(0):
+            self.request()
+        self.assertEqual(self.seen[-1], (True, ''))
+
+    def test_saving_the_user_or_profile_drops_the_cached_copy(self):
+        self.request()
+        self.user.profile.bio = 'Designer'
+        self.user.profile.save()
+        self.request()
+        self.assertEqual(self.seen[-1], (True, 'Designer'))
+
+        self.user.is_active = False
+        self.user.save()
+        self.request()
+        self.assertEqual(self.seen[-1], (False, False))
+
+    def test_password_change_signs_out_other_sessions(self):
+        self.request()
+        self.user.set_password('changed-pass-456')
+        self.user.save()
+        self.request()
+        self.assertEqual(self.seen[-1], (False, False))
+
+    def test_last_login_update_does_not_resave_the_profile(self):
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
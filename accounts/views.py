@@ -38,6 +38,8 @@ from .models import UserBankPreference, VirtualAccount
 from django.contrib import messages
 from .models import KYCVerification, VirtualAccount
 from .forms_kyc import KYCVerificationForm
+from .tasks import notify_kyc_submission
+from site_core.models import MonnifyBank
 from django.contrib import messages
 
 import logging
@@ -75,11 +77,11 @@ def kyc_verification(request):
                     request, 
                     "✅ KYC verification submitted successfully! Our team will review your documents within 24-48 hours. You'll receive a notification once it's processed."
                 )
-                logger.info(f"KYC submitted successfully for user: {request.user.username}")
+                logger.info("KYC submitted successfully for user: %s", request.user.username)
                 return redirect('profile_view')
                 
             except Exception as e:
-                logger.error(f"Error saving KYC for user {request.user.username}: {str(e)}")
+                logger.error("Error saving KYC for user %s: %s", request.user.username, e)
                 messages.error(
                     request,
                     "❌ There was an error submitting your KYC. Please try again or contact support if the problem persists."
@@ -91,7 +93,7 @@ def kyc_verification(request):
                 request,
                 f"❌ Please correct the {error_count} error{'s' if error_count > 1 else ''} in the form below."
             )
-            logger.warning(f"KYC form validation failed for user {request.user.username}: {form.errors}")
+            logger.warning("KYC form validation failed for user %s: %s", request.user.username, form.errors)
     else:
         form = KYCVerificationForm(instance=kyc)
 
@@ -102,10 +104,8 @@ def kyc_verification(request):
     return render(request, 'accounts/profile/kyc_verification.html', context)
 
 def send_kyc_submission_notification(user, kyc):
-    """Send notification about new KYC submission"""
-    # You can implement email notifications, in-app notifications, etc.
-    # For now, we'll just log it
-    logger.info(f"New KYC submission from {user.username} (ID: {kyc.id})")
+    """Queue the admin notification about a new KYC submission"""
+    notify_kyc_submission.enqueue(kyc_id=kyc.id)
 
 @login_required
 def virtual_account_details(request):
@@ -121,7 +121,7 @@ def virtual_account_details(request):
         return render(request, 'accounts/profile/virtual_account.html', context)
         
     except Exception as e:
-        logger.error(f"Error fetching virtual accounts for {request.user.username}: {str(e)}")
+        logger.error("Error fetching virtual accounts for %s: %s", request.user.username, e)
         messages.error(request, "Error loading virtual account details.")
         return redirect('profile_view')
 
@@ -129,22 +129,21 @@ def virtual_account_details(request):
 def bank_preferences(request):
     """Manage user's bank preferences"""
     try:
-        available_banks = MonnifyBank.objects.filter(is_active=True)
+        available_banks = MonnifyBank.get_active()
         user_preferences = UserBankPreference.objects.filter(user=request.user)
         virtual_accounts = VirtualAccount.objects.filter(user=request.user)
         
         if request.method == 'POST':
-            selected_banks = request.POST.getlist('banks')
+            banks_by_code = {bank.bank_code: bank for bank in available_banks}
+            selected_banks = [banks_by_code[code] for code in dict.fromkeys(request.POST.getlist('banks'))
+                              if code in banks_by_code]
             
             # Update preferences
-            UserBankPreference.objects.filter(user=request.user).delete()
-            
-            for bank_code in selected_banks:
-                try:
-                    bank = MonnifyBank.objects.get(bank_code=bank_code, is_active=True)
-                    UserBankPreference.objects.create(user=request.user, bank=bank)
-                except MonnifyBank.DoesNotExist:
-                    pass
+            with transaction.atomic():
+                UserBankPreference.objects.filter(user=request.user).delete()
+                UserBankPreference.objects.bulk_create([
+                    UserBankPreference(user=request.user, bank=bank) for bank in selected_banks
+                ])
             
             messages.success(request, "✅ Bank preferences updated successfully!")
             return redirect('bank_preferences')
@@ -152,12 +151,13 @@ def bank_preferences(request):
         context = {
             'available_banks': available_banks,
             'user_preferences': user_preferences,
+            'selected_bank_codes': set(user_preferences.values_list('bank__bank_code', flat=True)),
             'virtual_accounts': virtual_accounts,
         }
         return render(request, 'accounts/profile/bank_preferences.html', context)
         
     except Exception as e:
-        logger.error(f"Error in bank preferences for {request.user.username}: {str(e)}")
+        logger.error("Error in bank preferences for %s: %s", request.user.username, e)
         messages.error(request, "Error updating bank preferences.")
         return redirect('profile_view')
 
@@ -172,7 +172,7 @@ def set_primary_account(request, account_id):
     except VirtualAccount.DoesNotExist:
         messages.error(request, "❌ Account not found")
     except Exception as e:
-        logger.error(f"Error setting primary account: {str(e)}")
+        logger.error("Error setting primary account: %s", e)
         messages.error(request, "❌ Error setting primary account")
     
     return redirect('bank_preferences')
@@ -190,7 +190,7 @@ def toggle_account_active(request, account_id):
     except VirtualAccount.DoesNotExist:
         messages.error(request, "❌ Account not found")
     except Exception as e:
-        logger.error(f"Error toggling account status: {str(e)}")
+        logger.error("Error toggling account status: %s", e)
         messages.error(request, "❌ Error updating account status")
     
     return redirect('bank_preferences')
@@ -248,13 +248,10 @@ def register_view(request):
                 else:
                     messages.error(request, "User created but automatic login failed. Please log in manually.")
             except Exception as e:
-                import traceback
-                print("❌ Registration Save Error:", e)
-                print(traceback.format_exc())
+                logger.exception("Registration save failed")
                 messages.error(request, f"Unexpected error: {e}")
         else:
-            # Debug: print errors in console
-            print("❌ Registration form errors:", form.errors.as_json())
+            logger.debug("Registration form errors", extra={'errors': form.errors.get_json_data()})
 
             # Show all field errors to user
             for field, errors in form.errors.items():
@@ -6,7 +6,7 @@ class ReferralAdmin(admin.ModelAdmin):
     list_display = ('referrer', 'referred_user', 'joined_at', 'is_active')
     list_filter = ('is_active', 'joined_at')
     search_fields = ('referrer__username', 'referred_user__username')
-    readonly_fields = ('joined_at',)
+    readonly_fields = ('joined_at', 'total_earned')
 
 @admin.register(AffiliateSale)
 class AffiliateSaleAdmin(admin.ModelAdmin):
@@ -17,7 +17,9 @@ class AffiliateSaleAdmin(admin.ModelAdmin):
     actions = ['approve_commissions', 'mark_as_paid']
     
     def approve_commissions(self, request, queryset):
+        referral_ids = set(queryset.values_list('referral_id', flat=True))
         updated = queryset.update(status='approved')
+        Referral.refresh_total_earned(referral_ids)
         self.message_user(request, f'{updated} commissions approved.')
     approve_commissions.short_description = "Approve selected commissions"
     
@@ -0,0 +1,110 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import Client
+from django.urls import reverse
+
+from affiliates.models import AffiliateSale, Referral
+from payments.models import Transaction
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark affiliates referral_list for a referrer with many referrals (rolled back afterwards), '
+        'against the previous per-referral aggregate loop'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--referrals', type=int, default=100000)
+        parser.add_argument('--sales-ratio', type=float, default=0.3,
+                            help='Affiliate sales created per referral')
+        parser.add_argument('--naive-referrals', type=int, default=10000,
+                            help='Referrals for the per-referral aggregate comparison (0 to skip)')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            referrer = self.seed(options['referrals'], options['sales_ratio'])
+            self.stdout.write(f"seeded {options['referrals']} referrals in {time.perf_counter() - started:.1f}s")
+
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(referrer)
+            url = reverse('referral_list')
+            client.get(url)
+            for page in (1, 2500):
+                self.measure(f'referral_list page {page}',
+                             lambda: client.get(url, {'page': page}), options['repeat'])
+
+            if options['naive_referrals']:
+                naive = Referral.objects.filter(
+                    pk__in=Referral.objects.filter(referrer=referrer).values('pk')[:options['naive_referrals']]
+                )
+                self.measure(f"per-referral loop ({options['naive_referrals']})", lambda: self.naive(naive), 1)
+            transaction.set_rollback(True)
+
+    def seed(self, referrals, sales_ratio):
+        stamp = time.time_ns()
+        referrer = User.objects.create(username=f'referrer-{stamp}', referral_code=f'REF{stamp}')
+        for start in range(0, referrals, 5000):
+            User.objects.bulk_create([
+                User(username=f'referred-{stamp}-{n}', referral_code=f'R{stamp % 10**9}{n}', password='!')
+                for n in range(start, min(start + 5000, referrals))
+            ])
+        referred_ids = User.objects.filter(username__startswith=f'referred-{stamp}-').values_list('pk', flat=True)
+        Referral.objects.bulk_create(
+            [Referral(referrer=referrer, referred_user_id=user_id) for user_id in referred_ids], batch_size=5000
+        )
+
+        referral_rows = list(Referral.objects.filter(referrer=referrer).values_list('pk', 'referred_user_id'))
+        step = max(1, round(1 / sales_ratio)) if sales_ratio else 0
+        sold = referral_rows[::step] if step else []
+        sales = Transaction.objects.bulk_create([
+            Transaction(user_id=user_id, transaction_type='sale', amount=Decimal('100'), status='completed',
+                        reference=f'REFBENCH{stamp}-{n}')
+            for n, (_, user_id) in enumerate(sold)
+        ], batch_size=5000)
+        AffiliateSale.objects.bulk_create([
+            AffiliateSale(referral_id=referral_id, sale=sale, commission_amount=Decimal('10'),
+                          commission_rate=Decimal('10'), status='approved' if n % 3 else 'pending')
+            for n, ((referral_id, _), sale) in enumerate(zip(sold, sales))
+        ], batch_size=5000)
+        # bulk_create skips AffiliateSale.save, so bring the stored totals up to date in one pass
+        Referral.refresh_total_earned()
+        return referrer
+
+    def naive(self, referrals):
+        """What referral_list did before: one aggregate per referral, then paginate"""
+        referrals = referrals.select_related('referred_user').order_by('-joined_at', '-pk')
+        for referral in referrals:
+            referral.earned = AffiliateSale.objects.filter(
+                referral=referral, status__in=['approved', 'paid']
+            ).aggregate(total=Sum('commission_amount'))['total'] or 0
+        return list(Paginator(referrals, 20).get_page(1))
+
+    def measure(self, name, func, repeat):
+        samples = []
+        queries = 0
+
+        def count(execute, *args):
+            nonlocal queries
+            queries += 1
+            return execute(*args)
+
+        for _ in range(repeat):
+            queries = 0
+            with connection.execute_wrapper(count):
+                started = time.perf_counter()
+                response = func()
+                samples.append((time.perf_counter() - started) * 1000)
+            if getattr(response, 'status_code', 200) != 200:
+                raise CommandError(f'{name}: HTTP {response.status_code}')
+        self.stdout.write(f'{name:<32} {statistics.median(samples):10.1f}ms  {queries:>7} queries')
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:47
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_earned(apps, schema_editor):
+    Referral = apps.get_model('affiliates', 'Referral')
+    AffiliateSale = apps.get_model('affiliates', 'AffiliateSale')
+    earned = (
+        AffiliateSale.objects.filter(referral=OuterRef('pk'), status__in=['approved', 'paid'])
+        .order_by().values('referral').annotate(total=Sum('commission_amount')).values('total')
+    )
+    Referral.objects.update(
+        total_earned=Coalesce(Subquery(earned), Decimal('0'), output_field=models.DecimalField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='referral',
+            name='total_earned',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['referrer', '-joined_at'], name='referral_referrer_joined_idx'),
+        ),
+        migrations.RunPython(backfill_total_earned, migrations.RunPython.noop),
+    ]
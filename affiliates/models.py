@@ -1,19 +1,47 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
 from django.utils import timezone
 
+# Sale statuses that count towards a referral's earnings
+EARNED_STATUSES = ['approved', 'paid']
+
 class Referral(models.Model):
     referrer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='referrals_made')
     referred_user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='referral')
     joined_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    # Denormalized sum of approved/paid commissions, kept in sync by AffiliateSale signals
+    total_earned = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     class Meta:
         unique_together = ['referrer', 'referred_user']
+        indexes = [
+            models.Index(fields=['referrer', '-joined_at'], name='referral_referrer_joined_idx'),
+        ]
 
     def __str__(self):
         return f"{self.referrer.username} -> {self.referred_user.username}"
 
+    @classmethod
+    def refresh_total_earned(cls, referral_ids=None):
+        """Recompute total_earned in a single UPDATE (all referrals when no ids are given)"""
+        earned = (
+            AffiliateSale.objects.filter(referral=OuterRef('pk'), status__in=EARNED_STATUSES)
+            .order_by().values('referral').annotate(total=Sum('commission_amount')).values('total')
+        )
+        referrals = cls.objects.all()
+        if referral_ids is not None:
+            referrals = referrals.filter(pk__in=referral_ids)
+        return referrals.update(
+            total_earned=Coalesce(Subquery(earned), Decimal('0'), output_field=models.DecimalField())
+        )
+
 class AffiliateSale(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -36,7 +64,30 @@ class AffiliateSale(models.Model):
     def __str__(self):
         return f"Affiliate Sale: {self.referral.referrer.username} - {self.commission_amount}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'referral_id' in field_names:
+            # Moving the sale to another referral must refresh the one it left too
+            instance._loaded_referral_id = instance.referral_id
+        return instance
+
     def mark_as_paid(self):
         self.status = 'paid'
         self.paid_at = timezone.now()
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+# Signals rather than save()/delete() overrides, so cascades and QuerySet.delete() are covered too;
+# QuerySet.update() sends no signal and callers refresh the totals themselves
+@receiver(post_save, sender=AffiliateSale)
+def refresh_referral_total_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'status', 'commission_amount', 'referral'} & set(update_fields):
+        referral_ids = {instance.referral_id, getattr(instance, '_loaded_referral_id', instance.referral_id)}
+        Referral.refresh_total_earned(referral_ids)
+        instance._loaded_referral_id = instance.referral_id
+
+
+@receiver(post_delete, sender=AffiliateSale)
+def refresh_referral_total_on_delete(sender, instance, **kwargs):
+    Referral.refresh_total_earned([instance.referral_id])
@@ -1,3 +1,84 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+
+from payments.models import Transaction
+from .models import AffiliateSale, Referral
+
+User = get_user_model()
+
+
+class ReferralEarningsTests(TestCase):
+    def setUp(self):
+        self.referrer = User.objects.create_user(username='referrer', password='testpass123', referral_code='REF')
+        self.referrals = []
+        for n in range(25):
+            referred = User.objects.create(username=f'referred{n}', referral_code=f'R{n}')
+            self.referrals.append(Referral.objects.create(referrer=self.referrer, referred_user=referred))
+        self.client.force_login(self.referrer)
+
+    def add_sale(self, referral, amount, status='pending'):
+        sale = Transaction.objects.create(user=referral.referred_user, transaction_type='sale',
+                                          amount=Decimal('100'), status='completed')
+        return AffiliateSale.objects.create(referral=referral, sale=sale, commission_amount=Decimal(amount),
+                                            commission_rate=Decimal('10'), status=status)
+
+    def test_total_earned_follows_sale_status(self):
+        referral = self.referrals[0]
+        pending = self.add_sale(referral, '10')
+        self.add_sale(referral, '5', status='approved')
+        referral.refresh_from_db()
+        self.assertEqual(referral.total_earned, Decimal('5'))
+
+        pending.mark_as_paid()
+        referral.refresh_from_db()
+        self.assertEqual(referral.total_earned, Decimal('15'))
+
+        pending.delete()
+        referral.refresh_from_db()
+        self.assertEqual(referral.total_earned, Decimal('5'))
+
+    def test_moving_a_sale_refreshes_both_referrals(self):
+        old, new = self.referrals[:2]
+        sale = AffiliateSale.objects.get(pk=self.add_sale(old, '9', status='approved').pk)
+        sale.referral = new
+        sale.save()
+        old.refresh_from_db()
+        new.refresh_from_db()
+        self.assertEqual((old.total_earned, new.total_earned), (Decimal('0'), Decimal('9')))
+
+    def test_bulk_approval_refreshes_totals(self):
+        sales = [self.add_sale(referral, '7') for referral in self.referrals[:3]]
+        admin_user = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:affiliates_affiliatesale_changelist'), {
+            'action': 'approve_commissions', '_selected_action': [sale.pk for sale in sales],
+        })
+        self.assertEqual(AffiliateSale.objects.filter(status='approved').count(), 3)
+        self.assertEqual(
+            sorted(Referral.objects.values_list('total_earned', flat=True))[-3:], [Decimal('7')] * 3
+        )
+
+    def test_cascaded_and_bulk_deletes_refresh_totals(self):
+        referral = self.referrals[0]
+        first = self.add_sale(referral, '10', status='approved')
+        self.add_sale(referral, '5', status='approved')
+        first.sale.delete()  # the commission goes with its sale
+        referral.refresh_from_db()
+        self.assertEqual(referral.total_earned, Decimal('5'))
+
+        AffiliateSale.objects.filter(referral=referral).delete()
+        referral.refresh_from_db()
+        self.assertEqual(referral.total_earned, Decimal('0'))
 
-# Create your tests here.
+    def test_referral_list_query_count_does_not_grow_with_referrals(self):
+        for referral in self.referrals:
+            self.add_sale(referral, '3', status='approved')
+        self.client.get(reverse('referral_list'))  # warm the site settings, session and user caches
+        # count and one page of referrals, with no per-referral aggregate
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('referral_list'))
+        self.assertEqual(len(response.context['referrals']), 20)
+        self.assertEqual(response.context['referrals'][0].total_earned, Decimal('3'))
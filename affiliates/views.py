@@ -1,9 +1,9 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.db.models import Sum, Count
 from django.shortcuts import render
 from .models import Referral, AffiliateSale
 from site_core.models import SiteSetting
+from site_core.pagination import CURSOR_PARAM, KeysetPaginator
 
 @login_required
 def affiliate_dashboard(request):
@@ -34,17 +34,11 @@ def affiliate_dashboard(request):
 @login_required
 def referral_list(request):
     user = request.user
+    # total_earned is stored on each referral, so a page is one query however
+    # many referrals or sales the user has
     referrals = Referral.objects.filter(referrer=user).select_related('referred_user')
     
-    for referral in referrals:
-        referral.total_earned = AffiliateSale.objects.filter(
-            referral=referral, 
-            status__in=['approved', 'paid']
-        ).aggregate(total=Sum('commission_amount'))['total'] or 0
-    
-    paginator = Paginator(referrals, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = KeysetPaginator(referrals, 20, field='joined_at').get_page(request.GET.get(CURSOR_PARAM))
     
     context = {
         'page_obj': page_obj,
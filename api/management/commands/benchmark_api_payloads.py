@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.serializers import JobSerializer, UserSerializer
+from api.views import JobViewSet
+from jobs.models import Job
+from site_core.models import Category
+
+User = get_user_model()
+
+
+class LegacyJobSerializer(JobSerializer):
+    """The serializer before sparse fieldsets: full nested user and profile on every row"""
+    posted_by = UserSerializer(read_only=True)
+
+
+class LegacyJobViewSet(JobViewSet):
+    serializer_class = LegacyJobSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark serialized bytes, queries and latency of a 100-item /api/jobs/ page: the old nested '
+        'author, the compact default, ?expand= and ?fields= (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reader = self.seed(options['rows'])
+            factory = APIRequestFactory()
+            cases = [
+                ('nested user (before)', LegacyJobViewSet, {}),
+                ('compact author', JobViewSet, {}),
+                ('?expand=posted_by', JobViewSet, {'expand': 'posted_by'}),
+                ('?fields=id,title,price', JobViewSet, {'fields': 'id,title,price'}),
+            ]
+            for name, viewset, params in cases:
+                view = viewset.as_view({'get': 'list'})
+
+                def fetch():
+                    request = factory.get('/api/jobs/', {'page_size': options['rows'], **params})
+                    force_authenticate(request, user=reader)
+                    return view(request).render()
+
+                samples = []
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = fetch()
+                        samples.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f'{name:<24} {len(response.content):>8} bytes  {len(queries):>4} queries  '
+                    f'{statistics.median(samples):7.1f}ms'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        stamp = time.time_ns()
+        reader = User.objects.create(username=f'api-reader-{stamp}', referral_code=f'AR{stamp % 10**12}')
+        category = Category.objects.create(name=f'API bench {stamp}', category_type='job')
+        authors = [
+            User.objects.create(username=f'api-author-{stamp}-{n}', referral_code=f'AA{stamp % 10**9}{n}',
+                                first_name='Bench', last_name=f'Author {n}')
+            for n in range(rows)
+        ]
+        Job.objects.bulk_create([
+            Job(title=f'Job {n}', description='Bench ' * 40, category=category, job_type='contract',
+                location='Lagos', company_name='Bench', salary_min=1, salary_max=2, deadline=timezone.now(),
+                posted_by=author, status='approved')
+            for n, author in enumerate(authors)
+        ])
+        return reader
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from accounts.models import User, UserProfile
 from jobs.models import Job, JobCategory
 from courses.models import Course, CourseCategory, Enrollment
@@ -6,11 +7,39 @@ from products.models import Product, ProductCategory, ProductSale
 from affiliates.models import Referral, AffiliateSale
 from payments.models import Transaction
 from blog.models import BlogPost, Category, BlogComment
+from site_core import images
+
+class ImageVariantsField(serializers.Field):
+    """Resized WebP/fallback URLs of an image field: {variant: {webp, fallback, width, height}}
+
+    Absolute when the request is in the context, like ImageField's own URL;
+    null for an empty field or while derivatives are disabled.
+    """
+
+    def __init__(self, variants, **kwargs):
+        self.variants = variants
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value or not images.enabled():
+            return None
+        request = self.context.get('request')
+        result = {}
+        for variant in self.variants:
+            urls = images.variant_urls(value.name, variant)
+            if request is not None:
+                urls['webp'] = request.build_absolute_uri(urls['webp'])
+                urls['fallback'] = request.build_absolute_uri(urls['fallback'])
+            result[variant] = urls
+        return result
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    profile_picture_variants = ImageVariantsField(('avatar', 'thumb'), source='profile_picture')
+
     class Meta:
         model = UserProfile
-        fields = ['bio', 'profile_picture', 'country', 'phone_number', 'date_joined']
+        fields = ['bio', 'profile_picture', 'profile_picture_variants', 'country', 'phone_number', 'date_joined']
 
 class UserSerializer(serializers.ModelSerializer):
     profile = UserProfileSerializer(read_only=True)
@@ -19,13 +48,56 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'subscription_level', 'profile']
 
+class AuthorSerializer(serializers.ModelSerializer):
+    """Compact user embedded in list rows; ?expand=<field> swaps in the full UserSerializer"""
+    display_name = serializers.CharField(source='get_display_name', read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'display_name']
+
+def query_param_list(request, name):
+    """Comma-separated query parameter as a set (empty when absent)"""
+    if request is None:
+        return set()
+    return {value.strip() for value in request.query_params.get(name, '').split(',') if value.strip()}
+
+def requested_expansions(serializer_class, request):
+    """Names from ?expand= that the serializer allows, mapped to their select_related paths"""
+    expandable = getattr(getattr(serializer_class, 'Meta', None), 'expandable_fields', {})
+    return {name: expandable[name][1] for name in query_param_list(request, 'expand') if name in expandable}
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """Sparse fieldsets for the top-level object.
+
+    ?fields=id,title keeps only those fields on reads; ?expand=posted_by replaces
+    a compact relation with the full serializer from Meta.expandable_fields,
+    given as {field: (serializer class, select_related path)}.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if request is None or parent is not None:
+            return fields
+
+        for name in requested_expansions(type(self), request):
+            fields[name] = self.Meta.expandable_fields[name][0](read_only=True)
+        only = query_param_list(request, 'fields')
+        if only and request.method in SAFE_METHODS:
+            fields = {name: field for name, field in fields.items() if name in only}
+        return fields
+
 class JobCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = JobCategory
         fields = ['id', 'name', 'description']
 
-class JobSerializer(serializers.ModelSerializer):
-    posted_by = UserSerializer(read_only=True)
+class JobSerializer(DynamicFieldsModelSerializer):
+    posted_by = AuthorSerializer(read_only=True)
     category = JobCategorySerializer(read_only=True)
     
     class Meta:
@@ -37,46 +109,51 @@ class JobSerializer(serializers.ModelSerializer):
             'views_count', 'created_at'
         ]
         read_only_fields = ['posted_by', 'status', 'views_count', 'created_at']
+        expandable_fields = {'posted_by': (UserSerializer, 'posted_by__profile')}
 
 class CourseCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = CourseCategory
         fields = ['id', 'name', 'description']
 
-class CourseSerializer(serializers.ModelSerializer):
-    instructor = UserSerializer(read_only=True)
+class CourseSerializer(DynamicFieldsModelSerializer):
+    instructor = AuthorSerializer(read_only=True)
     category = CourseCategorySerializer(read_only=True)
+    thumbnail_variants = ImageVariantsField(('card', 'thumb'), source='thumbnail')
     
     class Meta:
         model = Course
         fields = [
             'id', 'title', 'description', 'category', 'level', 'instructor',
             'duration', 'mode', 'start_date', 'is_self_paced', 'price',
-            'spots_total', 'spots_left', 'preview_video', 'thumbnail', 'status',
-            'created_at'
+            'spots_total', 'spots_left', 'preview_video', 'thumbnail', 'thumbnail_variants',
+            'status', 'created_at'
         ]
         read_only_fields = ['instructor', 'status', 'created_at']
+        expandable_fields = {'instructor': (UserSerializer, 'instructor__profile')}
 
 class ProductCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
         fields = ['id', 'name', 'description']
 
-class ProductSerializer(serializers.ModelSerializer):
-    seller = UserSerializer(read_only=True)
+class ProductSerializer(DynamicFieldsModelSerializer):
+    seller = AuthorSerializer(read_only=True)
     category = ProductCategorySerializer(read_only=True)
+    thumbnail_variants = ImageVariantsField(('card', 'thumb'), source='thumbnail')
     
     class Meta:
         model = Product
         fields = [
             'id', 'title', 'description', 'category', 'seller', 'license_type',
             'version', 'price', 'product_file', 'sample_file', 'thumbnail',
-            'status', 'views_count', 'download_count', 'created_at'
+            'thumbnail_variants', 'status', 'views_count', 'download_count', 'created_at'
         ]
         read_only_fields = ['seller', 'status', 'views_count', 'download_count', 'created_at']
+        expandable_fields = {'seller': (UserSerializer, 'seller__profile')}
 
-class TransactionSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+class TransactionSerializer(DynamicFieldsModelSerializer):
+    user = AuthorSerializer(read_only=True)
     
     class Meta:
         model = Transaction
@@ -86,8 +163,11 @@ class TransactionSerializer(serializers.ModelSerializer):
             'rejection_reason', 'created_at', 'completed_at'
         ]
         read_only_fields = ['user', 'reference', 'created_at', 'completed_at']
+        expandable_fields = {'user': (UserSerializer, 'user__profile')}
+        # idempotency_key is not exposed; DRF's UniqueConstraint validator also breaks on Django 4.2
+        validators = []
 
-class AffiliateSaleSerializer(serializers.ModelSerializer):
+class AffiliateSaleSerializer(DynamicFieldsModelSerializer):
     referral = serializers.StringRelatedField()
     
     class Meta:
@@ -97,15 +177,17 @@ class AffiliateSaleSerializer(serializers.ModelSerializer):
             'created_at', 'paid_at'
         ]
 
-class BlogPostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
+class BlogPostSerializer(DynamicFieldsModelSerializer):
+    author = AuthorSerializer(read_only=True)
     category = serializers.StringRelatedField()
+    featured_image_variants = ImageVariantsField(('hero', 'card'), source='featured_image')
     
     class Meta:
         model = BlogPost
         fields = [
             'id', 'title', 'slug', 'content', 'excerpt', 'author', 'category',
-            'featured_image', 'status', 'is_featured', 'views_count', 'created_at',
-            'published_at'
+            'featured_image', 'featured_image_variants', 'status', 'is_featured',
+            'views_count', 'created_at', 'published_at'
         ]
-        read_only_fields = ['author', 'slug', 'views_count', 'created_at', 'published_at']
\ No newline at end of file
+        read_only_fields = ['author', 'slug', 'views_count', 'created_at', 'published_at']
+        expandable_fields = {'author': (UserSerializer, 'author__profile')}
\ No newline at end of file
@@ -1,3 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from blog.models import BlogPost
+from payments.models import Transaction
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='apiuser', password='testpass123')
+        for n in range(5):
+            BlogPost.objects.create(title=f'Post {n}', slug=f'post-{n}', content='Body', author=self.user,
+                                    status='published', views_count=n + 1)
+        self.client.force_login(self.user)
+        self.url = reverse('blog-post-list')
+
+    def amounts(self, body):
+        return [row['views_count'] for row in body['results']]
+
+    def test_cursor_pages_without_count(self):
+        body = self.client.get(self.url, {'page_size': 2}).json()
+        self.assertNotIn('count', body)
+        self.assertIsNone(body['previous'])
+        self.assertEqual(self.amounts(body), [5, 4])
+
+        body = self.client.get(body['next']).json()
+        self.assertEqual(self.amounts(body), [3, 2])
+        self.assertEqual(self.amounts(self.client.get(body['previous']).json()), [5, 4])
+
+    def test_count_is_opt_in(self):
+        body = self.client.get(self.url, {'count': '1'}).json()
+        self.assertEqual(body['count'], 5)
+
+    def test_page_numbers_and_other_orderings_still_work(self):
+        body = self.client.get(self.url, {'ordering': 'views_count', 'page_size': 2, 'page': 2}).json()
+        self.assertEqual(body['count'], 5)
+        self.assertEqual(self.amounts(body), [3, 4])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'junk'}).status_code, 404)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        for n in range(6):
+            author = User.objects.create(username=f'author{n}', referral_code=f'A{n}', first_name='Ada',
+                                         last_name=f'Writer{n}')
+            BlogPost.objects.create(title=f'Post {n}', slug=f'post-{n}', content='Body', author=author,
+                                    status='published')
+        self.client.force_login(self.user)
+        self.url = reverse('blog-post-list')
+
+    def list_queries(self, params):
+        self.client.get(self.url, params)  # warm session and site settings lookups
+        with CaptureQueriesContext(connection) as queries:
+            body = self.client.get(self.url, params).json()
+        return body['results'], len(queries)
+
+    def test_compact_author_by_default(self):
+        results, _ = self.list_queries({})
+        self.assertEqual(results[0]['author'], {'id': results[0]['author']['id'], 'username': 'author5',
+                                                'display_name': 'Ada Writer5'})
+
+    def test_fields_limits_top_level_keys(self):
+        results, _ = self.list_queries({'fields': 'id,title,author'})
+        self.assertEqual(set(results[0]), {'id', 'title', 'author'})
+
+    def test_expand_joins_profiles_instead_of_a_query_per_row(self):
+        _, compact_queries = self.list_queries({})
+        results, expanded_queries = self.list_queries({'expand': 'author'})
+        self.assertIn('profile', results[0]['author'])
+        self.assertEqual(expanded_queries, compact_queries)
+
+
+class TransactionApiTests(TestCase):
+    def test_list_own_transactions(self):
+        user = User.objects.create_user(username='payer', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        Transaction.objects.create(user=user, transaction_type='add_money', amount=500, status='completed',
+                                   idempotency_key='deposit-1')
+        Transaction.objects.create(user=other, transaction_type='add_money', amount=700, status='completed')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('transaction-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['amount'] for row in response.json()['results']], ['500.00'])
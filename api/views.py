@@ -1,7 +1,9 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from accounts.models import User
@@ -11,8 +13,10 @@ from products.models import Product
 from payments.models import Transaction
 from affiliates.models import AffiliateSale
 from blog.models import BlogPost
+from site_core.http_cache import get_validator
+from site_core.pagination import CURSOR_PARAM, InvalidCursor, KeysetPaginator
 from .serializers import (
-    UserSerializer, JobSerializer, CourseSerializer, ProductSerializer,
+    requested_expansions, UserSerializer, JobSerializer, CourseSerializer, ProductSerializer,
     TransactionSerializer, AffiliateSaleSerializer, BlogPostSerializer
 )
 
@@ -21,10 +25,82 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class JobViewSet(viewsets.ModelViewSet):
+class KeysetResultsSetPagination(StandardResultsSetPagination):
+    """Cursor pages on (created_at, id) with no COUNT(*) unless ?count=1 is passed.
+
+    Requests using ?page= or ordering on another field keep numbered pages.
+    """
+    cursor_query_param = CURSOR_PARAM
+    count_query_param = 'count'
+    keyset_orderings = {('-created_at',): True, ('created_at',): False}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        descending = self.keyset_orderings.get(tuple(queryset.query.order_by) or ('-created_at',))
+        self.keyset_page = None
+        if descending is None or self.page_query_param in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        paginator = KeysetPaginator(queryset, self.get_page_size(request), descending=descending)
+        try:
+            self.keyset_page = paginator.page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        return list(self.keyset_page)
+
+    def cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.keyset_page is None:
+            return super().get_paginated_response(data)
+        body = {}
+        if self.request.query_params.get(self.count_query_param) in ('1', 'true'):
+            body['count'] = self.keyset_page.paginator.count
+        body.update({
+            'next': self.cursor_link(self.keyset_page.next_cursor),
+            'previous': self.cursor_link(self.keyset_page.previous_cursor),
+            'results': data,
+        })
+        return Response(body)
+
+class ExpandableQuerysetMixin:
+    """Joins the relations a request expands (?expand=posted_by -> posted_by__profile)"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        related = requested_expansions(self.get_serializer_class(), self.request).values()
+        return queryset.select_related(*related) if related else queryset
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified on list and retrieve; a matching conditional GET is a 304 before any serialization"""
+
+    def conditional(self, request, queryset, respond):
+        validator = get_validator(request, queryset, variant=request.accepted_renderer.format)
+        response = validator.conditional_response(request)
+        if response is None:
+            response = respond()
+            if response.status_code != 200:
+                return response
+        return validator.apply(response)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, self.filter_queryset(self.get_queryset()),
+                                lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        return self.conditional(request, queryset,
+                                lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+class JobViewSet(ConditionalGetMixin, ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = Job.objects.filter(status='approved').select_related('posted_by', 'category')
     serializer_class = JobSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['category', 'job_type', 'level_requirement']
     search_fields = ['title', 'description', 'company_name']
@@ -34,10 +110,10 @@ class JobViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(posted_by=self.request.user, status='pending')
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.filter(status='approved').select_related('instructor', 'category')
     serializer_class = CourseSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['category', 'level', 'mode']
     search_fields = ['title', 'description']
@@ -47,10 +123,10 @@ class CourseViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(instructor=self.request.user, status='pending')
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.filter(status='approved').select_related('seller', 'category')
     serializer_class = ProductSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['category', 'license_type']
     search_fields = ['title', 'description']
@@ -60,9 +136,9 @@ class ProductViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user, status='pending')
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(ExpandableQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['transaction_type', 'status']
     ordering_fields = ['created_at', 'amount']
@@ -71,17 +147,19 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user)
 
-class AffiliateSaleViewSet(viewsets.ReadOnlyModelViewSet):
+class AffiliateSaleViewSet(ExpandableQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = AffiliateSaleSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
     
     def get_queryset(self):
-        return AffiliateSale.objects.filter(referral__referrer=self.request.user)
+        return AffiliateSale.objects.filter(referral__referrer=self.request.user).select_related(
+            'referral__referrer', 'referral__referred_user'
+        )
 
-class BlogPostViewSet(viewsets.ModelViewSet):
+class BlogPostViewSet(ConditionalGetMixin, ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = BlogPost.objects.filter(status='published').select_related('author', 'category')
     serializer_class = BlogPostSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetResultsSetPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['category']
     search_fields = ['title', 'content', 'excerpt']
@@ -3,6 +3,8 @@ from django.contrib import admin
 # Register your models here.
 from django.contrib import admin
 from .models import Category, Tag, BlogPost, BlogComment, SavedArticle
+from search.index import reindex_queryset
+from site_core.http_cache import invalidate_models
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -35,6 +37,8 @@ class BlogPostAdmin(admin.ModelAdmin):
     
     def publish_posts(self, request, queryset):
         updated = queryset.update(status='published')
+        reindex_queryset(queryset)
+        invalidate_models(queryset.model)
         self.message_user(request, f'{updated} posts published.')
     publish_posts.short_description = "Publish selected posts"
     
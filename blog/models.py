@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from django.utils.text import slugify
+from site_core.counters import increment_counter
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -66,7 +67,7 @@ class BlogPost(models.Model):
 
     def increment_views(self):
         self.views_count += 1
-        self.save(update_fields=['views_count'])
+        increment_counter(self, 'views_count')
 
     @property
     def is_published(self):
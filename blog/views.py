@@ -7,15 +7,17 @@ from django.db.models import Q, Count
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+from site_core.http_cache import ConditionalPageMixin
 from .models import BlogPost, BlogComment, Category, Tag, SavedArticle
 from .forms import BlogPostForm, BlogCommentForm
 from django.contrib.auth.decorators import login_required
 
-class BlogPostListView(ListView):
+class BlogPostListView(ConditionalPageMixin, ListView):
     model = BlogPost
     template_name = 'blog/list.html'
     context_object_name = 'posts'
     paginate_by = 20
+    cache_depends_on = ('blog.Category', 'blog.Tag')
     
     def get_queryset(self):
         queryset = BlogPost.objects.filter(status='published').select_related('author', 'category')
@@ -45,14 +47,20 @@ class BlogPostListView(ListView):
         ).filter(post_count__gt=0).order_by('-post_count')[:10]
         return context
 
-class BlogPostDetailView(DetailView):
+class BlogPostDetailView(ConditionalPageMixin, DetailView):
     model = BlogPost
     template_name = 'blog/detail.html'
     context_object_name = 'post'
+    cache_depends_on = ('blog.BlogComment', 'blog.Tag')
+    hit_counter_field = 'views_count'
     
     def get_queryset(self):
         return BlogPost.objects.select_related('author', 'category').prefetch_related('tags', 'comments')
     
+    def get_validator_queryset(self):
+        # Only published posts count views, so drafts are never served from the cache
+        return super().get_validator_queryset().filter(status='published')
+    
     def get_object(self):
         obj = super().get_object()
         if obj.status == 'published':
@@ -1,5 +1,7 @@
 from django.contrib import admin
 from .models import CourseCategory, Course, Enrollment, PromoCode
+from search.index import reindex_queryset
+from site_core.http_cache import invalidate_models
 
 @admin.register(CourseCategory)
 class CourseCategoryAdmin(admin.ModelAdmin):
@@ -21,6 +23,8 @@ class CourseAdmin(admin.ModelAdmin):
     
     def approve_courses(self, request, queryset):
         updated = queryset.update(status='approved')
+        reindex_queryset(queryset)
+        invalidate_models(queryset.model)
         self.message_user(request, f'{updated} courses approved successfully.')
     approve_courses.short_description = "Approve selected courses"
     
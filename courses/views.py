@@ -6,6 +6,7 @@ from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from .models import Course, Enrollment, PromoCode
 from .forms import CourseForm
+from site_core.http_cache import ConditionalPageMixin
 from site_core.models import Category
 
 
@@ -33,7 +34,7 @@ def reject_course(request, pk):
 
 
 
-class CourseListView(ListView):
+class CourseListView(ConditionalPageMixin, ListView):
     model = Course
     template_name = 'courses/list.html'
     context_object_name = 'courses'
@@ -66,7 +67,7 @@ class CourseListView(ListView):
         context['categories'] = Category.objects.filter(category_type="course", is_active=True)
         return context
 
-class CourseDetailView(DetailView):
+class CourseDetailView(ConditionalPageMixin, DetailView):
     model = Course
     template_name = 'courses/detail.html'
     context_object_name = 'course'
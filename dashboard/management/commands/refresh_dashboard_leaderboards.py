@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.stats import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cached weekly top earners/referrers shown on every dashboard (run from cron)'
+
+    def handle(self, *args, **options):
+        boards = refresh_leaderboards()
+        self.stdout.write(self.style.SUCCESS(
+            f"Cached {len(boards['top_earners_week'])} top earners and "
+            f"{len(boards['top_referrers_week'])} top referrers"
+        ))
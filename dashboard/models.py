@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from site_core.counters import increment_counter
 
 class JobCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -72,4 +73,4 @@ class Job(models.Model):
 
     def increment_views(self):
         self.views_count += 1
-        self.save(update_fields=['views_count'])
\ No newline at end of file
+        increment_counter(self, 'views_count')
\ No newline at end of file
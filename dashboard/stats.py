@@ -0,0 +1,110 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User
+from affiliates.models import Referral
+from courses.models import Course
+from jobs.models import Job
+from payments.models import Transaction
+from products.models import ProductSale
+
+EARNING_TYPES = ['sale', 'commission']
+LEADERBOARD_CACHE_KEY = 'dashboard:leaderboards'
+LEADERBOARD_LOCK_KEY = 'dashboard:leaderboards:refreshing'
+DEFAULT_LEADERBOARD_TTL = 300  # seconds
+
+
+def _money_sum(condition):
+    return Coalesce(
+        Sum('transaction__amount', filter=condition),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def _count_for_user(queryset, user_field):
+    counts = queryset.filter(**{user_field: OuterRef('pk')}).order_by().values(user_field).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def get_user_stats(user):
+    """Every per-user figure on the dashboard in a single query"""
+    now = timezone.now()
+    earning = Q(transaction__status='completed', transaction__transaction_type__in=EARNING_TYPES)
+    stats = User.objects.filter(pk=user.pk).annotate(
+        weekly_earnings=_money_sum(earning & Q(transaction__created_at__gte=now - timedelta(days=7))),
+        monthly_earnings=_money_sum(earning & Q(transaction__created_at__gte=now - timedelta(days=30))),
+        total_earnings=_money_sum(earning),
+        referral_earnings=_money_sum(Q(transaction__status='completed', transaction__transaction_type='commission')),
+        active_jobs=_count_for_user(Job.objects.filter(status='approved'), 'posted_by'),
+        active_courses=_count_for_user(Course.objects.filter(status='approved'), 'instructor'),
+        active_products=_count_for_user(ProductSale.objects.filter(status='completed'), 'seller'),
+    ).values(
+        'wallet_balance__balance', 'weekly_earnings', 'monthly_earnings', 'total_earnings',
+        'referral_earnings', 'active_jobs', 'active_courses', 'active_products',
+    ).get()
+
+    stats['balance'] = stats.pop('wallet_balance__balance')
+    if stats['balance'] is None:
+        # No materialized wallet yet; builds it from the ledger
+        stats['balance'] = Transaction.get_user_balance(user)
+    stats['active_listings'] = stats['active_jobs'] + stats['active_courses'] + stats['active_products']
+    return stats
+
+
+def compute_leaderboards():
+    week_ago = timezone.now() - timedelta(days=7)
+    top_earners_week = list(
+        Transaction.objects.filter(
+            status='completed',
+            created_at__gte=week_ago,
+            transaction_type__in=EARNING_TYPES
+        ).values('user__username', 'user__date_joined').annotate(
+            total_earned=Sum('amount')
+        ).order_by('-total_earned')[:5]
+    )
+    top_referrers_week = list(
+        Referral.objects.filter(
+            joined_at__gte=week_ago
+        ).values('referrer__username', 'referrer__date_joined').annotate(
+            referral_count=Count('id')
+        ).order_by('-referral_count')[:5]
+    )
+    return {'top_earners_week': top_earners_week, 'top_referrers_week': top_referrers_week}
+
+
+def refresh_leaderboards():
+    ttl = getattr(settings, 'DASHBOARD_LEADERBOARD_TTL', DEFAULT_LEADERBOARD_TTL)
+    boards = compute_leaderboards()
+    # Kept past the TTL so readers can serve the old copy while one of them refreshes
+    cache.set(LEADERBOARD_CACHE_KEY, {'computed_at': time.time(), 'boards': boards}, ttl * 4)
+    return boards
+
+
+def get_leaderboards():
+    """Platform-wide weekly top earners/referrers, shared by every user's dashboard.
+
+    Once the cached copy is older than DASHBOARD_LEADERBOARD_TTL, the first
+    request to take the refresh lock recomputes it and everyone else keeps
+    serving the previous copy; ``refresh_dashboard_leaderboards`` can be run
+    from cron so requests never have to.
+    """
+    ttl = getattr(settings, 'DASHBOARD_LEADERBOARD_TTL', DEFAULT_LEADERBOARD_TTL)
+    cached = cache.get(LEADERBOARD_CACHE_KEY)
+    if cached is None:
+        return refresh_leaderboards()
+    if time.time() - cached['computed_at'] > ttl and cache.add(LEADERBOARD_LOCK_KEY, 1, 60):
+        try:
+            return refresh_leaderboards()
+        finally:
+            cache.delete(LEADERBOARD_LOCK_KEY)
+    return cached['boards']
@@ -1,3 +1,43 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from payments.models import Transaction
+from site_core.models import SiteSetting
+from .stats import LEADERBOARD_CACHE_KEY, get_user_stats
+
+User = get_user_model()
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.delete(LEADERBOARD_CACHE_KEY)
+        SiteSetting.invalidate_cache()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.client.force_login(self.user)
+        for transaction_type, amount in (('add_money', '500'), ('sale', '100'), ('commission', '20')):
+            Transaction.objects.create(
+                user=self.user, transaction_type=transaction_type, amount=Decimal(amount), status='completed'
+            )
+
+    def test_user_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = get_user_stats(self.user)
+        self.assertEqual(stats['balance'], Decimal('620'))
+        self.assertEqual(stats['weekly_earnings'], Decimal('120'))
+        self.assertEqual(stats['total_earnings'], Decimal('120'))
+        self.assertEqual(stats['referral_earnings'], Decimal('20'))
+        self.assertEqual(stats['active_listings'], 0)
+
+    def test_dashboard_query_budget(self):
+        self.client.get(reverse('dashboard'))  # warms site settings, leaderboards, session and user
 
-# Create your tests here.
+        # per-user stats, recent transactions
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['balance'], Decimal('620'))
+        self.assertEqual(response.context['top_earners_week'][0]['total_earned'], Decimal('120'))
@@ -1,52 +1,18 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from django.db.models import Sum, Count, Q
-from django.utils import timezone
-from datetime import timedelta
+from django.db.models import Sum, Count
 from payments.models import Transaction
 from products.models import ProductSale
 from jobs.models import Job
 from courses.models import Course
-from affiliates.models import Referral
-from accounts.models import User
+from .stats import get_leaderboards, get_user_stats
 
 @login_required
 def dashboard(request):
     user = request.user
-    week_ago = timezone.now() - timedelta(days=7)
-    
-    # Balance and earnings
-    balance_data = Transaction.get_user_balance(user)
-    print(f"🧾 DEBUG: Dashboard showing balance {balance_data} for {user.username}")
-    
-    # This week's earnings
-    weekly_earnings = Transaction.objects.filter(
-        user=user,
-        status='completed',
-        created_at__gte=week_ago,
-        transaction_type__in=['sale', 'commission']
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Total earnings
-    total_earnings = Transaction.objects.filter(
-        user=user,
-        status='completed',
-        transaction_type__in=['sale', 'commission']
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Active listings
-    active_jobs = Job.objects.filter(posted_by=user, status='approved').count()
-    active_courses = Course.objects.filter(instructor=user, status='approved').count()
-    active_products = ProductSale.objects.filter(seller=user, status='completed').count()
-    active_listings = active_jobs + active_courses + active_products
-    
-    # Referral earnings
-    referral_earnings = Transaction.objects.filter(
-        user=user,
-        transaction_type='commission',
-        status='completed'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
+
+    stats = get_user_stats(user)
+
     # Top sales
     top_sales = ProductSale.objects.filter(
         seller=user, 
@@ -74,35 +40,20 @@ def dashboard(request):
         status='approved'
     ).order_by('-created_at')[:5]
     
-    # Platform analytics (Top performers)
-    top_earners_week = Transaction.objects.filter(
-        status='completed',
-        created_at__gte=week_ago,
-        transaction_type__in=['sale', 'commission']
-    ).values('user__username').annotate(
-        total_earned=Sum('amount')
-    ).order_by('-total_earned')[:5]
-    
-    top_referrers_week = Referral.objects.filter(
-        joined_at__gte=week_ago
-    ).values('referrer__username').annotate(
-        referral_count=Count('id')
-    ).order_by('-referral_count')[:5]
+    # Platform analytics (Top performers), cached for all users
+    leaderboards = get_leaderboards()
+
     recent_transactions = Transaction.objects.filter(
         user=user
     ).order_by('-created_at')[:5]
     context = {
-        'balance': balance_data,
-        'weekly_earnings': weekly_earnings,
-        'total_earnings': total_earnings,
-        'active_listings': active_listings,
-        'referral_earnings': referral_earnings,
+        **stats,
+        'total_listings': stats['active_listings'],
         'top_sales': top_sales,
         'top_products': top_products,
         'recent_jobs': recent_jobs,
         'recent_courses': recent_courses,
-        'top_earners_week': top_earners_week,
-        'top_referrers_week': top_referrers_week,
+        **leaderboards,
         'recent_transactions': recent_transactions,
     }
     
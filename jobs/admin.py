@@ -1,5 +1,7 @@
 from django.contrib import admin
 from .models import JobCategory, Job
+from search.index import reindex_queryset
+from site_core.http_cache import invalidate_models
 
 @admin.register(JobCategory)
 class JobCategoryAdmin(admin.ModelAdmin):
@@ -25,6 +27,8 @@ class JobAdmin(admin.ModelAdmin):
 
     def approve_jobs(self, request, queryset):
         updated = queryset.update(status='approved')
+        reindex_queryset(queryset)
+        invalidate_models(queryset.model)
         self.message_user(request, f'{updated} jobs approved successfully.')
     approve_jobs.short_description = "Approve selected jobs"
 
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_alter_job_category_alter_job_favorites_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'created_at'], name='jobs_job_status_277b31_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from site_core.models import Category  # Import the global category
+from site_core.counters import increment_counter
 
 class JobCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -80,6 +81,9 @@ class Job(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
 
     def __str__(self):
         return self.title
@@ -98,4 +102,4 @@ class Job(models.Model):
 
     def increment_views(self):
         self.views_count += 1
-        self.save(update_fields=['views_count'])
\ No newline at end of file
+        increment_counter(self, 'views_count')
\ No newline at end of file
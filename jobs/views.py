@@ -6,6 +6,8 @@ from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from .models import Job
 from site_core.models import Category   # instead of JobCategory
+from site_core.http_cache import ConditionalPageMixin
+from site_core.pagination import KeysetPaginationMixin
 from .forms import JobForm
 
 
@@ -50,7 +52,7 @@ class JobManageView(LoginRequiredMixin, ListView):
         return context
     
     
-class JobListView(ListView):
+class JobListView(ConditionalPageMixin, KeysetPaginationMixin, ListView):
     model = Job
     template_name = 'jobs/list.html'
     context_object_name = 'jobs'
@@ -87,10 +89,11 @@ class JobListView(ListView):
         context['categories'] = Category.objects.filter(category_type="job", is_active=True)
         return context
 
-class JobDetailView(DetailView):
+class JobDetailView(ConditionalPageMixin, DetailView):
     model = Job
     template_name = 'jobs/detail.html'
     context_object_name = 'job'
+    hit_counter_field = 'views_count'
     
     def get_object(self):
         obj = super().get_object()
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import PaymentMethod, Transaction
+from .models import (
+    PaymentMethod, ReconciliationIssue, ReconciliationRun, Transaction, WalletBalance, WebhookEvent,
+)
 
 @admin.register(PaymentMethod)
 class PaymentMethodAdmin(admin.ModelAdmin):
@@ -27,4 +29,42 @@ class TransactionAdmin(admin.ModelAdmin):
         for transaction in queryset:
             transaction.reject("Rejected by admin")
         self.message_user(request, f'{queryset.count()} transactions rejected.')
-    reject_transactions.short_description = "Reject selected transactions"
\ No newline at end of file
+    reject_transactions.short_description = "Reject selected transactions"
+
+@admin.register(WalletBalance)
+class WalletBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'balance', 'updated_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'balance', 'updated_at')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'provider', 'event_type', 'transaction_reference', 'status', 'attempts', 'received_at')
+    list_filter = ('provider', 'status', 'event_type')
+    search_fields = ('transaction_reference',)
+    readonly_fields = ('received_at', 'processed_at', 'claimed_at')
+
+class ReconciliationIssueInline(admin.TabularInline):
+    model = ReconciliationIssue
+    fields = ('reference', 'kind', 'local_amount', 'provider_amount', 'details')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = True
+
+@admin.register(ReconciliationRun)
+class ReconciliationRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'window_start', 'window_end', 'checked_count', 'matched_count', 'issue_count',
+                    'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('status', 'window_start', 'window_end', 'checkpoint', 'checked_count', 'matched_count',
+                       'issue_count', 'last_error', 'started_at', 'updated_at', 'finished_at')
+    inlines = [ReconciliationIssueInline]
+
+@admin.register(ReconciliationIssue)
+class ReconciliationIssueAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'kind', 'local_amount', 'provider_amount', 'run', 'created_at')
+    list_filter = ('kind', 'run')
+    search_fields = ('reference',)
+    raw_id_fields = ('run', 'transaction')
@@ -0,0 +1,187 @@
+"""Local stand-in for the Monnify API, for tests and offline benchmarks.
+
+Usage::
+
+    with FakeMonnifyServer(latency=0.01) as server:
+        with override_settings(MONNIFY_BASE_URL=server.url, ...):
+            ...
+        server.stats['logins']
+
+The server speaks HTTP/1.1 with keep-alive, so ``stats['connections']``
+shows how many TCP connections clients actually opened. ``from_fixture``
+replays transactions recorded from the real API.
+"""
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+DEFAULT_BANKS = [
+    {'name': 'Wema Bank', 'code': '035'},
+    {'name': 'Sterling Bank', 'code': '232'},
+    {'name': 'Moniepoint Microfinance Bank', 'code': '50515'},
+]
+
+
+class FakeMonnifyServer:
+    def __init__(self, api_key='fake-api-key', secret_key='fake-secret-key', latency=0.0,
+                 token_lifetime=3600, banks=None, transactions=None, fail_gets=0):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.banks = list(DEFAULT_BANKS if banks is None else banks)
+        # transactionReference -> responseBody returned by the verify endpoint
+        self.transactions = dict(transactions or {})
+        # Number of upcoming GETs answered with 503, to exercise client retries
+        self.fail_gets = fail_gets
+        self.stats = Counter()
+        self.tokens = set()
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @classmethod
+    def from_fixture(cls, path, **kwargs):
+        """Server replaying recorded provider data.
+
+        ``path`` is a JSON file with "transactions" (reference -> responseBody)
+        and optionally "banks", as written by ``reconcile_monnify_transactions --record``.
+        """
+        with open(path) as fixture:
+            data = json.load(fixture)
+        kwargs.setdefault('banks', data.get('banks'))
+        return cls(transactions=data.get('transactions'), **kwargs)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                server.count('connections')
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _ok(self, body):
+                self._reply(200, {'requestSuccessful': True, 'responseMessage': 'success',
+                                  'responseCode': '0', 'responseBody': body})
+
+            def _read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _authorised(self):
+                auth = self.headers.get('Authorization', '')
+                if auth.startswith('Bearer ') and auth[7:] in server.tokens:
+                    return True
+                self._reply(401, {'requestSuccessful': False, 'responseMessage': 'Unauthorized'})
+                return False
+
+            def do_POST(self):
+                server.count('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+                body = self._read_json()
+
+                if self.path == '/api/v1/auth/login':
+                    expected = base64.b64encode(f"{server.api_key}:{server.secret_key}".encode()).decode()
+                    if self.headers.get('Authorization') != f'Basic {expected}':
+                        return self._reply(401, {'requestSuccessful': False,
+                                                 'responseMessage': 'Invalid credentials'})
+                    server.count('logins')
+                    token = uuid.uuid4().hex
+                    server.tokens.add(token)
+                    return self._ok({'accessToken': token, 'expiresIn': server.token_lifetime})
+
+                if not self._authorised():
+                    return
+                if self.path == '/api/v2/bank-transfer/reserved-accounts':
+                    server.count('reserved_accounts')
+                    reference = body.get('accountReference')
+                    return self._ok({
+                        'accountReference': reference,
+                        'accountName': body.get('accountName'),
+                        'customerEmail': body.get('customerEmail'),
+                        'customerReference': f"CUS_{reference}",
+                        'accounts': [
+                            {
+                                'bankCode': bank['code'],
+                                'bankName': bank['name'],
+                                'accountNumber': str(abs(hash((reference, bank['code']))))[:10].zfill(10),
+                                'accountName': body.get('accountName'),
+                            }
+                            for bank in server.banks
+                        ],
+                    })
+                self._reply(404, {'requestSuccessful': False, 'responseMessage': 'Not found'})
+
+            def do_GET(self):
+                server.count('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    fail = server.fail_gets > 0
+                    if fail:
+                        server.fail_gets -= 1
+                if fail:
+                    server.count('injected_failures')
+                    return self._reply(503, {'requestSuccessful': False, 'responseMessage': 'Unavailable'})
+
+                if not self._authorised():
+                    return
+                if self.path == '/api/v1/banks':
+                    return self._ok(server.banks)
+                if self.path.startswith('/api/v2/transactions/'):
+                    reference = unquote(self.path.rsplit('/', 1)[-1])
+                    record = server.transactions.get(reference)
+                    if record is None:
+                        return self._reply(404, {'requestSuccessful': False,
+                                                 'responseMessage': 'Transaction not found'})
+                    return self._ok(record)
+                self._reply(404, {'requestSuccessful': False, 'responseMessage': 'Not found'})
+
+        return Handler
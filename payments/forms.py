@@ -16,6 +16,8 @@ class AddMoneyForm(forms.ModelForm):
         return amount
 
 class WithdrawForm(forms.ModelForm):
+    idempotency_key = forms.CharField(max_length=64, required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Transaction
         fields = ['amount', 'payment_method']
@@ -33,6 +35,7 @@ class TransferForm(forms.Form):
     amount = forms.DecimalField(max_digits=10, decimal_places=2, min_value=100)
     recipient_username = forms.CharField(max_length=150)
     description = forms.CharField(required=False, widget=forms.Textarea(attrs={'rows': 2}))
+    idempotency_key = forms.CharField(max_length=64, required=False, widget=forms.HiddenInput)
     
     def clean_recipient_username(self):
         from accounts.models import User
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from payments.fake_monnify import FakeMonnifyServer
+from payments.monnify_client import AsyncMonnifyClient, MonnifyClient
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark Monnify calls against the local fake server: one-shot requests '
+        '(the old per-call handshake and login) versus the pooled client and its async variant'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=300, help='GET /api/v1/banks calls per scenario')
+        parser.add_argument('--workers', type=int, default=10, help='Concurrent callers')
+        parser.add_argument('--latency', type=float, default=0.005, help='Simulated server latency (s)')
+        parser.add_argument('--fail-gets', type=int, default=5,
+                            help='Transient 503s injected into the pooled scenario to exercise retries')
+
+    def handle(self, *args, **options):
+        calls = options['calls']
+        workers = options['workers']
+
+        with FakeMonnifyServer(latency=options['latency']) as server:
+            def one_shot(_):
+                # What every view did before: new instance, fresh login, new connection per call
+                login = requests.post(f"{server.url}/api/v1/auth/login",
+                                      auth=(server.api_key, server.secret_key), timeout=30)
+                token = login.json()['responseBody']['accessToken']
+                return requests.get(f"{server.url}/api/v1/banks",
+                                    headers={'Authorization': f'Bearer {token}'}, timeout=30).status_code
+
+            self.run_scenario('one-shot requests', server, lambda: self.threaded(one_shot, calls, workers))
+
+            client = MonnifyClient(server.url, server.api_key, server.secret_key, pool_size=workers)
+            server.fail_gets = options['fail_gets']
+            self.run_scenario(
+                'pooled client',
+                server,
+                lambda: self.threaded(lambda _: client.get('/api/v1/banks').status_code, calls, workers)
+            )
+
+            async def bulk():
+                async with AsyncMonnifyClient(client, max_concurrency=workers) as async_client:
+                    responses = await async_client.gather([('GET', '/api/v1/banks', {})] * calls)
+                return [getattr(response, 'status_code', None) for response in responses]
+
+            self.run_scenario('async client', server, lambda: asyncio.run(bulk()))
+            client.close()
+
+    def threaded(self, func, calls, workers):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, range(calls)))
+
+    def run_scenario(self, name, server, func):
+        server.stats.clear()
+        started = time.perf_counter()
+        statuses = func()
+        elapsed = time.perf_counter() - started
+        ok = sum(1 for status in statuses if status == 200)
+        self.stdout.write(
+            f'{name:<18} {elapsed:7.3f}s  {len(statuses) / elapsed:8.1f} calls/s  '
+            f'ok={ok}/{len(statuses)}  connections={server.stats["connections"]}  '
+            f'logins={server.stats["logins"]}  injected_503s={server.stats["injected_failures"]}'
+        )
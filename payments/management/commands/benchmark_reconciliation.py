@@ -0,0 +1,70 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from payments.fake_monnify import FakeMonnifyServer
+from payments.models import Transaction
+from payments.monnify_client import reset_monnify_clients
+from payments.monnify_service import MonnifyService
+from payments.reconciliation import reconcile, start_run
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark reconciliation of webhook deposits against a fake Monnify server: sequential '
+        'lookups against the worker pool (seeded rows are rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deposits', type=int, default=1000)
+        parser.add_argument('--latency', type=float, default=0.02, help='Seconds the fake server takes per request')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16])
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Only the seeded deposits fall inside the run window
+            since = timezone.now()
+            recorded = self.seed(options['deposits'])
+            with FakeMonnifyServer(latency=options['latency'], transactions=recorded) as server:
+                with override_settings(MONNIFY_BASE_URL=server.url, MONNIFY_API_KEY=server.api_key,
+                                       MONNIFY_SECRET_KEY=server.secret_key, MONNIFY_CONTRACT_CODE='0000000000'):
+                    try:
+                        for workers in options['workers']:
+                            run = start_run(since)
+                            started = time.perf_counter()
+                            reconcile(run, MonnifyService(), chunk_size=options['chunk_size'], workers=workers, rate=0)
+                            elapsed = time.perf_counter() - started
+                            self.stdout.write(
+                                f'{workers:>3} worker(s) {run.checked_count:>6} deposits {elapsed:8.2f}s '
+                                f'{run.checked_count / elapsed:8.1f}/s  {run.issue_count} issue(s)'
+                            )
+                    finally:
+                        reset_monnify_clients()
+            transaction.set_rollback(True)
+
+    def seed(self, deposits):
+        stamp = time.time_ns()
+        user = get_user_model().objects.create(username=f'recon-bench-{stamp}', referral_code=f'RB{stamp % 10**12}')
+        recorded = {}
+        rows = []
+        for n in range(deposits):
+            reference = f'MNFY|BENCH{stamp}|{n}'
+            amount = Decimal(1000 + n % 500)
+            rows.append(Transaction(
+                user=user, transaction_type='add_money', amount=amount, status='completed', reference=reference,
+                description='Bench deposit',
+                metadata={'eventType': 'SUCCESSFUL_TRANSACTION',
+                          'eventData': {'transactionReference': reference, 'paymentReference': f'PAY{stamp}{n}'}},
+            ))
+            # Every 50th deposit disagrees with the provider
+            provider_amount = amount + 1 if n % 50 == 0 else amount
+            recorded[reference] = {'transactionReference': reference, 'paymentStatus': 'PAID',
+                                   'amountPaid': float(provider_amount)}
+        Transaction.objects.bulk_create(rows, batch_size=2000)
+        return recorded
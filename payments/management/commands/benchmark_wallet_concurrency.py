@@ -0,0 +1,103 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+
+from payments import wallet_service
+from payments.models import Transaction, WalletBalance
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire parallel transfers (with client retries) from one wallet and verify '
+        'there is no overdraft and no duplicate ledger rows. Runs against the default '
+        'database; set DATABASE_ENGINE and friends to target PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transfers', type=int, default=200, help='Distinct transfers to attempt')
+        parser.add_argument('--workers', type=int, default=16, help='Parallel worker threads')
+        parser.add_argument('--amount', type=Decimal, default=Decimal('100'), help='Amount per transfer')
+        parser.add_argument('--balance', type=Decimal, default=Decimal('10000'), help='Starting sender balance')
+        parser.add_argument('--retries', type=int, default=1, help='Duplicate submissions per idempotency key')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users and rows')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        sender = User.objects.create_user(username=f'bench_sender_{tag}', password=None)
+        recipient = User.objects.create_user(username=f'bench_recipient_{tag}', password=None)
+        Transaction.objects.create(
+            user=sender,
+            transaction_type='add_money',
+            amount=options['balance'],
+            status='completed',
+            description='Benchmark seed balance'
+        )
+
+        keys = [f'{tag}-{i}' for i in range(options['transfers'])]
+        submissions = [key for key in keys for _ in range(options['retries'] + 1)]
+        results = {'created': 0, 'replayed': 0, 'insufficient': 0, 'locked': 0}
+
+        def submit(key):
+            try:
+                _, created = wallet_service.transfer(
+                    sender, recipient, options['amount'], description='benchmark', idempotency_key=key
+                )
+                return 'created' if created else 'replayed'
+            except wallet_service.InsufficientBalance:
+                return 'insufficient'
+            except OperationalError:
+                return 'locked'
+            finally:
+                connections.close_all()
+
+        self.stdout.write(
+            f'Running {len(submissions)} submissions ({len(keys)} keys) on '
+            f'{connection.vendor} with {options["workers"]} workers...'
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for outcome in pool.map(submit, submissions):
+                results[outcome] += 1
+        elapsed = time.perf_counter() - started
+
+        try:
+            self.verify(sender, tag, results)
+        finally:
+            self.stdout.write(
+                f'{elapsed:.2f}s total, {len(submissions) / elapsed:.1f} submissions/s: '
+                + ', '.join(f'{name}={count}' for name, count in results.items())
+            )
+            if not options['keep']:
+                User.objects.filter(pk__in=[sender.pk, recipient.pk]).delete()
+
+    def verify(self, sender, tag, results):
+        wallet = WalletBalance.objects.get(user=sender)
+        ledger_balance = Transaction.calculate_user_balance(sender)
+        debit_rows = Transaction.objects.filter(
+            user=sender, transaction_type='transfer', idempotency_key__startswith=tag
+        )
+        duplicates = debit_rows.values('idempotency_key').annotate(n=Count('id')).filter(n__gt=1).count()
+
+        errors = []
+        if wallet.balance < 0:
+            errors.append(f'overdraft: wallet balance is {wallet.balance}')
+        if wallet.balance != ledger_balance:
+            errors.append(f'wallet row {wallet.balance} disagrees with ledger {ledger_balance}')
+        if duplicates:
+            errors.append(f'{duplicates} idempotency keys produced more than one debit row')
+        if debit_rows.count() != results['created']:
+            errors.append(f'{debit_rows.count()} debit rows for {results["created"]} created transfers')
+
+        if errors:
+            raise CommandError('; '.join(errors))
+        self.stdout.write(self.style.SUCCESS(
+            f'No overdraft and no duplicate rows (final balance {wallet.balance})'
+        ))
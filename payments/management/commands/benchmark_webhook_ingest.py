@@ -0,0 +1,121 @@
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+
+from accounts.models import VirtualAccount
+from payments.models import Transaction, WebhookEvent
+from payments.webhooks import monnify_webhook
+from site_core.models import SiteSetting
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay signed Monnify webhook events from a JSON-lines file through the endpoint, '
+        'then drain the inbox, reporting throughput of both stages'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='JSON-lines file of {"body": ..., "signature": ...} events')
+        parser.add_argument('--generate', type=int, default=0,
+                            help='First write this many signed events for benchmark accounts to the file')
+        parser.add_argument('--accounts', type=int, default=100, help='Virtual accounts used by --generate')
+        parser.add_argument('--duplicates', type=float, default=0.05,
+                            help='Fraction of generated events that repeat an earlier reference')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            self.generate(options['file'], options['generate'], options['accounts'], options['duplicates'])
+
+        with open(options['file']) as fh:
+            events = [json.loads(line) for line in fh if line.strip()]
+        if not events:
+            raise CommandError('No events to replay')
+
+        # Benchmark accounts, events and deposits are rolled back when the run ends
+        with transaction.atomic():
+            self.create_missing_accounts(events)
+            self.replay(events, options['batch_size'])
+            transaction.set_rollback(True)
+
+    def replay(self, events, batch_size):
+        factory = RequestFactory()
+        rejected = 0
+        started = time.perf_counter()
+        for event in events:
+            request = factory.post(
+                '/webhooks/monnify/', data=event['body'], content_type='application/json',
+                HTTP_MONNIFY_SIGNATURE=event['signature']
+            )
+            if monnify_webhook(request).status_code != 200:
+                rejected += 1
+        ingest = time.perf_counter() - started
+        self.stdout.write(
+            f'Ingest: {len(events)} events in {ingest:.2f}s '
+            f'({len(events) / ingest:.0f} events/s, {ingest / len(events) * 1000:.2f} ms each), rejected={rejected}'
+        )
+
+        booked_before = Transaction.objects.filter(transaction_type='add_money').count()
+        started = time.perf_counter()
+        call_command('process_webhook_events', once=True, batch_size=batch_size, stdout=self.stdout)
+        drain = time.perf_counter() - started
+        booked = Transaction.objects.filter(transaction_type='add_money').count() - booked_before
+        self.stdout.write(
+            f'Drain: {len(events)} events in {drain:.2f}s ({len(events) / drain:.0f} events/s), '
+            f'{booked} deposits booked, {WebhookEvent.objects.filter(status="pending").count()} still pending'
+        )
+
+    def create_missing_accounts(self, events):
+        """Give each benchmark account reference in ``events`` a user and virtual account"""
+        references = set()
+        for event in events:
+            data = json.loads(event['body']).get('eventData') or {}
+            references.add((data.get('destinationAccountInformation') or {}).get('accountReference') or '')
+        existing = set(VirtualAccount.objects.filter(reference__in=references).values_list('reference', flat=True))
+        for i, reference in enumerate(sorted(ref for ref in references - existing if ref.startswith('BENCH_'))):
+            user = User.objects.create_user(username=f'bench_webhook_{reference[6:]}', password=None)
+            VirtualAccount.objects.create(
+                user=user,
+                account_number=f'9{time.time_ns() % 10 ** 9:09d}{i:06d}',
+                account_name=user.username,
+                bank_name='Benchmark Bank',
+                bank_code='000',
+                reference=reference,
+            )
+
+    def generate(self, path, count, account_count, duplicate_ratio):
+        secret = SiteSetting.get_solo().monnify_secret_key.encode()
+        tag = uuid.uuid4().hex[:8]
+        accounts = [f'BENCH_{tag}_{i}' for i in range(account_count)]
+
+        references = []
+        with open(path, 'w') as fh:
+            for i in range(count):
+                if references and random.random() < duplicate_ratio:
+                    reference = random.choice(references)
+                else:
+                    reference = f'MNFY|{tag}|{i}'
+                    references.append(reference)
+                account = random.choice(accounts)
+                body = json.dumps({
+                    'eventType': 'SUCCESSFUL_TRANSACTION',
+                    'eventData': {
+                        'transactionReference': reference,
+                        'amount': round(random.uniform(100, 50000), 2),
+                        'destinationAccountInformation': {'accountReference': account},
+                    },
+                })
+                signature = hmac.new(secret, body.encode(), hashlib.sha512).hexdigest()
+                fh.write(json.dumps({'body': body, 'signature': signature}) + '\n')
+        self.stdout.write(f'Wrote {count} signed events for {account_count} accounts to {path}')
@@ -0,0 +1,36 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import claim_webhook_events, process_webhook_batch
+
+
+class Command(BaseCommand):
+    help = 'Drain the webhook inbox in batches, booking deposits and retrying failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Events claimed per batch')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before an event is failed')
+        parser.add_argument('--once', action='store_true', help='Exit when the inbox is empty')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Idle poll interval in seconds')
+
+    def handle(self, *args, **options):
+        totals = Counter()
+        while True:
+            events = claim_webhook_events(options['batch_size'])
+            if events:
+                outcomes = process_webhook_batch(events, max_attempts=options['max_attempts'])
+                totals.update(outcomes)
+                self.stdout.write(
+                    f'Batch of {len(events)}: '
+                    + ', '.join(f'{name}={count}' for name, count in outcomes.items() if count)
+                )
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Inbox drained: ' + (', '.join(f'{name}={count}' for name, count in totals.items() if count) or 'nothing to do')
+        ))
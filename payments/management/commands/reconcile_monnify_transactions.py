@@ -0,0 +1,90 @@
+import json
+from contextlib import ExitStack
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import override_settings
+from django.utils import timezone
+
+from payments.fake_monnify import FakeMonnifyServer
+from payments.models import ReconciliationRun
+from payments.monnify_client import reset_monnify_clients
+from payments.monnify_service import MonnifyService
+from payments.reconciliation import DEFAULT_CHUNK_SIZE, DEFAULT_RATE, DEFAULT_WORKERS, reconcile, start_run
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify webhook-booked deposits against Monnify and record missing, mismatched and duplicate '
+        'ones as reconciliation issues. Resumable: --resume continues the last unfinished run from its checkpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='Only deposits created on or after this date')
+        parser.add_argument('--resume', action='store_true', help='Continue the most recent unfinished run')
+        parser.add_argument('--run', type=int, help='Continue this run')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Deposits checked per commit')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Concurrent provider lookups')
+        parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='Provider lookups per second (0: unlimited)')
+        parser.add_argument('--max-chunks', type=int, help='Stop after this many chunks; resume later')
+        parser.add_argument('--fake-provider', metavar='FIXTURE',
+                            help='Check against a local fake Monnify serving this recorded fixture')
+        parser.add_argument('--record', metavar='FIXTURE', help='Write the provider responses seen to this fixture')
+
+    def handle(self, *args, **options):
+        run = self.get_run(options)
+        self.stdout.write(f'Reconciliation #{run.pk}: deposits up to {run.window_end:%Y-%m-%d %H:%M}'
+                          + (f', resuming after {run.checked_count} checked' if run.checked_count else ''))
+        recorded = {} if options['record'] else None
+
+        with ExitStack() as stack:
+            if options['fake_provider']:
+                server = stack.enter_context(FakeMonnifyServer.from_fixture(options['fake_provider']))
+                stack.enter_context(override_settings(
+                    MONNIFY_BASE_URL=server.url, MONNIFY_API_KEY=server.api_key,
+                    MONNIFY_SECRET_KEY=server.secret_key, MONNIFY_CONTRACT_CODE='0000000000',
+                ))
+                stack.callback(reset_monnify_clients)
+            try:
+                finished = reconcile(
+                    run, MonnifyService(), chunk_size=options['chunk_size'], workers=options['workers'],
+                    rate=options['rate'], max_chunks=options['max_chunks'], on_chunk=self.report_chunk,
+                    recorded=recorded,
+                )
+            except Exception as e:
+                ReconciliationRun.objects.filter(pk=run.pk).update(status='failed', last_error=str(e))
+                raise CommandError(f'Reconciliation #{run.pk} failed: {e}; rerun with --run {run.pk}')
+            finally:
+                if recorded:
+                    with open(options['record'], 'w') as fixture:
+                        json.dump({'transactions': recorded}, fixture, indent=1, sort_keys=True)
+
+        if not finished:
+            self.stdout.write(self.style.WARNING(f'Stopped after {options["max_chunks"]} chunk(s); '
+                                                 f'continue with --run {run.pk}'))
+            return
+        kinds = run.issues.values_list('kind').annotate(n=Count('pk')).order_by('kind')
+        for kind, count in kinds:
+            self.stdout.write(f'  {kind}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciliation #{run.pk} complete: {run.checked_count} checked, {run.matched_count} matched, '
+            f'{run.issue_count} issue(s)'
+        ))
+
+    def get_run(self, options):
+        if options['run'] or options['resume']:
+            runs = ReconciliationRun.objects.exclude(status='completed')
+            run = runs.filter(pk=options['run']).first() if options['run'] else runs.first()
+            if run is None:
+                raise CommandError('No unfinished reconciliation run to continue')
+            if run.status == 'failed':
+                ReconciliationRun.objects.filter(pk=run.pk).update(status='running', last_error='')
+            return run
+        since = None
+        if options['since']:
+            since = timezone.make_aware(datetime.combine(options['since'], time.min))
+        return start_run(since)
+
+    def report_chunk(self, run, issues):
+        self.stdout.write(f'  checked {run.checked_count}, {len(issues)} new issue(s) in this chunk')
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from payments.models import Transaction, WalletBalance
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized wallet balances from the transaction ledger and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift, do not rewrite wallet balances',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of wallet rows written per bulk query',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            wallets = WalletBalance.objects.only('id', 'user_id', 'balance')
+            if not dry_run:
+                # Hold the wallet rows so concurrent ledger writes wait for the rebuild
+                wallets = wallets.select_for_update()
+            stored = {wallet.user_id: wallet for wallet in wallets}
+            expected = self.get_ledger_balances()
+            to_update, to_create = self.diff(expected, stored)
+
+            if dry_run:
+                self.stdout.write(self.style.WARNING('Dry run, no changes written'))
+                return
+
+            WalletBalance.objects.bulk_update(to_update, ['balance'], batch_size=batch_size)
+            WalletBalance.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+
+        self.stdout.write(self.style.SUCCESS('Wallet balances reconciled with the ledger'))
+
+    def get_ledger_balances(self):
+        ledger = Transaction.objects.filter(status='completed').values('user_id').annotate(
+            credits=Sum('amount', filter=Q(transaction_type__in=Transaction.CREDIT_TYPES)),
+            debits=Sum('amount', filter=Q(transaction_type__in=Transaction.DEBIT_TYPES)),
+        ).order_by()
+        return {
+            row['user_id']: (row['credits'] or Decimal('0')) - (row['debits'] or Decimal('0'))
+            for row in ledger.iterator()
+        }
+
+    def diff(self, expected, stored):
+        to_update = []
+        to_create = []
+        total_drift = Decimal('0')
+
+        for user_id in expected.keys() | stored.keys():
+            balance = expected.get(user_id, Decimal('0'))
+            wallet = stored.get(user_id)
+            if wallet is None:
+                to_create.append(WalletBalance(user_id=user_id, balance=balance))
+                if balance:
+                    total_drift += abs(balance)
+                    self.stdout.write(f'User {user_id}: missing wallet row, ledger balance {balance}')
+            elif wallet.balance != balance:
+                total_drift += abs(wallet.balance - balance)
+                self.stdout.write(f'User {user_id}: stored {wallet.balance}, ledger {balance}')
+                wallet.balance = balance
+                to_update.append(wallet)
+
+        self.stdout.write(
+            f'{len(to_update)} drifted and {len(to_create)} missing wallet rows '
+            f'(total absolute drift {total_drift})'
+        )
+        return to_update, to_create
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.monnify_service import MonnifyService
+
+
+class Command(BaseCommand):
+    help = (
+        'Fetch the Monnify bank catalogue and apply only the differences to MonnifyBank '
+        '(new, renamed and vanished banks). Safe to run from cron.'
+    )
+
+    def handle(self, *args, **options):
+        success, message = MonnifyService().sync_banks_to_database()
+        if not success:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
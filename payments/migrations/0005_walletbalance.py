@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0004_alter_paymentmethod_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_balance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Wallet Balance',
+                'verbose_name_plural': 'Wallet Balances',
+            },
+        ),
+    ]
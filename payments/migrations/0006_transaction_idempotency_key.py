@@ -0,0 +1,27 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_walletbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('add_money', 'Add Money'), ('withdraw', 'Withdraw'), ('transfer', 'Transfer'), ('transfer_in', 'Transfer Received'), ('sale', 'Sale'), ('commission', 'Commission'), ('admin_fee', 'Admin Fee')], max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='unique_transaction_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('window_start', models.DateTimeField(blank=True, null=True)),
+                ('window_end', models.DateTimeField()),
+                ('checkpoint', models.CharField(blank=True, max_length=200)),
+                ('checked_count', models.PositiveIntegerField(default=0)),
+                ('matched_count', models.PositiveIntegerField(default=0)),
+                ('issue_count', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationIssue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('missing', 'Missing at provider'), ('amount_mismatch', 'Amount differs'), ('status_mismatch', 'Not paid at provider'), ('duplicate_reference', 'Duplicate payment reference'), ('unverified', 'Could not be verified')], max_length=30)),
+                ('local_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('provider_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='issues', to='payments.reconciliationrun')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_issues', to='payments.transaction')),
+            ],
+            options={
+                'ordering': ['run', 'kind', 'reference'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reconciliationissue',
+            constraint=models.UniqueConstraint(fields=('run', 'reference', 'kind'), name='unique_reconciliation_issue'),
+        ),
+    ]
@@ -2,8 +2,13 @@ from django.db import models
 from django.conf import settings
 from accounts.models import User
 from django.utils import timezone
-from django.db.models import Sum
+from django.db import transaction as db_transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from decimal import Decimal
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +39,7 @@ class Transaction(models.Model):
         ('add_money', 'Add Money'),
         ('withdraw', 'Withdraw'),
         ('transfer', 'Transfer'),
+        ('transfer_in', 'Transfer Received'),
         ('sale', 'Sale'),
         ('commission', 'Commission'),
         ('admin_fee', 'Admin Fee'),
@@ -46,6 +52,10 @@ class Transaction(models.Model):
         ('completed', 'Completed'),
     ]
 
+    CREDIT_TYPES = ['add_money', 'transfer_in', 'sale', 'commission']
+    DEBIT_TYPES = ['withdraw', 'transfer', 'admin_fee']
+    LEDGER_FIELDS = {'user_id', 'transaction_type', 'amount', 'status'}
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -53,6 +63,7 @@ class Transaction(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     payment_method = models.ForeignKey(PaymentMethod, on_delete=models.SET_NULL, null=True, blank=True)
     reference = models.CharField(max_length=100, unique=True)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
     description = models.TextField()
     metadata = models.JSONField(null=True, blank=True)
     rejection_reason = models.TextField(blank=True)
@@ -65,53 +76,76 @@ class Transaction(models.Model):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['reference']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                name='unique_transaction_idempotency_key'
+            ),
         ]
-    
-    @classmethod
-    def get_user_balance(cls, user):
-        """Calculate user's available balance with debug info"""
-        print(f"\n🧮 DEBUG: Calculating balance for user: {user.username}")
 
-        completed_transactions = cls.objects.filter(user=user, status='completed')
-        print(f"✅ Completed transactions count: {completed_transactions.count()}")
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.LEDGER_FIELDS.issubset(field_names):
+            instance._ledger_state = instance.get_ledger_state()
+        return instance
 
-        credits = completed_transactions.filter(
-            transaction_type__in=['add_money', 'sale', 'commission']
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        print(f"💰 Credits total: {credits}")
+    def save(self, *args, **kwargs):
+        if not self.reference:
+            self.reference = f"TXN_{uuid.uuid4().hex[:20].upper()}"
 
-        debits = completed_transactions.filter(
-            transaction_type__in=['withdraw', 'transfer', 'admin_fee']
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        print(f"💸 Debits total: {debits}")
+        with db_transaction.atomic():
+            previous = self._get_previous_ledger_state()
+            super().save(*args, **kwargs)
+            current = self.get_ledger_state()
+            if previous != current:
+                # A rebuilt row already reflects this save, so it takes no further deltas
+                rebuilt = set()
+                if previous and previous[1] and not WalletBalance.adjust(previous[0], -previous[1]):
+                    rebuilt.add(previous[0])
+                if current[1] and current[0] not in rebuilt:
+                    WalletBalance.adjust(current[0], current[1])
+        self._ledger_state = current
 
-        balance = credits - debits
-        print(f"📊 Final computed balance: {balance}\n")
+    def _get_previous_ledger_state(self):
+        if self._state.adding:
+            return None
+        if hasattr(self, '_ledger_state'):
+            return self._ledger_state
+        stored = type(self).objects.filter(pk=self.pk).first()
+        return stored.get_ledger_state() if stored else None
 
-        # Also log it in case you have Django logging enabled
-        logger.info(f"User {user.username} balance calculated: {balance}")
+    def get_ledger_amount(self):
+        """Signed effect of this transaction on the owner's wallet balance"""
+        if self.status != 'completed':
+            return Decimal('0')
+        if self.transaction_type in self.CREDIT_TYPES:
+            return Decimal(self.amount)
+        if self.transaction_type in self.DEBIT_TYPES:
+            return -Decimal(self.amount)
+        return Decimal('0')
 
-        return balance
+    def get_ledger_state(self):
+        return (self.user_id, self.get_ledger_amount())
     
-    
-
     @classmethod
     def get_user_balance(cls, user):
-        """Calculate user's available balance"""
-        completed_transactions = cls.objects.filter(
-            user=user,
-            status='completed'
+        """Return user's available balance from the materialized wallet row"""
+        balance = WalletBalance.objects.filter(user=user).values_list('balance', flat=True).first()
+        if balance is None:
+            balance = WalletBalance.rebuild_for_user(user).balance
+        return balance
+
+    @classmethod
+    def calculate_user_balance(cls, user):
+        """Calculate user's available balance by aggregating the full ledger"""
+        totals = cls.objects.filter(user=user, status='completed').aggregate(
+            credits=Sum('amount', filter=models.Q(transaction_type__in=cls.CREDIT_TYPES)),
+            debits=Sum('amount', filter=models.Q(transaction_type__in=cls.DEBIT_TYPES)),
         )
-        
-        credits = completed_transactions.filter(
-            transaction_type__in=['add_money', 'sale', 'commission']
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        debits = completed_transactions.filter(
-            transaction_type__in=['withdraw', 'transfer', 'admin_fee']
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        return credits - debits
+        return (totals['credits'] or Decimal('0')) - (totals['debits'] or Decimal('0'))
 
     @classmethod
     def get_total_platform_balance(cls):
@@ -147,6 +181,146 @@ class Transaction(models.Model):
     def __str__(self):
             return f"{self.user.username} - {self.transaction_type} - ₦{self.amount}"
 
+class WalletBalance(models.Model):
+    """Materialized per-user balance, kept in step with completed transactions"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallet_balance')
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Wallet Balance'
+        verbose_name_plural = 'Wallet Balances'
+
+    def __str__(self):
+        return f"{self.user.username} - ₦{self.balance}"
+
+    @classmethod
+    def adjust(cls, user_id, delta, create_missing=True):
+        """Apply a signed delta atomically; rebuild from the ledger if the row is missing.
+
+        Returns False when the delta was not applied to an existing row.
+        """
+        updated = cls.objects.filter(user_id=user_id).update(
+            balance=F('balance') + delta,
+            updated_at=timezone.now()
+        )
+        if not updated and create_missing:
+            cls.rebuild_for_user(user_id)
+        return bool(updated)
+
+    @classmethod
+    def rebuild_for_user(cls, user):
+        """Recompute the balance from the transaction ledger and store it"""
+        user_id = getattr(user, 'pk', user)
+        with db_transaction.atomic():
+            balance = Transaction.calculate_user_balance(user_id)
+            wallet, created = cls.objects.update_or_create(
+                user_id=user_id,
+                defaults={'balance': balance}
+            )
+        return wallet
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction_from_wallet_balance(sender, instance, **kwargs):
+    user_id, amount = instance.get_ledger_state()
+    if amount:
+        WalletBalance.adjust(user_id, -amount, create_missing=False)
+
+
+class WebhookEvent(models.Model):
+    """Raw provider webhook, stored on receipt and processed by process_webhook_events"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('duplicate', 'Duplicate'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+
+    provider = models.CharField(max_length=20, default='monnify')
+    raw_body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    event_type = models.CharField(max_length=50, blank=True)
+    transaction_reference = models.CharField(max_length=100, blank=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} webhook #{self.pk} ({self.status})"
+
+
+class ReconciliationRun(models.Model):
+    """One pass of reconcile_monnify_transactions; the checkpoint lets an interrupted run resume"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    # Deposits created in [window_start, window_end]; the end is fixed when the run starts
+    window_start = models.DateTimeField(null=True, blank=True)
+    window_end = models.DateTimeField()
+    # Keyset cursor (see site_core.pagination) after the last fully checked chunk
+    checkpoint = models.CharField(max_length=200, blank=True)
+    checked_count = models.PositiveIntegerField(default=0)
+    matched_count = models.PositiveIntegerField(default=0)
+    issue_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Reconciliation #{self.pk} ({self.status})"
+
+
+class ReconciliationIssue(models.Model):
+    """A local deposit that does not agree with what Monnify reports"""
+    KIND_CHOICES = [
+        ('missing', 'Missing at provider'),
+        ('amount_mismatch', 'Amount differs'),
+        ('status_mismatch', 'Not paid at provider'),
+        ('duplicate_reference', 'Duplicate payment reference'),
+        ('unverified', 'Could not be verified'),
+    ]
+
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='issues')
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='reconciliation_issues')
+    reference = models.CharField(max_length=100)
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    local_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    provider_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    details = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run', 'kind', 'reference']
+        constraints = [
+            # A chunk re-checked after an interrupted run does not report twice
+            models.UniqueConstraint(fields=['run', 'reference', 'kind'], name='unique_reconciliation_issue'),
+        ]
+
+    def __str__(self):
+        return f"{self.reference}: {self.get_kind_display()}"
+
+
 class ManualDeposit(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending Review'),
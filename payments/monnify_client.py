@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from site_core.perf import record_http
+
+try:
+    import httpx
+except ImportError:  # httpx is optional; the async client falls back to the pooled session
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+TOKEN_REFRESH_MARGIN = 120  # seconds before expiry at which the token is refreshed
+DEFAULT_TOKEN_LIFETIME = 55 * 60
+
+
+class MonnifyAuthError(requests.exceptions.RequestException):
+    """Raised when Monnify refuses or fails to issue an access token"""
+
+
+class TokenCache:
+    """Thread-safe access token shared by every client using the same credentials.
+
+    Callers inside the refresh margin keep using the still-valid token while a
+    single thread fetches its replacement, so an expiring token never stalls
+    concurrent requests behind the login round trip.
+    """
+
+    def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    def get(self, fetch):
+        now = time.monotonic()
+        if self._token and now < self._expires_at - self.refresh_margin:
+            return self._token
+
+        # Inside the refresh window: whoever wins the lock refreshes, the rest reuse
+        blocking = not (self._token and now < self._expires_at)
+        if not self._lock.acquire(blocking=blocking):
+            return self._token
+        try:
+            if self._token and time.monotonic() < self._expires_at - self.refresh_margin:
+                return self._token
+            token, lifetime = fetch()
+            self._token = token
+            self._expires_at = time.monotonic() + lifetime
+            return token
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+
+class MonnifyClient:
+    """Process-wide Monnify HTTP client with a keep-alive connection pool.
+
+    Idempotent GETs are retried with exponential backoff on connection errors
+    and 429/5xx responses; POSTs are never retried automatically.
+    """
+
+    def __init__(self, base_url, api_key, secret_key, pool_size=20, retries=3, backoff_factor=0.3,
+                 timeout=DEFAULT_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.timeout = timeout
+        self.token_cache = TokenCache()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _fetch_token(self):
+        response = self.session.post(
+            f"{self.base_url}/api/v1/auth/login",
+            auth=(self.api_key, self.secret_key),
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise MonnifyAuthError(f"HTTP error {response.status_code}: {response.text}")
+        data = response.json()
+        if not data.get('requestSuccessful'):
+            raise MonnifyAuthError(data.get('responseMessage', 'Authentication failed'))
+        body = data['responseBody']
+        logger.debug("Obtained Monnify access token from %s", self.base_url)
+        return body['accessToken'], int(body.get('expiresIn') or DEFAULT_TOKEN_LIFETIME)
+
+    def get_access_token(self):
+        return self.token_cache.get(self._fetch_token)
+
+    def request(self, method, path, **kwargs):
+        """Send an authenticated request, re-authenticating once if the token was revoked"""
+        kwargs.setdefault('timeout', self.timeout)
+        response = self._send(method, path, **kwargs)
+        if response.status_code == 401:
+            self.token_cache.invalidate()
+            response = self._send(method, path, **kwargs)
+        return response
+
+    def _send(self, method, path, **kwargs):
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers['Authorization'] = f'Bearer {self.get_access_token()}'
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+        finally:
+            record_http((time.perf_counter() - started) * 1000)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncMonnifyClient:
+    """Async variant for bulk operations, sharing the sync client's token cache.
+
+    Uses an ``httpx.AsyncClient`` connection pool when httpx is installed and
+    otherwise runs requests on the pooled ``requests.Session`` in worker threads.
+    Concurrency is bounded by ``max_concurrency``.
+    """
+
+    def __init__(self, client=None, max_concurrency=10):
+        self.client = client or get_monnify_client()
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._http = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if httpx is not None:
+            self._http = httpx.AsyncClient(
+                base_url=self.client.base_url,
+                timeout=httpx.Timeout(self.client.timeout[1], connect=self.client.timeout[0]),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                transport=httpx.AsyncHTTPTransport(retries=1),
+            )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def request(self, method, path, **kwargs):
+        async with self._semaphore:
+            if self._http is None:
+                return await asyncio.to_thread(self.client.request, method, path, **kwargs)
+
+            token = await asyncio.to_thread(self.client.get_access_token)
+            response = await self._http.request(
+                method, path, headers={'Authorization': f'Bearer {token}'}, **kwargs
+            )
+            if response.status_code == 401:
+                self.client.token_cache.invalidate()
+                token = await asyncio.to_thread(self.client.get_access_token)
+                response = await self._http.request(
+                    method, path, headers={'Authorization': f'Bearer {token}'}, **kwargs
+                )
+            return response
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def gather(self, calls):
+        """Run (method, path, kwargs) tuples concurrently, returning responses or exceptions"""
+        return await asyncio.gather(
+            *(self.request(method, path, **kwargs) for method, path, kwargs in calls),
+            return_exceptions=True
+        )
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_monnify_client(base_url=None, api_key=None, secret_key=None):
+    """Return the shared client for the given (or configured) credentials"""
+    base_url = base_url or getattr(settings, 'MONNIFY_BASE_URL', None)
+    api_key = api_key or getattr(settings, 'MONNIFY_API_KEY', None)
+    secret_key = secret_key or getattr(settings, 'MONNIFY_SECRET_KEY', None)
+    key = (base_url, api_key, secret_key)
+
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = MonnifyClient(base_url, api_key, secret_key)
+    return client
+
+
+def reset_monnify_clients():
+    """Drop all shared clients (used by tests and after credential rotation)"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
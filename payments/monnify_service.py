@@ -1,9 +1,11 @@
 import requests
 import json
 import logging
+from urllib.parse import quote
 from django.conf import settings
-from django.utils import timezone
-from site_core.models import SiteSetting
+from django.db import transaction
+from site_core.models import MonnifyBank, SiteSetting
+from .monnify_client import MonnifyAuthError, get_monnify_client
 
 
 logger = logging.getLogger(__name__)
@@ -18,63 +20,38 @@ class MonnifyService:
             self.contract_code = getattr(settings, 'MONNIFY_CONTRACT_CODE', None)
 
             # Optionally still load SiteSetting for prefix/default bank
-            self.site_settings = SiteSetting.get_solo() if SiteSetting.objects.exists() else None
+            self.site_settings = SiteSetting.get_solo()
 
-            self.access_token = None
-            self.token_expiry = None
-
-            # 🔍 Debug output to trace configuration loading
-            logger.info("🔍 [Monnify Config Check]")
-            logger.info(f"Base URL: {self.base_url or '❌ Missing'}")
-            logger.info(f"API Key: {self.api_key[:6] + '****' if self.api_key else '❌ Missing'}")
-            logger.info(f"Secret Key: {self.secret_key[:6] + '****' if self.secret_key else '❌ Missing'}")
-            logger.info(f"Contract Code: {self.contract_code or '❌ Missing'}")
+            # One DEBUG record, only built when DEBUG is enabled for this module
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Monnify config loaded", extra={
+                    'base_url': self.base_url or 'missing',
+                    'api_key': self.api_key[:6] + '****' if self.api_key else 'missing',
+                    'secret_key': self.secret_key[:6] + '****' if self.secret_key else 'missing',
+                    'contract_code': self.contract_code or 'missing',
+                })
 
             # Validate configuration early
             if not all([self.base_url, self.api_key, self.secret_key, self.contract_code]):
                 raise ValueError("Missing Monnify environment variables. Please check your .env file.")
 
+            # Shared, pooled client: token and connections outlive this instance
+            self.client = get_monnify_client(self.base_url, self.api_key, self.secret_key)
+
         except Exception as e:
-            logger.exception(f"🚨 Error initializing Monnify service: {str(e)}")
+            logger.exception("🚨 Error initializing Monnify service: %s", e)
             raise
 
 
     def _get_access_token(self):
-        """Authenticate with Monnify API"""
-        if self.access_token and self.token_expiry and timezone.now() < self.token_expiry:
-            logger.info("✅ Using cached Monnify token.")
-            return self.access_token
-
-        url = f"{self.base_url}/api/v1/auth/login"
-        logger.info(f"🔑 Requesting Monnify token from {url}")
-
+        """Return the process-wide Monnify token, refreshing it ahead of expiry"""
         try:
-            response = requests.post(
-                url,
-                auth=(self.api_key, self.secret_key),
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
-
-            logger.info(f"📡 [Monnify Auth] Response Code: {response.status_code}")
-            logger.debug(f"📡 [Monnify Auth] Raw Response: {response.text}")
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('requestSuccessful'):
-                    self.access_token = data['responseBody']['accessToken']
-                    self.token_expiry = timezone.now() + timezone.timedelta(minutes=55)
-                    logger.info("✅ Monnify access token obtained successfully.")
-                    return self.access_token
-                else:
-                    logger.error(f"❌ Auth failed: {data.get('responseMessage')}")
-                    return None
-            else:
-                logger.error(f"❌ HTTP error: {response.status_code} - {response.text}")
-                return None
-
+            return self.client.get_access_token()
+        except MonnifyAuthError as e:
+            logger.error("❌ Auth failed: %s", e)
+            return None
         except requests.exceptions.RequestException as e:
-            logger.exception(f"🚨 Auth request failed: {str(e)}")
+            logger.exception("🚨 Auth request failed: %s", e)
             return None
 
     def create_reserved_account(self, user, kyc_data, preferred_banks=None):
@@ -83,8 +60,6 @@ class MonnifyService:
         if not access_token:
             return None, "Failed to authenticate with Monnify. Please check API configuration."
 
-        url = f"{self.base_url}/api/v2/bank-transfer/reserved-accounts"
-        
         # Generate unique reference
         from django.utils.crypto import get_random_string
         reference = f"{self.site_settings.account_reference_prefix}_{user.id}_{get_random_string(8).upper()}"
@@ -110,36 +85,28 @@ class MonnifyService:
         }
 
         try:
-            logger.info(f"Creating Monnify account for user {user.username} with reference {reference}")
+            logger.info("Creating Monnify account for user %s with reference %s", user.username, reference)
             
-            response = requests.post(
-                url,
-                json=payload,
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {access_token}'
-                },
-                timeout=30
-            )
+            response = self.client.post("/api/v2/bank-transfer/reserved-accounts", json=payload)
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get('requestSuccessful'):
-                    logger.info(f"Monnify account created successfully for user {user.username}")
+                    logger.info("Monnify account created successfully for user %s", user.username)
                     return data['responseBody'], None
                 else:
                     error_msg = data.get('responseMessage', 'Account creation failed')
-                    logger.error(f"Monnify account creation failed for {user.username}: {error_msg}")
+                    logger.error("Monnify account creation failed for %s: %s", user.username, error_msg)
                     return None, f"Monnify error: {error_msg}"
             else:
-                logger.error(f"Monnify HTTP error for {user.username}: {response.status_code} - {response.text}")
+                logger.error("Monnify HTTP error for %s: %s - %s", user.username, response.status_code, response.text)
                 return None, f"HTTP error {response.status_code}: Please try again later"
                 
         except requests.exceptions.Timeout:
-            logger.error(f"Monnify request timeout for user {user.username}")
+            logger.error("Monnify request timeout for user %s", user.username)
             return None, "Request timeout. Please try again."
         except requests.exceptions.RequestException as e:
-            logger.error(f"Monnify request failed for {user.username}: {str(e)}")
+            logger.error("Monnify request failed for %s: %s", user.username, e)
             return None, f"Network error: {str(e)}"
 
     def get_banks(self):
@@ -148,78 +115,97 @@ class MonnifyService:
         if not access_token:
             return None
 
-        url = f"{self.base_url}/api/v1/banks"
-        
         try:
-            response = requests.get(
-                url,
-                headers={
-                    'Authorization': f'Bearer {access_token}'
-                },
-                timeout=30
-            )
+            response = self.client.get("/api/v1/banks")
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get('requestSuccessful'):
                     return data['responseBody']
                 else:
-                    logger.error(f"Monnify banks fetch failed: {data}")
+                    logger.error("Monnify banks fetch failed: %s", data)
                     return None
             else:
-                logger.error(f"Monnify banks HTTP error: {response.status_code}")
+                logger.error("Monnify banks HTTP error: %s", response.status_code)
                 return None
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Monnify banks request failed: {str(e)}")
+            logger.error("Monnify banks request failed: %s", e)
             return None
 
     def verify_transaction(self, transaction_reference):
         """Verify transaction status"""
+        state, body = self.lookup_transaction(transaction_reference)
+        return body if state == 'found' else None
+
+    def lookup_transaction(self, transaction_reference):
+        """Fetch a transaction, telling "Monnify has no such transaction" apart from a failed call.
+
+        Returns ('found', responseBody), ('missing', None) or ('error', message).
+        """
         access_token = self._get_access_token()
         if not access_token:
-            return None
+            return 'error', "Failed to authenticate with Monnify"
 
-        url = f"{self.base_url}/api/v2/transactions/{transaction_reference}"
-        
         try:
-            response = requests.get(
-                url,
-                headers={
-                    'Authorization': f'Bearer {access_token}'
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('requestSuccessful'):
-                    return data['responseBody']
-                else:
-                    return None
-            else:
-                return None
-                
-        except requests.exceptions.RequestException:
-            return None
+            # Monnify references contain "|", which must be escaped in the path
+            response = self.client.get(f"/api/v2/transactions/{quote(transaction_reference, safe='')}")
+        except requests.exceptions.RequestException as e:
+            return 'error', f"Network error: {str(e)}"
+
+        if response.status_code == 404:
+            return 'missing', None
+        if response.status_code != 200:
+            return 'error', f"HTTP error {response.status_code}"
+        data = response.json()
+        if data.get('requestSuccessful'):
+            return 'found', data['responseBody']
+        return 'error', data.get('responseMessage', 'Lookup failed')
 
     def sync_banks_to_database(self):
-        """Sync available banks from Monnify to database"""
+        """Sync available banks from Monnify to database.
+
+        The catalogue is fetched once and diffed in memory against the stored
+        rows; only new, renamed, reactivated or vanished banks are written, in
+        one transaction. Banks Monnify no longer lists are deactivated.
+        """
         banks = self.get_banks()
         if not banks:
             return False, "Failed to fetch banks from Monnify"
 
         try:
-            for bank in banks:
-                MonnifyBank.objects.update_or_create(
-                    bank_code=bank['code'],
-                    defaults={
-                        'bank_name': bank['name'],
-                        'is_active': True
-                    }
-                )
-            logger.info("Successfully synced banks from Monnify")
-            return True, "Banks synced successfully"
+            remote = {str(bank['code']): bank['name'] for bank in banks}
+            existing = {bank.bank_code: bank for bank in MonnifyBank.objects.all()}
+
+            to_create = [
+                MonnifyBank(bank_code=code, bank_name=name, is_active=True)
+                for code, name in remote.items() if code not in existing
+            ]
+            to_update = []
+            deactivated = 0
+            for code, bank in existing.items():
+                name = remote.get(code)
+                if name is None:
+                    if bank.is_active:
+                        bank.is_active = False
+                        to_update.append(bank)
+                        deactivated += 1
+                elif bank.bank_name != name or not bank.is_active:
+                    bank.bank_name = name
+                    bank.is_active = True
+                    to_update.append(bank)
+
+            if to_create or to_update:
+                with transaction.atomic():
+                    MonnifyBank.objects.bulk_create(to_create, batch_size=500)
+                    MonnifyBank.objects.bulk_update(to_update, ['bank_name', 'is_active'], batch_size=500)
+                    # bulk writes skip MonnifyBank.save, which normally drops the cached list
+                    MonnifyBank._invalidate_after_write()
+
+            summary = (f"{len(to_create)} added, {len(to_update) - deactivated} updated, "
+                       f"{deactivated} deactivated, {len(existing) - len(to_update)} unchanged")
+            logger.info("Successfully synced banks from Monnify: %s", summary)
+            return True, f"Banks synced successfully ({summary})"
         except Exception as e:
-            logger.error(f"Error syncing banks: {str(e)}")
-            return False, f"Error syncing banks: {str(e)}"
\ No newline at end of file
+            logger.error("Error syncing banks: %s", e)
+            return False, f"Error syncing banks: {str(e)}"
@@ -0,0 +1,193 @@
+"""Reconcile webhook-booked Monnify deposits against the provider.
+
+Deposits booked from webhooks are trusted as received. A reconciliation run
+walks those ``add_money`` transactions in keyset chunks, oldest first, and
+looks each one up with ``MonnifyService.lookup_transaction``. Lookups run
+concurrently on a thread pool that shares one token and connection pool, and
+a rate limiter keeps them under the provider's request budget. Disagreements
+become ReconciliationIssue rows:
+
+- ``missing``: Monnify has no such transaction
+- ``amount_mismatch``: Monnify reports a different amount paid
+- ``status_mismatch``: Monnify does not report the transaction as paid
+- ``duplicate_reference``: two local deposits share one provider payment reference
+- ``unverified``: the lookup kept failing, so rerun later
+
+The issues of a chunk and the run's checkpoint are committed together. An
+interrupted run therefore resumes after its last finished chunk and never
+reports an issue twice.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.fields.json import KT
+from django.utils import timezone
+
+from site_core.pagination import KeysetPaginator
+
+from .models import ReconciliationIssue, ReconciliationRun, Transaction
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 20  # provider lookups per second
+PAID_STATUSES = {'PAID', 'OVERPAID'}
+
+
+class RateLimiter:
+    """Spaces calls from any number of threads at least 1/rate seconds apart"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def provider_deposits():
+    """Deposits booked from Monnify webhooks (manual deposits never touch the provider)"""
+    return Transaction.objects.filter(
+        transaction_type='add_money', status='completed', metadata__eventType='SUCCESSFUL_TRANSACTION',
+    )
+
+
+def start_run(since=None):
+    return ReconciliationRun.objects.create(window_start=since, window_end=timezone.now())
+
+
+def _run_queryset(run):
+    deposits = provider_deposits().filter(created_at__lte=run.window_end)
+    if run.window_start:
+        deposits = deposits.filter(created_at__gte=run.window_start)
+    return deposits.only('id', 'reference', 'amount', 'created_at')
+
+
+def _provider_amount(record):
+    value = record.get('amountPaid', record.get('amount'))
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, TypeError):
+        return None
+
+
+def compare(txn, state, body):
+    """The issue a lookup result reveals for ``txn``, or None when both sides agree"""
+    issue = ReconciliationIssue(transaction_id=txn.pk, reference=txn.reference, local_amount=txn.amount)
+    if state == 'missing':
+        issue.kind = 'missing'
+    elif state == 'error':
+        issue.kind = 'unverified'
+        issue.details = {'error': body}
+    elif (body.get('paymentStatus') or '').upper() not in PAID_STATUSES:
+        issue.kind = 'status_mismatch'
+        issue.provider_amount = _provider_amount(body)
+        issue.details = {'paymentStatus': body.get('paymentStatus')}
+    else:
+        amount = _provider_amount(body)
+        if amount == txn.amount:
+            return None
+        issue.kind = 'amount_mismatch'
+        issue.provider_amount = amount
+    return issue
+
+
+def reconcile(run, service, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+              max_chunks=None, on_chunk=None, recorded=None):
+    """Check the run's deposits from its checkpoint on; returns True once the run is complete.
+
+    ``on_chunk(run, issues)`` is called after each committed chunk. ``recorded``
+    is an optional dict that collects every responseBody seen, keyed by
+    reference, so the run can be replayed offline.
+    """
+    paginator = KeysetPaginator(_run_queryset(run), chunk_size, descending=False)
+    limiter = RateLimiter(rate)
+
+    def lookup(txn):
+        limiter.wait()
+        try:
+            return service.lookup_transaction(txn.reference)
+        except Exception as e:
+            return 'error', str(e)
+
+    chunks = 0
+    finished = False
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while not finished and (max_chunks is None or chunks < max_chunks):
+            page = paginator.page(run.checkpoint or None)
+            rows = list(page)
+            if not rows:
+                finished = True
+                break
+            issues = []
+            for txn, (state, body) in zip(rows, pool.map(lookup, rows)):
+                if recorded is not None and state == 'found':
+                    recorded[txn.reference] = body
+                issue = compare(txn, state, body)
+                if issue is not None:
+                    issue.run = run
+                    issues.append(issue)
+            _commit_chunk(run, rows, issues, paginator.encode_cursor(rows[-1]))
+            chunks += 1
+            if on_chunk:
+                on_chunk(run, issues)
+            finished = not page.has_next()
+    if not finished:
+        return False
+
+    duplicates = _duplicate_reference_issues(run)
+    with transaction.atomic():
+        ReconciliationIssue.objects.bulk_create(duplicates, ignore_conflicts=True)
+        ReconciliationRun.objects.filter(pk=run.pk).update(
+            status='completed', finished_at=timezone.now(), issue_count=F('issue_count') + len(duplicates),
+        )
+    run.refresh_from_db()
+    return True
+
+
+def _commit_chunk(run, rows, issues, checkpoint):
+    with transaction.atomic():
+        ReconciliationIssue.objects.bulk_create(issues, ignore_conflicts=True)
+        ReconciliationRun.objects.filter(pk=run.pk).update(
+            checkpoint=checkpoint,
+            checked_count=F('checked_count') + len(rows),
+            matched_count=F('matched_count') + len(rows) - len(issues),
+            issue_count=F('issue_count') + len(issues),
+        )
+    run.checkpoint = checkpoint
+    run.checked_count += len(rows)
+    run.matched_count += len(rows) - len(issues)
+    run.issue_count += len(issues)
+
+
+def _duplicate_reference_issues(run):
+    """Deposits in the run's window that share a provider paymentReference"""
+    deposits = _run_queryset(run)
+    key = 'metadata__eventData__paymentReference'
+    shared = [
+        reference for reference, _ in
+        deposits.annotate(payment_reference=KT(key)).values_list('payment_reference')
+        .annotate(n=Count('pk')).filter(n__gt=1).order_by()
+        if reference
+    ]
+    if not shared:
+        return []
+    return [
+        ReconciliationIssue(
+            run=run, transaction_id=txn.pk, reference=txn.reference, kind='duplicate_reference',
+            local_amount=txn.amount, details={'paymentReference': txn.payment_reference},
+        )
+        for txn in deposits.filter(**{f'{key}__in': shared}).annotate(payment_reference=KT(key))
+        .order_by('payment_reference', 'pk')
+    ]
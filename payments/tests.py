@@ -1,3 +1,379 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import VirtualAccount
+from site_core.models import MonnifyBank
+
+from . import wallet_service
+from .fake_monnify import FakeMonnifyServer
+from .monnify_client import reset_monnify_clients
+from .monnify_service import MonnifyService
+from .models import ReconciliationRun, Transaction, WalletBalance, WebhookEvent
+from .reconciliation import reconcile, start_run
+
+User = get_user_model()
+
+
+class WalletBalanceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='walletuser',
+            email='wallet@example.com',
+            password='testpass123'
+        )
+
+    def test_balance_follows_status_changes(self):
+        deposit = Transaction.objects.create(
+            user=self.user,
+            transaction_type='add_money',
+            amount=1000,
+            status='pending'
+        )
+        self.assertEqual(Transaction.get_user_balance(self.user), 0)
+
+        deposit.status = 'completed'
+        deposit.save()
+        self.assertEqual(Transaction.get_user_balance(self.user), 1000)
+
+        deposit.status = 'rejected'
+        deposit.save()
+        self.assertEqual(Transaction.get_user_balance(self.user), 0)
+
+    def test_editing_completed_transaction_without_wallet_row(self):
+        deposit = Transaction.objects.create(
+            user=self.user,
+            transaction_type='add_money',
+            amount=1000,
+            status='completed'
+        )
+        WalletBalance.objects.filter(user=self.user).delete()  # as for ledgers older than the wallet table
+
+        deposit.amount = 1500
+        deposit.save()
+        self.assertEqual(WalletBalance.objects.get(user=self.user).balance, 1500)
+
+    def test_balance_read_is_single_query(self):
+        Transaction.objects.create(
+            user=self.user,
+            transaction_type='add_money',
+            amount=1000,
+            status='completed'
+        )
+        with self.assertNumQueries(1):
+            Transaction.get_user_balance(self.user)
+
+    def test_delete_reverses_balance(self):
+        withdrawal = Transaction.objects.create(
+            user=self.user,
+            transaction_type='withdraw',
+            amount=300,
+            status='completed'
+        )
+        self.assertEqual(Transaction.get_user_balance(self.user), -300)
+        withdrawal.delete()
+        self.assertEqual(Transaction.get_user_balance(self.user), 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Transaction.objects.create(
+            user=self.user,
+            transaction_type='sale',
+            amount=500,
+            status='completed'
+        )
+        WalletBalance.objects.filter(user=self.user).update(balance=42)
+
+        out = StringIO()
+        call_command('reconcile_wallet_balances', '--dry-run', stdout=out)
+        self.assertIn('1 drifted', out.getvalue())
+        self.assertEqual(WalletBalance.objects.get(user=self.user).balance, 42)
+
+        call_command('reconcile_wallet_balances', stdout=StringIO())
+        self.assertEqual(WalletBalance.objects.get(user=self.user).balance, 500)
+
+
+class WalletServiceTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username='sender', password='testpass123')
+        self.recipient = User.objects.create_user(username='recipient', password='testpass123')
+        Transaction.objects.create(
+            user=self.sender,
+            transaction_type='add_money',
+            amount=1000,
+            status='completed'
+        )
+
+    def test_transfer_moves_funds_once_per_key(self):
+        debit, created = wallet_service.transfer(self.sender, self.recipient, 200, idempotency_key='abc')
+        self.assertTrue(created)
+        replay, created = wallet_service.transfer(self.sender, self.recipient, 200, idempotency_key='abc')
+        self.assertFalse(created)
+        self.assertEqual(replay.pk, debit.pk)
+
+        self.assertEqual(Transaction.get_user_balance(self.sender), 800)
+        self.assertEqual(Transaction.get_user_balance(self.recipient), 200 - debit.metadata['admin_fee'])
+
+    def test_reused_key_with_a_different_request_is_refused(self):
+        wallet_service.transfer(self.sender, self.recipient, 200, idempotency_key='abc')
+        other = User.objects.create_user(username='other', password='testpass123')
+        with self.assertRaises(wallet_service.IdempotencyKeyReused):
+            wallet_service.transfer(self.sender, self.recipient, 300, idempotency_key='abc')
+        with self.assertRaises(wallet_service.IdempotencyKeyReused):
+            wallet_service.transfer(self.sender, other, 200, idempotency_key='abc')
+        with self.assertRaises(wallet_service.IdempotencyKeyReused):
+            wallet_service.withdraw(self.sender, 200, idempotency_key='abc')
+        self.assertEqual(Transaction.get_user_balance(self.sender), 800)
+
+    def test_transfer_rejects_overdraft(self):
+        with self.assertRaises(wallet_service.InsufficientBalance):
+            wallet_service.transfer(self.sender, self.recipient, 1001)
+        self.assertEqual(Transaction.get_user_balance(self.sender), 1000)
+        self.assertFalse(Transaction.objects.filter(user=self.recipient).exists())
+
+    def test_pending_withdrawals_hold_funds(self):
+        wallet_service.withdraw(self.sender, 600, idempotency_key='w1')
+        with self.assertRaises(wallet_service.InsufficientBalance):
+            wallet_service.withdraw(self.sender, 600, idempotency_key='w2')
+        self.assertEqual(wallet_service.get_available_balance(self.sender), 400)
+
+    def test_approved_withdrawals_stay_held_until_paid_out(self):
+        withdrawal, _ = wallet_service.withdraw(self.sender, 600, idempotency_key='w1')
+        self.assertTrue(withdrawal.approve())
+        with self.assertRaises(wallet_service.InsufficientBalance):
+            wallet_service.transfer(self.sender, self.recipient, 600)
+        self.assertEqual(wallet_service.get_available_balance(self.sender), 400)
+
+
+class MonnifyClientTests(TestCase):
+    def setUp(self):
+        self.server = FakeMonnifyServer().start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(reset_monnify_clients)
+        settings_override = override_settings(
+            MONNIFY_BASE_URL=self.server.url,
+            MONNIFY_API_KEY=self.server.api_key,
+            MONNIFY_SECRET_KEY=self.server.secret_key,
+            MONNIFY_CONTRACT_CODE='0000000000',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_token_and_connections_shared_across_instances(self):
+        for _ in range(5):
+            self.assertEqual(len(MonnifyService().get_banks()), 3)
+        self.assertEqual(self.server.stats['logins'], 1)
+        self.assertEqual(self.server.stats['connections'], 1)
+
+    def test_idempotent_gets_are_retried(self):
+        self.server.fail_gets = 2
+        self.assertIsNotNone(MonnifyService().get_banks())
+        self.assertEqual(self.server.stats['injected_failures'], 2)
+
+    def test_revoked_token_is_refreshed(self):
+        service = MonnifyService()
+        service.get_banks()
+        self.server.tokens.clear()
+        self.assertIsNotNone(service.get_banks())
+        self.assertEqual(self.server.stats['logins'], 2)
+
+
+class BankCatalogueSyncTests(TestCase):
+    def setUp(self):
+        self.server = FakeMonnifyServer(banks=[
+            {'name': 'Wema Bank', 'code': '035'},
+            {'name': 'Sterling Bank PLC', 'code': '232'},
+            {'name': 'Moniepoint Microfinance Bank', 'code': '50515'},
+        ]).start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(reset_monnify_clients)
+        settings_override = override_settings(
+            MONNIFY_BASE_URL=self.server.url,
+            MONNIFY_API_KEY=self.server.api_key,
+            MONNIFY_SECRET_KEY=self.server.secret_key,
+            MONNIFY_CONTRACT_CODE='0000000000',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        MonnifyBank.objects.bulk_create([
+            MonnifyBank(bank_code='035', bank_name='Wema Bank'),
+            MonnifyBank(bank_code='232', bank_name='Sterling Bank'),
+            MonnifyBank(bank_code='999', bank_name='Closed Bank'),
+        ])
+        MonnifyBank.invalidate_cache()
+
+    def test_sync_applies_only_the_differences(self):
+        service = MonnifyService()
+        # Fetch existing rows, insert, update
+        with self.assertNumQueries(5):
+            success, message = service.sync_banks_to_database()
+        self.assertTrue(success, message)
+        self.assertIn('1 added, 1 updated, 1 deactivated, 1 unchanged', message)
+        self.assertEqual(
+            [(bank.bank_code, bank.bank_name) for bank in MonnifyBank.get_active()],
+            [('50515', 'Moniepoint Microfinance Bank'), ('232', 'Sterling Bank PLC'), ('035', 'Wema Bank')],
+        )
+        self.assertFalse(MonnifyBank.objects.get(bank_code='999').is_active)
+
+        with self.assertNumQueries(1):
+            success, message = service.sync_banks_to_database()
+        self.assertIn('0 added, 0 updated, 0 deactivated', message)
+
+    def test_bank_preferences_served_from_cache(self):
+        MonnifyBank.objects.filter(bank_code='999').update(is_active=False)
+        MonnifyBank.invalidate_cache()
+        user = User.objects.create_user(username='saver', password='testpass123')
+        self.client.force_login(user)
+        url = reverse('bank_preferences')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {'banks': ['232', '999', '232']})
+        self.assertFalse([q for q in queries if 'FROM "site_core_monnifybank"' in q['sql']])
+        self.assertEqual(list(user.bank_preferences.values_list('bank__bank_code', flat=True)), ['232'])
+
+        MonnifyBank.objects.filter(bank_code='232').get().delete()
+        self.assertNotIn('232', [bank.bank_code for bank in MonnifyBank.get_active()])
+
+
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='depositor', password='testpass123')
+        VirtualAccount.objects.create(
+            user=self.user,
+            account_number='0123456789',
+            account_name='Depositor',
+            bank_name='Wema Bank',
+            bank_code='035',
+            reference='VINAJI_1_ABC'
+        )
+
+    def post_event(self, reference, account_reference='VINAJI_1_ABC', amount=2500):
+        body = json.dumps({
+            'eventType': 'SUCCESSFUL_TRANSACTION',
+            'eventData': {
+                'transactionReference': reference,
+                'amount': amount,
+                'destinationAccountInformation': {'accountReference': account_reference},
+            },
+        })
+        signature = hmac.new(b'', body.encode(), hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse('monnify_webhook'), data=body, content_type='application/json',
+            HTTP_MONNIFY_SIGNATURE=signature
+        )
+
+    def test_endpoint_only_stores_event(self):
+        self.assertEqual(self.post_event('MNFY|1').status_code, 200)
+        self.assertEqual(WebhookEvent.objects.filter(status='pending').count(), 1)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.client.post(reverse('monnify_webhook'), data='{}', content_type='application/json',
+                                    HTTP_MONNIFY_SIGNATURE='bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_worker_books_each_reference_once(self):
+        self.post_event('MNFY|1')
+        self.post_event('MNFY|1')
+        self.post_event('MNFY|2', amount=500)
+        call_command('process_webhook_events', once=True, stdout=StringIO())
+
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Transaction.get_user_balance(self.user), 3000)
+        self.assertEqual(WebhookEvent.objects.filter(status='duplicate').count(), 1)
+
+    def test_unknown_account_is_retried(self):
+        self.post_event('MNFY|3', account_reference='MISSING')
+        call_command('process_webhook_events', once=True, stdout=StringIO())
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('MISSING', event.last_error)
+
+
+RECORDED_FIXTURE = os.path.join(os.path.dirname(__file__), 'testdata', 'monnify_transactions.json')
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.server = FakeMonnifyServer.from_fixture(RECORDED_FIXTURE).start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(reset_monnify_clients)
+        settings_override = override_settings(
+            MONNIFY_BASE_URL=self.server.url,
+            MONNIFY_API_KEY=self.server.api_key,
+            MONNIFY_SECRET_KEY=self.server.secret_key,
+            MONNIFY_CONTRACT_CODE='0000000000',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user(username='depositor', password='testpass123')
+        deposits = [
+            ('MNFY|20240101|000001', '5000', 'MNFY|PAY|000001'),
+            ('MNFY|20240101|000002', '3000', 'MNFY|PAY|000002'),
+            ('MNFY|20240101|000003', '1200', 'MNFY|PAY|000003'),
+            ('MNFY|20240101|000004', '900', 'MNFY|PAY|000004'),
+            ('MNFY|20240101|000005', '700', 'MNFY|PAY|000001'),
+        ]
+        for reference, amount, payment_reference in deposits:
+            Transaction.objects.create(
+                user=user, transaction_type='add_money', amount=Decimal(amount), status='completed',
+                reference=reference, description='Deposit',
+                metadata={'eventType': 'SUCCESSFUL_TRANSACTION',
+                          'eventData': {'transactionReference': reference, 'paymentReference': payment_reference}},
+            )
+        # Manual deposits never went through Monnify and are not checked
+        Transaction.objects.create(user=user, transaction_type='add_money', amount=Decimal('100'),
+                                   status='completed', reference='MANUAL-1', description='Manual deposit')
+
+    def issue_kinds(self, run):
+        return sorted(run.issues.values_list('reference', 'kind'))
+
+    def test_run_flags_missing_mismatched_and_duplicate_deposits(self):
+        out = StringIO()
+        call_command('reconcile_monnify_transactions', '--chunk-size', '2', '--rate', '0', stdout=out)
+
+        run = ReconciliationRun.objects.get()
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual((run.checked_count, run.matched_count, run.issue_count), (5, 2, 5))
+        self.assertEqual(self.issue_kinds(run), [
+            ('MNFY|20240101|000001', 'duplicate_reference'),
+            ('MNFY|20240101|000002', 'amount_mismatch'),
+            ('MNFY|20240101|000003', 'status_mismatch'),
+            ('MNFY|20240101|000004', 'missing'),
+            ('MNFY|20240101|000005', 'duplicate_reference'),
+        ])
+        self.assertEqual(run.issues.get(kind='amount_mismatch').provider_amount, Decimal('2500'))
+        self.assertIn('5 checked, 2 matched, 5 issue(s)', out.getvalue())
+
+    def test_interrupted_run_resumes_from_its_checkpoint(self):
+        run = start_run()
+        self.assertFalse(reconcile(run, MonnifyService(), chunk_size=2, rate=0, max_chunks=1))
+        self.assertEqual(ReconciliationRun.objects.get().checked_count, 2)
+
+        call_command('reconcile_monnify_transactions', '--resume', '--chunk-size', '2', '--rate', '0',
+                     stdout=StringIO())
+
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.checked_count, run.issue_count), ('completed', 5, 5))
+        # One login, then each deposit looked up exactly once across both invocations
+        self.assertEqual(self.server.stats['requests'], 6)
+
+    def test_unreachable_provider_marks_deposits_unverified(self):
+        self.server.fail_gets = 100
+        run = start_run()
+        reconcile(run, MonnifyService(), rate=0)
+        self.assertEqual(run.issues.filter(kind='unverified').count(), 5)
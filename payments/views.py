@@ -1,6 +1,5 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db import transaction as db_transaction
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
@@ -57,7 +56,6 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db import transaction
 from django.db.utils import IntegrityError
 from .models import PaymentMethod, Transaction
 from site_core.models import SiteSetting
@@ -70,13 +68,13 @@ import uuid
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
 from django.utils import timezone
 
 from .models import PaymentMethod, ManualDeposit, Transaction
 from .forms import ManualDepositForm # Import the form
 from accounts.models import VirtualAccount
 from site_core.models import SiteSetting
+from . import wallet_service
 
 @login_required
 def add_money(request):
@@ -153,26 +151,22 @@ def withdraw_money(request):
     if request.method == 'POST':
         form = WithdrawForm(request.POST)
         if form.is_valid():
-            amount = form.cleaned_data['amount']
-            current_balance = Transaction.get_user_balance(request.user)
-            
-            if amount > current_balance:
+            try:
+                wallet_service.withdraw(
+                    request.user,
+                    form.cleaned_data['amount'],
+                    payment_method=form.cleaned_data.get('payment_method'),
+                    idempotency_key=form.cleaned_data.get('idempotency_key'),
+                )
+            except wallet_service.InsufficientBalance:
                 messages.error(request, 'Insufficient balance for withdrawal.')
+            except wallet_service.IdempotencyKeyReused as e:
+                messages.error(request, str(e))
             else:
-                transaction = form.save(commit=False)
-                transaction.user = request.user
-                transaction.transaction_type = 'withdraw'
-                
-                site_settings = SiteSetting.get_solo()
-                if site_settings.withdraw_fee_pct > 0:
-                    fee = transaction.amount * (site_settings.withdraw_fee_pct / 100)
-                    transaction.metadata = {'admin_fee': float(fee)}
-                
-                transaction.save()
                 messages.success(request, 'Withdrawal request submitted successfully.')
                 return redirect('transactions_list')
     else:
-        form = WithdrawForm()
+        form = WithdrawForm(initial={'idempotency_key': uuid.uuid4().hex})
     
     current_balance = Transaction.get_user_balance(request.user)
     payment_methods = PaymentMethod.objects.filter(is_active=True)
@@ -191,67 +185,28 @@ def transfer_money(request):
         if form.is_valid():
             amount = form.cleaned_data['amount']
             recipient = form.cleaned_data['recipient_username']
-            description = form.cleaned_data.get('description', '')
             
-            current_balance = Transaction.get_user_balance(request.user)
-            
-            if amount > current_balance:
+            try:
+                wallet_service.transfer(
+                    request.user,
+                    recipient,
+                    amount,
+                    description=form.cleaned_data.get('description', ''),
+                    idempotency_key=form.cleaned_data.get('idempotency_key'),
+                )
+            except wallet_service.InsufficientBalance:
                 messages.error(request, 'Insufficient balance for transfer.')
+            except wallet_service.IdempotencyKeyReused as e:
+                messages.error(request, str(e))
             else:
-                with db_transaction.atomic():
-                    site_settings = SiteSetting.get_solo()
-                    fee = amount * (site_settings.transfer_fee_pct / 100)
-                    net_amount = amount - fee
-                    
-                    # Create debit transaction for sender
-                    debit_txn = Transaction.objects.create(
-                        user=request.user,
-                        amount=amount,
-                        transaction_type='transfer',
-                        status='completed',
-                        description=f"Transfer to {recipient.username}: {description}",
-                        metadata={
-                            'recipient_id': recipient.id,
-                            'admin_fee': float(fee),
-                            'net_amount': float(net_amount)
-                        }
-                    )
-                    
-                    # Create credit transaction for recipient
-                    credit_txn = Transaction.objects.create(
-                        user=recipient,
-                        amount=net_amount,
-                        transaction_type='transfer',
-                        status='completed',
-                        description=f"Transfer from {request.user.username}: {description}",
-                        metadata={
-                            'sender_id': request.user.id,
-                            'original_amount': float(amount),
-                            'admin_fee': float(fee)
-                        }
-                    )
-                    
-                    # Create admin fee transaction
-                    if fee > 0:
-                        Transaction.objects.create(
-                            user=request.user,  # Or system user
-                            amount=fee,
-                            transaction_type='admin_fee',
-                            status='completed',
-                            description=f"Transfer fee for transaction {debit_txn.reference}",
-                            metadata={
-                                'original_transaction_id': debit_txn.id
-                            }
-                        )
-                
                 messages.success(request, f'Transfer of {amount} to {recipient.username} completed successfully.')
                 return redirect('transactions_list')
     else:
-        form = TransferForm()
+        form = TransferForm(initial={'idempotency_key': uuid.uuid4().hex})
     
     current_balance = Transaction.get_user_balance(request.user)
     context = {
         'form': form,
         'current_balance': current_balance,
     }
-    return render(request, 'payments/transfer.html', context)
\ No newline at end of file
+    return render(request, 'payments/transfer.html', context)
@@ -0,0 +1,183 @@
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from site_core.models import SiteSetting
+from .models import Transaction, WalletBalance
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientBalance(Exception):
+    """Raised when a debit would take the wallet below zero"""
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when an idempotency key is sent again with a different request"""
+
+
+def _lock_wallet(user):
+    """Take the wallet row lock and return the locked WalletBalance.
+
+    The lock is taken with a write (UPDATE) rather than a plain read so that it
+    serialises debits on every backend: PostgreSQL/MySQL hold a row lock until
+    commit, and SQLite takes its RESERVED write lock up-front instead of
+    upgrading from a shared read lock, which would deadlock two concurrent
+    debits.
+    """
+    locked = WalletBalance.objects.filter(user=user).update(updated_at=timezone.now())
+    if not locked:
+        WalletBalance.rebuild_for_user(user)
+    return WalletBalance.objects.select_for_update().get(user=user)
+
+
+def _find_existing(user, idempotency_key):
+    if not idempotency_key:
+        return None
+    return Transaction.objects.filter(user=user, idempotency_key=idempotency_key).first()
+
+
+def get_available_balance(user, wallet=None):
+    """Completed balance minus withdrawals that are awaiting approval or payout"""
+    balance = wallet.balance if wallet else Transaction.get_user_balance(user)
+    on_hold = Transaction.objects.filter(
+        user=user,
+        transaction_type='withdraw',
+        status__in=['pending', 'approved']
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    return balance - on_hold
+
+
+def _replay(existing, matches):
+    if not matches(existing):
+        raise IdempotencyKeyReused('This request key was already used for a different transaction.')
+    return existing, False
+
+
+def _run_idempotent(user, idempotency_key, operation, matches):
+    """Run operation under the wallet lock, or return the original result on retry.
+
+    ``matches(existing)`` tells whether the stored transaction is the same
+    request; a key reused for a different one raises IdempotencyKeyReused.
+    Returns (transaction, created) in the style of get_or_create.
+    """
+    existing = _find_existing(user, idempotency_key)
+    if existing:
+        return _replay(existing, matches)
+
+    try:
+        with transaction.atomic():
+            wallet = _lock_wallet(user)
+            # A concurrent request with the same key may have committed while we waited
+            existing = _find_existing(user, idempotency_key)
+            if existing:
+                return _replay(existing, matches)
+            return operation(wallet), True
+    except IntegrityError:
+        existing = _find_existing(user, idempotency_key)
+        if existing:
+            return _replay(existing, matches)
+        raise
+
+
+def transfer(sender, recipient, amount, description='', idempotency_key=None):
+    """Move funds between wallets; the sender pays the configured transfer fee"""
+    amount = Decimal(amount)
+    site_settings = SiteSetting.get_solo()
+    fee = (amount * Decimal(str(site_settings.transfer_fee_pct)) / 100).quantize(Decimal('0.01'))
+    net_amount = amount - fee
+
+    def operation(wallet):
+        if amount > get_available_balance(sender, wallet):
+            raise InsufficientBalance('Insufficient balance for transfer.')
+
+        debit_txn = Transaction.objects.create(
+            user=sender,
+            amount=net_amount,
+            transaction_type='transfer',
+            status='completed',
+            idempotency_key=idempotency_key or None,
+            description=f"Transfer to {recipient.username}: {description}",
+            metadata={
+                'recipient_id': recipient.id,
+                'original_amount': float(amount),
+                'admin_fee': float(fee),
+                'net_amount': float(net_amount)
+            },
+            completed_at=timezone.now()
+        )
+
+        Transaction.objects.create(
+            user=recipient,
+            amount=net_amount,
+            transaction_type='transfer_in',
+            status='completed',
+            description=f"Transfer from {sender.username}: {description}",
+            metadata={
+                'sender_id': sender.id,
+                'original_amount': float(amount),
+                'admin_fee': float(fee),
+                'original_transaction_id': debit_txn.id
+            },
+            completed_at=timezone.now()
+        )
+
+        if fee > 0:
+            Transaction.objects.create(
+                user=sender,
+                amount=fee,
+                transaction_type='admin_fee',
+                status='completed',
+                description=f"Transfer fee for transaction {debit_txn.reference}",
+                metadata={
+                    'original_transaction_id': debit_txn.id
+                },
+                completed_at=timezone.now()
+            )
+
+        logger.info("Transfer %s: %s -> %s (%s)", debit_txn.reference, sender.pk, recipient.pk, amount)
+        return debit_txn
+
+    def matches(existing):
+        metadata = existing.metadata or {}
+        return (
+            existing.transaction_type == 'transfer'
+            and metadata.get('recipient_id') == recipient.id
+            and Decimal(str(metadata.get('original_amount'))) == amount
+        )
+
+    return _run_idempotent(sender, idempotency_key, operation, matches)
+
+
+def withdraw(user, amount, payment_method=None, idempotency_key=None):
+    """Place a pending withdrawal request that holds funds until it is processed"""
+    amount = Decimal(amount)
+    site_settings = SiteSetting.get_solo()
+
+    def operation(wallet):
+        if amount > get_available_balance(user, wallet):
+            raise InsufficientBalance('Insufficient balance for withdrawal.')
+
+        metadata = None
+        withdraw_fee_pct = Decimal(str(site_settings.withdraw_fee_pct))
+        if withdraw_fee_pct > 0:
+            fee = amount * withdraw_fee_pct / 100
+            metadata = {'admin_fee': float(fee)}
+
+        return Transaction.objects.create(
+            user=user,
+            amount=amount,
+            transaction_type='withdraw',
+            payment_method=payment_method,
+            idempotency_key=idempotency_key or None,
+            description='Withdrawal request',
+            metadata=metadata
+        )
+
+    def matches(existing):
+        return existing.transaction_type == 'withdraw' and existing.amount == amount
+
+    return _run_idempotent(user, idempotency_key, operation, matches)
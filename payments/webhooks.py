@@ -4,11 +4,21 @@ from django.views.decorators.http import require_POST
 import json
 import hmac
 import hashlib
+import logging
+from datetime import timedelta
+from decimal import Decimal
 from django.conf import settings
-from .models import Transaction
+from django.db import IntegrityError, transaction
+from .models import Transaction, WalletBalance, WebhookEvent
 from accounts.models import VirtualAccount
 from django.utils import timezone
 
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 30  # seconds; doubled on every failed attempt
+STALE_CLAIM_AFTER = timedelta(minutes=10)
+
+
 @csrf_exempt
 @require_POST
 def monnify_webhook(request):
@@ -17,52 +27,165 @@ def monnify_webhook(request):
     if not verify_webhook_signature(request.body, signature):
         return HttpResponse('Invalid signature', status=400)
 
-    payload = json.loads(request.body)
-    event_type = payload.get('eventType')
-    
-    if event_type == 'SUCCESSFUL_TRANSACTION':
-        handle_successful_transaction(payload)
-    
+    # Store and acknowledge; process_webhook_events does the rest off the request path
+    WebhookEvent.objects.create(provider='monnify', raw_body=request.body.decode('utf-8', 'replace'))
     return HttpResponse('Webhook received', status=200)
 
 def verify_webhook_signature(payload, signature):
     from site_core.models import SiteSetting
+    if not signature:
+        return False
     site_settings = SiteSetting.get_solo()
-    
+
     computed_signature = hmac.new(
         site_settings.monnify_secret_key.encode(),
         payload,
         hashlib.sha512
     ).hexdigest()
-    
+
     return hmac.compare_digest(computed_signature, signature)
 
-def handle_successful_transaction(payload):
-    transaction_data = payload.get('eventData', {})
-    
-    # Find virtual account
-    account_reference = transaction_data.get('destinationAccountInformation', {}).get('accountReference')
-    if not account_reference:
-        return
-
-    try:
-        virtual_account = VirtualAccount.objects.get(reference=account_reference)
-        user = virtual_account.user
-        
-        # Create transaction record
-        Transaction.objects.create(
-            user=user,
+
+def claim_webhook_events(batch_size):
+    """Atomically claim up to batch_size due events for this worker"""
+    now = timezone.now()
+    # Events left in 'processing' by a crashed worker become claimable again
+    WebhookEvent.objects.filter(
+        status='processing', claimed_at__lt=now - STALE_CLAIM_AFTER
+    ).update(status='pending')
+
+    candidate_ids = list(
+        WebhookEvent.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+    WebhookEvent.objects.filter(id__in=candidate_ids, status='pending').update(
+        status='processing', claimed_at=now
+    )
+    return list(WebhookEvent.objects.filter(id__in=candidate_ids, status='processing', claimed_at=now))
+
+
+def process_webhook_batch(events, max_attempts=5):
+    """Turn a batch of claimed events into ledger rows.
+
+    Duplicate transactionReferences (within the batch or already booked) are
+    skipped, virtual accounts are resolved with one query, and deposits are
+    written with one bulk insert plus one balance adjustment per user.
+    Returns a Counter-like dict of outcomes.
+    """
+    outcomes = {'processed': 0, 'duplicate': 0, 'ignored': 0, 'retry': 0, 'failed': 0}
+    deposits = []
+
+    for event in events:
+        event.attempts += 1
+        try:
+            payload = json.loads(event.raw_body)
+        except ValueError:
+            _finish(event, 'failed', 'Invalid JSON body', outcomes)
+            continue
+
+        data = payload.get('eventData') or {}
+        event.event_type = payload.get('eventType') or ''
+        event.transaction_reference = data.get('transactionReference') or ''
+        if event.event_type != 'SUCCESSFUL_TRANSACTION':
+            _finish(event, 'ignored', '', outcomes)
+            continue
+        account_reference = (data.get('destinationAccountInformation') or {}).get('accountReference')
+        if not account_reference or not event.transaction_reference:
+            _finish(event, 'ignored', 'Missing account or transaction reference', outcomes)
+            continue
+        deposits.append((event, payload, data, account_reference))
+
+    seen = set(
+        Transaction.objects.filter(
+            reference__in=[event.transaction_reference for event, *_ in deposits]
+        ).values_list('reference', flat=True)
+    )
+    accounts = {
+        account.reference: account
+        for account in VirtualAccount.objects.filter(
+            reference__in={account_reference for *_, account_reference in deposits}
+        ).select_related('user')
+    }
+
+    pending = []
+    for event, payload, data, account_reference in deposits:
+        if event.transaction_reference in seen:
+            _finish(event, 'duplicate', '', outcomes)
+            continue
+        virtual_account = accounts.get(account_reference)
+        if virtual_account is None:
+            # The account may not be provisioned yet; retry later
+            _retry(event, f'Unknown virtual account {account_reference}', max_attempts, outcomes)
+            continue
+        seen.add(event.transaction_reference)
+        pending.append((event, Transaction(
+            user=virtual_account.user,
             transaction_type='add_money',
-            amount=transaction_data.get('amount', 0),
+            amount=Decimal(str(data.get('amount', 0))),
             currency='NGN',
             status='completed',
-            reference=transaction_data.get('transactionReference'),
+            reference=event.transaction_reference,
             description=f"Deposit to virtual account {virtual_account.account_number}",
             metadata=payload,
             completed_at=timezone.now()
-        )
-        
-        # You can also send notification to user here
-        
-    except VirtualAccount.DoesNotExist:
-        pass
\ No newline at end of file
+        )))
+
+    if pending:
+        try:
+            _book_deposits([txn for _, txn in pending])
+            for event, _ in pending:
+                _finish(event, 'processed', '', outcomes)
+        except IntegrityError:
+            # A concurrent worker booked one of these references; fall back to one by one
+            for event, txn in pending:
+                try:
+                    _book_deposits([txn])
+                    _finish(event, 'processed', '', outcomes)
+                except IntegrityError:
+                    _finish(event, 'duplicate', '', outcomes)
+                except Exception as e:
+                    _retry(event, str(e), max_attempts, outcomes)
+        except Exception as e:
+            logger.exception("Failed to book webhook deposits")
+            for event, _ in pending:
+                _retry(event, str(e), max_attempts, outcomes)
+
+    WebhookEvent.objects.bulk_update(
+        events,
+        ['status', 'event_type', 'transaction_reference', 'attempts', 'last_error',
+         'next_attempt_at', 'processed_at', 'claimed_at']
+    )
+    return outcomes
+
+
+def _book_deposits(transactions):
+    deltas = {}
+    for txn in transactions:
+        deltas[txn.user_id] = deltas.get(txn.user_id, Decimal('0')) + txn.get_ledger_amount()
+    with transaction.atomic():
+        Transaction.objects.bulk_create(transactions)
+        for user_id, delta in deltas.items():
+            WalletBalance.adjust(user_id, delta)
+
+
+def _finish(event, status, error, outcomes):
+    event.status = status
+    event.last_error = error
+    event.claimed_at = None
+    event.processed_at = timezone.now()
+    outcomes[status] += 1
+
+
+def _retry(event, error, max_attempts, outcomes):
+    event.last_error = error
+    event.claimed_at = None
+    if event.attempts >= max_attempts:
+        event.status = 'failed'
+        event.processed_at = timezone.now()
+        outcomes['failed'] += 1
+    else:
+        event.status = 'pending'
+        event.next_attempt_at = timezone.now() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (event.attempts - 1))
+        outcomes['retry'] += 1
@@ -1,5 +1,7 @@
 from django.contrib import admin
 from .models import ProductCategory, Product, ProductSale
+from search.index import reindex_queryset
+from site_core.http_cache import invalidate_models
 
 @admin.register(ProductCategory)
 class ProductCategoryAdmin(admin.ModelAdmin):
@@ -22,6 +24,8 @@ class ProductAdmin(admin.ModelAdmin):
     
     def approve_products(self, request, queryset):
         updated = queryset.update(status='approved')
+        reindex_queryset(queryset)
+        invalidate_models(queryset.model)
         self.message_user(request, f'{updated} products approved successfully.')
     approve_products.short_description = "Approve selected products"
     
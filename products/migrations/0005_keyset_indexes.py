@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_product_category'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'created_at'], name='products_pr_status_36c7aa_idx'),
+        ),
+    ]
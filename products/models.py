@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from site_core.models import Category
+from site_core.counters import increment_counter
 
 class ProductCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -68,17 +69,20 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
 
     def __str__(self):
         return self.title
 
     def increment_views(self):
         self.views_count += 1
-        self.save(update_fields=['views_count'])
+        increment_counter(self, 'views_count')
 
     def increment_downloads(self):
         self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment_counter(self, 'download_count')
 
     def get_features_list(self):
         return [feature.strip() for feature in self.features.split('\n') if feature.strip()]
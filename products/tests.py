@@ -1,3 +1,103 @@
-from django.test import TestCase
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from site_core.counters import counter_buffer
+from site_core.models import Category
+from .downloads import parse_range, signed_url
+from .models import Product, ProductSale
+
+User = get_user_model()
+
+PAYLOAD = bytes(range(256)) * 40  # 10 KiB
+
+
+class ProtectedDownloadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, PROTECTED_DOWNLOADS_SERVER='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.seller = User.objects.create_user(username='seller', password='testpass123')
+        self.buyer = User.objects.create_user(username='buyer', password='testpass123')
+        category = Category.objects.create(name='Templates', category_type='product')
+        self.product = Product(title='Kit', description='Desc', seller=self.seller, price=10,
+                               category=category, status='approved')
+        self.product.product_file.save('kit.zip', ContentFile(PAYLOAD))
+        self.sale = ProductSale.objects.create(product=self.product, buyer=self.buyer, seller=self.seller,
+                                               sale_price=10, status='completed')
+
+    def test_licensed_buyer_gets_a_signed_link_and_the_download_is_counted(self):
+        self.client.force_login(self.buyer)
+        response = self.client.get(reverse('product_download', args=[self.product.pk]))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.logout()  # the link alone is enough, as it is for a download manager
+        with self.assertNumQueries(0):
+            download = self.client.get(response['Location'])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b''.join(download.streaming_content), PAYLOAD)
+        self.assertEqual(download['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', download['Content-Disposition'])
+
+        counter_buffer.flush()
+        self.product.refresh_from_db()
+        self.sale.refresh_from_db()
+        self.assertEqual((self.product.download_count, self.sale.download_count), (1, 1))
+
+    def test_download_requires_a_completed_sale(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('product_download', args=[self.product.pk])).status_code, 403)
+        self.sale.status = 'refunded'
+        self.sale.save()
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(reverse('product_download', args=[self.product.pk])).status_code, 403)
+        self.client.force_login(self.seller)
+        self.assertEqual(self.client.get(reverse('product_download', args=[self.product.pk])).status_code, 302)
+
+    def test_tampered_or_expired_links_and_direct_media_urls_are_refused(self):
+        url = signed_url(self.product)
+        self.assertEqual(self.client.get(url[:-3] + 'xx/').status_code, 404)
+        with self.settings(PRODUCT_DOWNLOAD_URL_TTL=-1):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(self.product.product_file.url).status_code, 404)
+
+    def test_range_requests_resume(self):
+        url = signed_url(self.product)
+        response = self.client.get(url, HTTP_RANGE='bytes=1000-1999')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 1000-1999/{len(PAYLOAD)}')
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertEqual(b''.join(response.streaming_content), PAYLOAD[1000:2000])
+
+        tail = self.client.get(url, HTTP_RANGE='bytes=-100', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(b''.join(tail.streaming_content), PAYLOAD[-100:])
+        # A changed file (stale validator) restarts from the beginning
+        stale = self.client.get(url, HTTP_RANGE='bytes=-100', HTTP_IF_RANGE='"0-0"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(PAYLOAD)}-').status_code, 416)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-20', 10), (0, 9))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 10))
+        self.assertIsNone(parse_range('items=0-1', 10))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=5-2', 10)
+
+    def test_front_end_server_sends_the_file(self):
+        url = signed_url(self.product)
+        with self.settings(PROTECTED_DOWNLOADS_SERVER='nginx', PROTECTED_DOWNLOADS_INTERNAL_URL='/protected/'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.product.product_file.name}')
+        self.assertEqual(response.content, b'')
+        with self.settings(PROTECTED_DOWNLOADS_SERVER='sendfile'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Sendfile'], self.product.product_file.path)
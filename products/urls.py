@@ -9,6 +9,8 @@ urlpatterns = [
     path('manage/', views.ProductManageView.as_view(), name='product_manage'),  # Add this line
     path('<int:pk>/approve/', views.approve_product, name='approve_product'),
     path('<int:pk>/reject/', views.reject_product, name='reject_product'),
+    path('<int:pk>/download/', views.product_download, name='product_download'),
+    path('download/<str:token>/', views.product_file_download, name='product_file_download'),
 
 
 ]
\ No newline at end of file
@@ -6,12 +6,19 @@ from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from .models import Product, ProductSale
 from .forms import ProductForm
+from site_core.http_cache import ConditionalPageMixin
+from site_core.pagination import KeysetPaginationMixin
 from site_core.models import Category
 
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.views.decorators.http import require_POST, require_safe
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib import messages
+from site_core.counters import increment_counter
+from .downloads import file_response, has_license, read_token, signed_url
 from .models import Product
 
 @require_POST
@@ -34,6 +41,29 @@ def reject_product(request, pk):
 
 
 
+@login_required
+def product_download(request, pk):
+    product = get_object_or_404(Product, pk=pk)
+    if not product.product_file or not has_license(request.user, product):
+        raise PermissionDenied
+    product.increment_downloads()
+    sale = ProductSale.objects.filter(product=product, buyer=request.user, status='completed').only('pk').first()
+    if sale:
+        increment_counter(sale, 'download_count')
+    return redirect(signed_url(product))
+
+@require_safe
+def product_file_download(request, token):
+    # No licence or session lookups here: the signature is the licence check, so resumed ranges stay cheap
+    try:
+        name = read_token(token)
+    except signing.BadSignature:
+        raise Http404('Download link is invalid or has expired')
+    return file_response(request, name)
+
+def protected_media(request, name):
+    raise Http404('Product files are only available through their download links')
+
 class ProductManageView(LoginRequiredMixin, ListView):
     model = Product
     template_name = 'products/manage.html'
@@ -55,7 +85,7 @@ class ProductManageView(LoginRequiredMixin, ListView):
     
     
     
-class ProductListView(ListView):
+class ProductListView(ConditionalPageMixin, KeysetPaginationMixin, ListView):
     model = Product
     template_name = 'products/list.html'
     context_object_name = 'products'
@@ -91,16 +121,23 @@ class ProductListView(ListView):
         context['categories'] = Category.objects.filter(category_type="job", is_active=True)
         return context
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalPageMixin, DetailView):
     model = Product
     template_name = 'products/detail.html'
     context_object_name = 'product'
+    hit_counter_field = 'views_count'
     
     def get_object(self):
         obj = super().get_object()
         obj.increment_views()
         return obj
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Anonymous visitors get the cached page, which never offers the download
+        context['can_download'] = bool(self.object.product_file) and has_license(self.request.user, self.object)
+        return context
+
 from django.contrib import messages
 from django.urls import reverse_lazy
 
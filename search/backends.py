@@ -0,0 +1,236 @@
+"""Search backends.
+
+``FTS5Backend`` keeps an SQLite FTS5 table (``search_index``) with one row per
+public job, course, product and blog post. The rowid encodes both the object
+pk and its type (``pk << 3 | type code``), so updates and deletes are rowid
+lookups instead of scans. ``ScanBackend`` is the old ``icontains`` search and
+is used on other databases and on SQLite builds compiled without FTS5.
+"""
+import re
+from collections import namedtuple
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .index import SEARCH_TYPES
+
+SearchHit = namedtuple('SearchHit', ['doc_type', 'object_id', 'score'])
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+TYPE_BITS = 3
+TYPE_CODES = {name: code for code, name in enumerate(SEARCH_TYPES)}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query or '')
+
+
+class SearchQuery:
+    """Lazy ranked result list; Paginator slices it one page at a time"""
+
+    def __init__(self, backend, query, doc_types):
+        self.backend = backend
+        self.query = query
+        self.doc_types = list(doc_types)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query, self.doc_types)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            stop = self.count() if key.stop is None else key.stop
+            if stop <= start:
+                return []
+            return self.backend.search(self.query, self.doc_types, start, stop - start)
+        hits = self.backend.search(self.query, self.doc_types, key, 1)
+        if not hits:
+            raise IndexError(key)
+        return hits[0]
+
+
+class BaseSearchBackend:
+    def query(self, query, doc_types=None):
+        return SearchQuery(self, query, doc_types or SEARCH_TYPES)
+
+    def index(self, search_type, instances):
+        pass
+
+    def remove(self, search_type, ids):
+        pass
+
+    def clear(self, search_type=None):
+        pass
+
+    def optimize(self):
+        pass
+
+    def count(self, query, doc_types):
+        raise NotImplementedError
+
+    def search(self, query, doc_types, offset, limit):
+        raise NotImplementedError
+
+
+class FTS5Backend(BaseSearchBackend):
+    table = 'search_index'
+
+    @staticmethod
+    def rowid(search_type, pk):
+        return (pk << TYPE_BITS) | TYPE_CODES[search_type.name]
+
+    @staticmethod
+    def match_expression(query):
+        """Every term must match, each as a prefix ("pyth" finds "python")"""
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def index(self, search_type, instances):
+        rows = [(self.rowid(search_type, instance.pk), *search_type.document(instance)) for instance in instances]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {self.table}(rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+    def remove(self, search_type, ids):
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(self.rowid(search_type, pk),) for pk in ids]
+            )
+
+    def clear(self, search_type=None):
+        with connection.cursor() as cursor:
+            if search_type is None:
+                cursor.execute(f'DELETE FROM {self.table}')
+            else:
+                cursor.execute(
+                    f'DELETE FROM {self.table} WHERE (rowid & %s) = %s',
+                    [(1 << TYPE_BITS) - 1, TYPE_CODES[search_type.name]]
+                )
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+
+    def _where(self, match, doc_types):
+        sql = f'{self.table} MATCH %s'
+        params = [match]
+        if set(doc_types) != set(SEARCH_TYPES):
+            codes = [TYPE_CODES[name] for name in doc_types]
+            sql += f" AND (rowid & {(1 << TYPE_BITS) - 1}) IN ({', '.join(['%s'] * len(codes))})"
+            params += codes
+        return sql, params
+
+    def count(self, query, doc_types):
+        match = self.match_expression(query)
+        if not match or not doc_types:
+            return 0
+        where, params = self._where(match, doc_types)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table} WHERE {where}', params)
+            return cursor.fetchone()[0]
+
+    def search(self, query, doc_types, offset, limit):
+        match = self.match_expression(query)
+        if not match or not doc_types:
+            return []
+        where, params = self._where(match, doc_types)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({self.table}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score '
+                f'FROM {self.table} WHERE {where} ORDER BY score, rowid LIMIT %s OFFSET %s',
+                params + [limit, offset]
+            )
+            return [
+                SearchHit(TYPE_NAMES[rowid & ((1 << TYPE_BITS) - 1)], rowid >> TYPE_BITS, score)
+                for rowid, score in cursor.fetchall()
+            ]
+
+
+class ScanBackend(BaseSearchBackend):
+    """Unindexed fallback: every term must appear somewhere in the title or body"""
+
+    def _queryset(self, search_type, tokens):
+        fields = [search_type.title_field, *search_type.body_fields]
+        condition = reduce(and_, (
+            reduce(or_, (Q(**{f'{field}__icontains': token}) for field in fields))
+            for token in tokens
+        ))
+        return search_type.model.objects.filter(condition, **search_type.visible).order_by('-pk')
+
+    def count(self, query, doc_types):
+        tokens = tokenize(query)
+        if not tokens:
+            return 0
+        return sum(self._queryset(SEARCH_TYPES[name], tokens).count() for name in doc_types)
+
+    def search(self, query, doc_types, offset, limit):
+        tokens = tokenize(query)
+        hits = []
+        for name in doc_types if tokens else ():
+            if len(hits) >= limit:
+                break
+            queryset = self._queryset(SEARCH_TYPES[name], tokens)
+            ids = list(queryset.values_list('pk', flat=True)[offset:offset + limit - len(hits)])
+            if not ids:
+                offset = max(0, offset - queryset.count())
+                continue
+            offset = 0
+            hits.extend(SearchHit(name, pk, None) for pk in ids)
+        return hits
+
+
+_backends = {}
+
+
+def has_fts5():
+    """Whether the database is SQLite built with FTS5"""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def get_search_backend():
+    configured = getattr(settings, 'SEARCH_BACKEND', '')
+    backend = _backends.get(configured)
+    if backend is None:
+        # The FTS5 probe runs once per process, the first time the default backend is needed
+        path = configured or ('search.backends.FTS5Backend' if has_fts5() else 'search.backends.ScanBackend')
+        backend = _backends[configured] = import_string(path)()
+    return backend
+
+
+def load_results(hits):
+    """Turn ranked hits into {results_key: [instances]} with one query per type"""
+    by_type = {}
+    for hit in hits:
+        by_type.setdefault(hit.doc_type, []).append(hit.object_id)
+
+    results = {search_type.results_key: [] for search_type in SEARCH_TYPES.values()}
+    for name, ids in by_type.items():
+        search_type = SEARCH_TYPES[name]
+        # Rows hidden since they were indexed (e.g. bulk status updates) simply drop out
+        instances = search_type.hydrate(ids)
+        results[search_type.results_key] = [instances[pk] for pk in ids if pk in instances]
+    return results
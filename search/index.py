@@ -0,0 +1,114 @@
+"""Registry of searchable models and the helpers that keep the index in sync"""
+import logging
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+
+class SearchType:
+    """How one model is indexed: which rows are public and what text is searched"""
+
+    def __init__(self, name, model, results_key, visible, title_field, body_fields, select_related=()):
+        self.name = name
+        self.model_label = model
+        self.results_key = results_key
+        self.visible = visible
+        self.title_field = title_field
+        self.body_fields = body_fields
+        self.select_related = select_related
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def fields(self):
+        return {self.title_field, *self.body_fields, *self.visible}
+
+    def is_visible(self, instance):
+        return all(getattr(instance, field) == value for field, value in self.visible.items())
+
+    def document(self, instance):
+        """Return (title, body) for an instance"""
+        body = ' '.join(str(getattr(instance, field) or '') for field in self.body_fields)
+        return getattr(instance, self.title_field) or '', body
+
+    def indexable(self):
+        fields = ['pk', self.title_field, *self.body_fields]
+        return self.model.objects.filter(**self.visible).only(*fields).order_by('pk')
+
+    def hydrate(self, ids):
+        """Fetch still-visible instances for ids in one query, keyed by pk"""
+        return self.model.objects.filter(**self.visible).select_related(*self.select_related).in_bulk(ids)
+
+
+# The order of this dict fixes each type's code in the FTS rowid; append only
+SEARCH_TYPES = {
+    'jobs': SearchType(
+        'jobs', 'jobs.Job', 'jobs', {'status': 'approved'},
+        'title', ('company_name', 'location', 'description'), ('posted_by', 'category'),
+    ),
+    'courses': SearchType(
+        'courses', 'courses.Course', 'courses', {'status': 'approved'},
+        'title', ('description',), ('instructor', 'category'),
+    ),
+    'products': SearchType(
+        'products', 'products.Product', 'products', {'status': 'approved'},
+        'title', ('tags', 'description', 'features'), ('seller', 'category'),
+    ),
+    'blog': SearchType(
+        'blog', 'blog.BlogPost', 'blog_posts', {'status': 'published'},
+        'title', ('excerpt', 'content'), ('author', 'category'),
+    ),
+}
+
+
+def get_search_type(model):
+    for search_type in SEARCH_TYPES.values():
+        if search_type.model is model:
+            return search_type
+    return None
+
+
+def update_document(sender, instance, **kwargs):
+    """post_save: (re)index public rows and drop everything else"""
+    from .backends import get_search_backend
+
+    search_type = get_search_type(sender)
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not search_type.fields & set(update_fields):
+        return
+    backend = get_search_backend()
+    if search_type.is_visible(instance):
+        backend.index(search_type, [instance])
+    else:
+        backend.remove(search_type, [instance.pk])
+
+
+def remove_document(sender, instance, **kwargs):
+    from .backends import get_search_backend
+
+    get_search_backend().remove(get_search_type(sender), [instance.pk])
+
+
+def reindex_queryset(queryset):
+    """Sync rows changed with queryset.update(), which sends no signals"""
+    from .backends import get_search_backend
+
+    search_type = get_search_type(queryset.model)
+    backend = get_search_backend()
+    visible, hidden = [], []
+    for instance in queryset.order_by():
+        (visible if search_type.is_visible(instance) else hidden).append(instance)
+    backend.index(search_type, visible)
+    backend.remove(search_type, [instance.pk for instance in hidden])
+
+
+def connect_signals():
+    for search_type in SEARCH_TYPES.values():
+        post_save.connect(update_document, sender=search_type.model,
+                          dispatch_uid=f'search_update_{search_type.name}')
+        post_delete.connect(remove_document, sender=search_type.model,
+                            dispatch_uid=f'search_remove_{search_type.name}')
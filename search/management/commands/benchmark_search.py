@@ -0,0 +1,145 @@
+import io
+import itertools
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.models import BlogPost
+from courses.models import Course
+from jobs.models import Job
+from products.models import Product
+from search.backends import get_search_backend, load_results
+from site_core.models import Category
+
+WORDS = (
+    'python django developer designer remote lagos abuja marketing market sales manager '
+    'accountant finance data analyst engineer senior junior intern course training online '
+    'photography video editing writer content teacher mathematics physics chemistry music '
+    'business startup product template ebook guide beginner advanced mobile android kotlin '
+    'javascript react frontend backend cloud security network support customer service'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark site search: the old per-type icontains scans versus the search index, '
+        'on synthetic jobs/courses/products/blog posts (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Total rows to generate per run, split across the four types')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--queries', nargs='+',
+                            default=['python', 'senior developer lagos', 'mark', 'zq4417'],
+                            help='Search terms to time')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        # Zipf-like vocabulary: a few very common words and a long tail of rare ones
+        self.vocabulary = WORDS + [f'zq{n}' for n in range(20000)]
+        self.cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self.vocabulary))))
+
+        for rows in options['rows']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{rows} rows'))
+            with transaction.atomic():
+                self.populate(rows)
+                started = time.perf_counter()
+                call_command('rebuild_search_index', stdout=io.StringIO())
+                self.stdout.write(f'  index build {time.perf_counter() - started:.2f}s')
+                for query in options['queries']:
+                    self.compare(query, options['repeat'])
+                transaction.set_rollback(True)
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=words))
+
+    def populate(self, rows):
+        user = get_user_model().objects.create(username=f'search-bench-{time.time_ns()}')
+        categories = {
+            kind: Category.objects.create(name=f'Bench {kind}', category_type=kind)
+            for kind in ('job', 'course', 'product')
+        }
+        now = timezone.now()
+        per_type = rows // 4
+        started = time.perf_counter()
+        for start in range(0, per_type, 5000):
+            chunk = range(start, min(start + 5000, per_type))
+            Job.objects.bulk_create([
+                Job(title=self.text(4), description=self.text(60), category=categories['job'],
+                    job_type='full_time', location=self.text(1), company_name=self.text(2),
+                    salary_min=1000, salary_max=2000, deadline=now + timedelta(days=30),
+                    posted_by=user, status='approved')
+                for _ in chunk
+            ])
+            Course.objects.bulk_create([
+                Course(title=self.text(4), description=self.text(60), category=categories['course'],
+                       instructor=user, duration=10, start_date=now, status='approved')
+                for _ in chunk
+            ])
+            Product.objects.bulk_create([
+                Product(title=self.text(4), description=self.text(60), seller=user, price=100,
+                        category=categories['product'], product_file='product_files/bench.zip',
+                        tags=self.text(3), status='approved')
+                for _ in chunk
+            ])
+            BlogPost.objects.bulk_create([
+                BlogPost(title=self.text(6), slug=f'search-bench-{user.pk}-{n}', excerpt=self.text(20),
+                         content=self.text(250), author=user, status='published', published_at=now)
+                for n in chunk
+            ])
+        self.stdout.write(f'  generated in {time.perf_counter() - started:.2f}s')
+
+    def legacy_search(self, query):
+        """What search_results did before the index: four unranked icontains scans"""
+        results = {
+            'jobs': list(Job.objects.filter(
+                Q(title__icontains=query) | Q(description__icontains=query) | Q(company_name__icontains=query),
+                status='approved'
+            ).select_related('posted_by', 'category')[:10]),
+            'courses': list(Course.objects.filter(
+                Q(title__icontains=query) | Q(description__icontains=query), status='approved'
+            ).select_related('instructor', 'category')[:10]),
+            'products': list(Product.objects.filter(
+                Q(title__icontains=query) | Q(description__icontains=query), status='approved'
+            ).select_related('seller', 'category')[:10]),
+            'blog_posts': list(BlogPost.objects.filter(
+                Q(title__icontains=query) | Q(content__icontains=query) | Q(excerpt__icontains=query),
+                status='published'
+            ).select_related('author', 'category')[:10]),
+        }
+        return sum(len(items) for items in results.values())
+
+    def indexed_search(self, query):
+        """What search_results does now: ranked page of 20, total count, hydration"""
+        search = get_search_backend().query(query)
+        total = search.count()
+        load_results(search[0:20])
+        return total
+
+    def timed(self, func, query, repeat):
+        func(query)  # warm the page cache
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            found = func(query)
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples), found
+
+    def compare(self, query, repeat):
+        legacy_ms, legacy_found = self.timed(self.legacy_search, query, repeat)
+        indexed_ms, indexed_found = self.timed(self.indexed_search, query, repeat)
+        self.stdout.write(
+            f'  {query!r:<26} icontains {legacy_ms:9.2f}ms ({legacy_found} shown)   '
+            f'index {indexed_ms:8.2f}ms ({indexed_found} total)   '
+            f'x{legacy_ms / max(indexed_ms, 0.001):.1f}'
+        )
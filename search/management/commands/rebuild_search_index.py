@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from search.backends import get_search_backend
+from search.index import SEARCH_TYPES
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the site search index from the public jobs, courses, products and blog posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', help=f"Types to rebuild (default: all of {', '.join(SEARCH_TYPES)})")
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows indexed per batch')
+
+    def handle(self, *args, **options):
+        names = options['types'] or list(SEARCH_TYPES)
+        unknown = set(names) - set(SEARCH_TYPES)
+        if unknown:
+            raise CommandError(f"Unknown search types: {', '.join(sorted(unknown))}")
+
+        backend = get_search_backend()
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            for name in names:
+                search_type = SEARCH_TYPES[name]
+                backend.clear(search_type)
+                batch, total = [], 0
+                for instance in search_type.indexable().iterator(chunk_size=batch_size):
+                    batch.append(instance)
+                    if len(batch) >= batch_size:
+                        backend.index(search_type, batch)
+                        total += len(batch)
+                        batch = []
+                backend.index(search_type, batch)
+                total += len(batch)
+                self.stdout.write(f'{name}: indexed {total} rows')
+        backend.optimize()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index with {type(backend).__name__}'))
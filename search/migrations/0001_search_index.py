@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# Frozen copy of the index layout at the time of this migration: rowid = pk << 3 | type code
+TYPE_BITS = 3
+DOCUMENTS = [
+    # (type code, model, visible filter, title field, body fields)
+    (0, 'jobs.Job', {'status': 'approved'}, 'title', ('company_name', 'location', 'description')),
+    (1, 'courses.Course', {'status': 'approved'}, 'title', ('description',)),
+    (2, 'products.Product', {'status': 'approved'}, 'title', ('tags', 'description', 'features')),
+    (3, 'blog.BlogPost', {'status': 'published'}, 'title', ('excerpt', 'content')),
+]
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or not has_fts5(connection):
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    with connection.cursor() as cursor:
+        for code, label, visible, title_field, body_fields in DOCUMENTS:
+            model = apps.get_model(label)
+            rows = [
+                (
+                    (instance.pk << TYPE_BITS) | code,
+                    getattr(instance, title_field) or '',
+                    ' '.join(str(getattr(instance, field) or '') for field in body_fields),
+                )
+                for instance in model.objects.filter(**visible).iterator()
+            ]
+            cursor.executemany('INSERT INTO search_index(rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_alter_job_category_alter_job_favorites_and_more'),
+        ('courses', '0003_alter_course_category'),
+        ('products', '0004_alter_product_category'),
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,3 +1,99 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import BlogPost
+from jobs.models import Job
+from site_core.models import Category
+from . import backends
+from .backends import ScanBackend, get_search_backend
+from .index import reindex_queryset
+
+User = get_user_model()
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass123')
+        self.category = Category.objects.create(name='Tech', category_type='job')
+
+    def make_job(self, title, status='approved', description='Build things'):
+        return Job.objects.create(
+            title=title, description=description, category=self.category, job_type='full_time',
+            location='Lagos', company_name='Acme', salary_min=1000, salary_max=2000,
+            deadline=timezone.now() + timedelta(days=30), posted_by=self.user, status=status
+        )
+
+    def make_post(self, title, content, status='published'):
+        return BlogPost.objects.create(title=title, content=content, author=self.user, status=status)
+
+    def search(self, query, doc_types=None):
+        return list(get_search_backend().query(query, doc_types)[0:50])
+
+    def test_signals_keep_index_in_sync(self):
+        job = self.make_job('Python developer')
+        self.make_job('Python draft', status='draft')
+        self.assertEqual([(hit.doc_type, hit.object_id) for hit in self.search('python')], [('jobs', job.pk)])
+
+        job.title = 'Golang developer'
+        job.save()
+        self.assertEqual(self.search('python'), [])
+        self.assertEqual(len(self.search('golang')), 1)
+
+        job.delete()
+        self.assertEqual(self.search('golang'), [])
+
+    def test_prefix_match_and_title_ranked_first(self):
+        in_body = self.make_post('Weekly notes', 'We are hiring a marketing lead')
+        in_title = self.make_post('Marketing tips', 'Short post')
+        hits = self.search('mark')
+        self.assertEqual([hit.object_id for hit in hits], [in_title.pk, in_body.pk])
+
+    def test_cross_type_pagination_and_type_filter(self):
+        for n in range(3):
+            self.make_job(f'Designer role {n}')
+            self.make_post(f'Designer story {n}', 'Portfolio advice')
+
+        search = get_search_backend().query('designer')
+        self.assertEqual(search.count(), 6)
+        pages = search[0:4] + search[4:8]
+        self.assertEqual(len({(hit.doc_type, hit.object_id) for hit in pages}), 6)
+        self.assertEqual(get_search_backend().query('designer', ['blog']).count(), 3)
+
+    def test_bulk_status_update_is_reindexed(self):
+        job = self.make_job('Data analyst', status='pending')
+        queryset = Job.objects.filter(pk=job.pk)
+        queryset.update(status='approved')
+        reindex_queryset(queryset)
+        self.assertEqual(len(self.search('analyst')), 1)
+
+    def test_results_view_groups_ranked_page(self):
+        job = self.make_job('Kotlin engineer')
+        post = self.make_post('Kotlin for beginners', 'Intro')
+        self.make_post('Kotlin draft', 'Hidden', status='draft')
+
+        response = self.client.get(reverse('search_results'), {'q': 'kotlin'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_results'], 2)
+        self.assertEqual(response.context['results']['jobs'], [job])
+        self.assertEqual(response.context['results']['blog_posts'], [post])
+
+    def test_rebuild_command(self):
+        self.make_job('Cloud architect')
+        get_search_backend().clear()
+        self.assertEqual(self.search('cloud'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search('cloud')), 1)
 
-# Create your tests here.
+    def test_sqlite_without_fts5_falls_back_to_scan(self):
+        job = self.make_job('Python developer')
+        with mock.patch.object(backends, '_backends', {}), \
+                mock.patch.object(backends, 'has_fts5', return_value=False):
+            self.assertIsInstance(get_search_backend(), ScanBackend)
+            self.assertEqual([hit.object_id for hit in self.search('python')], [job.pk])
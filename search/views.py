@@ -1,60 +1,43 @@
 from django.core.paginator import Paginator
-from django.db.models import Q
 from django.shortcuts import render
-from jobs.models import Job
-from courses.models import Course
-from products.models import Product
-from blog.models import BlogPost
+from .backends import get_search_backend, load_results
+
+CATEGORY_TYPES = {
+    'all': ['jobs', 'courses', 'products', 'blog'],
+    'jobs': ['jobs'],
+    'courses': ['courses'],
+    'products': ['products'],
+    'blog': ['blog'],
+}
+RESULTS_PER_PAGE = 20
 
 def search_results(request):
     query = request.GET.get('q', '')
     category = request.GET.get('category', 'all')
-    
+    doc_types = CATEGORY_TYPES.get(category, CATEGORY_TYPES['all'])
+
     results = {
         'jobs': [],
         'courses': [],
         'products': [],
         'blog_posts': [],
     }
-    
+    page_obj = None
+    total_results = 0
+
     if query:
-        if category in ['all', 'jobs']:
-            results['jobs'] = Job.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(company_name__icontains=query),
-                status='approved'
-            ).select_related('posted_by', 'category')[:10]
-        
-        if category in ['all', 'courses']:
-            results['courses'] = Course.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query),
-                status='approved'
-            ).select_related('instructor', 'category')[:10]
-        
-        if category in ['all', 'products']:
-            results['products'] = Product.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query),
-                status='approved'
-            ).select_related('seller', 'category')[:10]
-        
-        if category in ['all', 'blog']:
-            results['blog_posts'] = BlogPost.objects.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(excerpt__icontains=query),
-                status='published'
-            ).select_related('author', 'category')[:10]
-    
-    total_results = sum(len(items) for items in results.values())
-    
+        # One ranked list across all types, paged before any model rows are loaded
+        paginator = Paginator(get_search_backend().query(query, doc_types), RESULTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        results = load_results(page_obj.object_list)
+        total_results = paginator.count
+
     context = {
         'query': query,
         'category': category,
         'results': results,
         'total_results': total_results,
+        'page_obj': page_obj,
     }
-    
-    return render(request, 'search/results.html', context)
\ No newline at end of file
+
+    return render(request, 'search/results.html', context)
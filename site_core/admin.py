@@ -1,15 +1,19 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import path
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
 from django.db import transaction
 
-from .models import SiteSetting, MonnifyBank, AdminNotification, Category
+from .models import (
+    SiteSetting, MonnifyBank, AdminNotification, Category, DailyMetric, BackgroundTask, DeadLetterTask, RequestMetric,
+    QueryMetric, ImageDerivative,
+)
 from accounts.models import KYCVerification, VirtualAccount, User
 from payments.models import ManualDeposit
 from payments.monnify_service import MonnifyService
+from accounts.tasks import queue_bulk_kyc_provisioning, queue_kyc_provisioning
 
 @admin.register(SiteSetting)
 class SiteSettingAdmin(admin.ModelAdmin):
@@ -73,6 +77,55 @@ class SiteSettingAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return False
 
+@admin.register(DailyMetric)
+class DailyMetricAdmin(admin.ModelAdmin):
+    list_display = ('date', 'metric', 'value', 'updated_at')
+    list_filter = ('metric',)
+    date_hierarchy = 'date'
+    readonly_fields = ('date', 'metric', 'value', 'updated_at')
+
+@admin.register(RequestMetric)
+class RequestMetricAdmin(admin.ModelAdmin):
+    list_display = ('url_name', 'hour', 'requests', 'errors', 'max_ms', 'queries', 'updated_at')
+    list_filter = ('hour',)
+    search_fields = ('url_name',)
+    date_hierarchy = 'hour'
+
+@admin.register(QueryMetric)
+class QueryMetricAdmin(admin.ModelAdmin):
+    list_display = ('url_name', 'hour', 'count', 'total_ms', 'max_ms', '__str__')
+    search_fields = ('url_name', 'sql')
+    date_hierarchy = 'hour'
+
+@admin.register(ImageDerivative)
+class ImageDerivativeAdmin(admin.ModelAdmin):
+    list_display = ('source', 'variant', 'format', 'width', 'height', 'size', 'created_at')
+    list_filter = ('variant', 'format', 'version')
+    search_fields = ('source', 'name')
+    readonly_fields = ('created_at',)
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'queue', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_by')
+    list_filter = ('status', 'queue', 'name')
+    readonly_fields = ('created_at', 'updated_at', 'locked_by', 'locked_at', 'last_error')
+
+@admin.register(DeadLetterTask)
+class DeadLetterTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'queue', 'attempts', 'created_at', 'failed_at')
+    list_filter = ('queue', 'name')
+    readonly_fields = ('name', 'queue', 'payload', 'attempts', 'last_error', 'created_at', 'failed_at')
+    actions = ['requeue_tasks']
+
+    def requeue_tasks(self, request, queryset):
+        count = 0
+        for dead in queryset:
+            dead.requeue()
+            count += 1
+        self.message_user(request, f"✅ Queued {count} task(s) again")
+
+    requeue_tasks.short_description = "🔄 Queue selected tasks again"
+
 @admin.register(MonnifyBank)
 class MonnifyBankAdmin(admin.ModelAdmin):
     list_display = ('bank_name', 'bank_code', 'is_active', 'is_default', 'created_at')
@@ -86,7 +139,7 @@ class MonnifyBankAdmin(admin.ModelAdmin):
         success, message = monnify_service.sync_banks_to_database()
         
         if success:
-            self.message_user(request, "✅ Banks successfully fetched and synced from Monnify!")
+            self.message_user(request, f"✅ {message}")
         else:
             self.message_user(request, f"❌ {message}", messages.ERROR)
     
@@ -182,74 +235,18 @@ class KYCVerificationAdmin(admin.ModelAdmin):
 
     def approve_kyc(self, request, object_id):
         kyc = get_object_or_404(KYCVerification, id=object_id)
-        approve_kyc.short_description = "Approve selected KYC records"
         
         if kyc.status != 'pending':
             self.message_user(request, f"❌ KYC for {kyc.user.username} is not pending approval", messages.ERROR)
             return redirect('admin:accounts_kycverification_changelist')
 
-        try:
-            with transaction.atomic():
-                # Create virtual account using Monnify
-                monnify_service = MonnifyService()
-                kyc_data = {
-                    'legal_first_name': kyc.legal_first_name,
-                    'legal_last_name': kyc.legal_last_name,
-                }
-                
-                # Get user's preferred banks
-                preferred_banks = list(kyc.user.bank_preferences.filter(is_active=True).values_list('bank__bank_code', flat=True))
-                
-                account_data, error = monnify_service.create_reserved_account(kyc.user, kyc_data, preferred_banks)
-                
-                if account_data and account_data.get('accounts'):
-                    # Create virtual account records for each bank
-                    for account in account_data['accounts']:
-                        VirtualAccount.objects.create(
-                            user=kyc.user,
-                            account_number=account['accountNumber'],
-                            account_name=account['accountName'],
-                            bank_name=account['bankName'],
-                            bank_code=account['bankCode'],
-                            reference=account_data['accountReference'],
-                            is_primary=False  # First account will be primary
-                        )
-                    
-                    # Set first account as primary
-                    first_account = VirtualAccount.objects.filter(user=kyc.user).first()
-                    if first_account:
-                        first_account.is_primary = True
-                        first_account.save()
-                    
-                    # Update KYC status
-                    kyc.status = 'approved'
-                    kyc.monnify_customer_reference = account_data.get('customerReference', '')
-                    kyc.reviewed_at = timezone.now()
-                    kyc.reviewed_by = request.user
-                    kyc.save()
-                    
-                    self.message_user(
-                        request, 
-                        f"✅ KYC approved and virtual accounts created for {kyc.user.username}! Account reference: {account_data['accountReference']}", 
-                        messages.SUCCESS
-                    )
-                    
-                    # Send notification to user (you can implement this)
-                    self._send_kyc_approval_notification(kyc.user)
-                    
-                else:
-                    self.message_user(
-                        request, 
-                        f"❌ Failed to create virtual account for {kyc.user.username}: {error}", 
-                        messages.ERROR
-                    )
-                    
-        except Exception as e:
-            self.message_user(
-                request, 
-                f"❌ Error approving KYC for {kyc.user.username}: {str(e)}", 
-                messages.ERROR
-            )
+        # Monnify is called by a background worker, which approves the KYC once the accounts exist
+        queue_kyc_provisioning(kyc, request.user.pk)
+        self.message_user(
+            request,
+            f"✅ KYC approval queued for {kyc.user.username}; virtual accounts are being created.",
+            messages.SUCCESS
+        )
         
         return redirect('admin:accounts_kycverification_changelist')
     
@@ -282,25 +279,17 @@ class KYCVerificationAdmin(admin.ModelAdmin):
 
     def approve_selected_kyc(self, request, queryset):
         """Admin action to approve multiple KYC verifications"""
-        approved_count = 0
-        failed_count = 0
-        
-        for kyc in queryset.filter(status='pending'):
-            try:
-                # Simulate the approval process (you can call approve_kyc logic here)
-                kyc.status = 'approved'
-                kyc.reviewed_at = timezone.now()
-                kyc.reviewed_by = request.user
-                kyc.save()
-                approved_count += 1
-            except Exception as e:
-                failed_count += 1
-                # Log the error but continue with others
-        
-        if approved_count:
-            self.message_user(request, f"✅ Successfully approved {approved_count} KYC verification(s)", messages.SUCCESS)
-        if failed_count:
-            self.message_user(request, f"❌ Failed to approve {failed_count} KYC verification(s)", messages.ERROR)
+        pending = list(queryset.filter(status='pending').only('pk'))
+        if not pending:
+            self.message_user(request, "❌ None of the selected KYC verifications are pending", messages.ERROR)
+            return
+        batches = queue_bulk_kyc_provisioning(pending, request.user.pk)
+        self.message_user(
+            request,
+            f"✅ Queued virtual account creation for {len(pending)} KYC verification(s) in {batches} batch(es). "
+            f"Each is approved once its accounts exist; failures are retried and listed under Background tasks.",
+            messages.SUCCESS
+        )
     
     approve_selected_kyc.short_description = "✅ Approve selected KYC verifications"
 
@@ -317,11 +306,6 @@ class KYCVerificationAdmin(admin.ModelAdmin):
     
     reject_selected_kyc.short_description = "❌ Reject selected KYC verifications"
 
-    def _send_kyc_approval_notification(self, user):
-        """Send notification to user about KYC approval"""
-        # Implement your notification logic here (email, in-app notification, etc.)
-        print(f"KYC approved notification sent to {user.email}")
-
 @admin.register(VirtualAccount)
 class VirtualAccountAdmin(admin.ModelAdmin):
     list_display = ('user', 'account_number', 'bank_name', 'is_active', 'is_primary', 'created_at')
@@ -0,0 +1,210 @@
+"""Daily rollups behind the admin analytics pages.
+
+``rollup_days`` recomputes whole days from the source tables with one grouped
+query per metric and replaces that day's DailyMetric/UserDailyMetric rows, so
+re-running it is always safe. The rollup_metrics command runs it for the days
+since the last rollup (today included); the admin views then only sum
+pre-aggregated rows per period instead of scanning every model, and cache the
+summary until the next rollup or midnight changes it. Until the first rollup
+the top earners are read from the ledger, so the dashboard panel is not empty.
+"""
+import uuid
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import User
+from blog.models import BlogPost
+from courses.models import Course
+from jobs.models import Job
+from payments.models import Transaction
+from products.models import Product
+from .models import DailyMetric, UserDailyMetric
+
+EARNING_TYPES = ['sale', 'commission']
+CONTENT_SOURCES = [
+    # (metric / UserDailyMetric field, model, owner field)
+    ('jobs', Job, 'posted_by'),
+    ('courses', Course, 'instructor'),
+    ('products', Product, 'seller'),
+    ('posts', BlogPost, 'author'),
+]
+BATCH_SIZE = 2000
+ROLLUP_VERSION_KEY = 'site_core:analytics:version'
+SUMMARY_TIMEOUT = 24 * 60 * 60
+
+
+def _day_bounds(start_date, end_date):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min), tz),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz),
+    )
+
+
+def _per_user_day(queryset, date_field, user_field, start, end, value=None):
+    return (
+        queryset.filter(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+        .annotate(day=TruncDate(date_field))
+        .values_list('day', user_field)
+        .annotate(value=value or Count('pk'))
+        .order_by()
+    )
+
+
+def rollup_days(start_date, end_date):
+    """Recompute the rollups for every day in [start_date, end_date]"""
+    start, end = _day_bounds(start_date, end_date)
+    totals = defaultdict(Decimal)
+    per_user = {}
+
+    def user_row(day, user_id):
+        row = per_user.get((day, user_id))
+        if row is None:
+            row = per_user[(day, user_id)] = UserDailyMetric(date=day, user_id=user_id)
+        return row
+
+    for day, signups in (
+        User.objects.filter(date_joined__gte=start, date_joined__lt=end)
+        .annotate(day=TruncDate('date_joined')).values_list('day').annotate(total=Count('pk')).order_by()
+    ):
+        totals[(day, 'signups')] += signups
+
+    # last_login is overwritten on every login, so each rollup run captures
+    # the users seen since the previous one; run it at least daily
+    for day, user_id in (
+        User.objects.filter(last_login__gte=start, last_login__lt=end)
+        .annotate(day=TruncDate('last_login')).values_list('day', 'pk')
+    ):
+        user_row(day, user_id).active = True
+        totals[(day, 'active_users')] += 1
+
+    for field, model, owner in CONTENT_SOURCES:
+        for day, user_id, count in _per_user_day(model.objects.all(), 'created_at', owner, start, end):
+            row = user_row(day, user_id)
+            setattr(row, field, count)
+            row.content += count
+            totals[(day, field)] += count
+
+    earnings = Transaction.objects.filter(status='completed', transaction_type__in=EARNING_TYPES)
+    for day, user_id, amount in _per_user_day(earnings, 'created_at', 'user', start, end, Sum('amount')):
+        user_row(day, user_id).earnings = amount
+        totals[(day, 'earnings')] += amount
+
+    # Users active on a day who have logged in again since keep their earlier flag
+    previously_active = set(
+        UserDailyMetric.objects.filter(date__gte=start_date, date__lte=end_date, active=True)
+        .values_list('date', 'user_id')
+    )
+    for day, user_id in previously_active:
+        row = user_row(day, user_id)
+        if not row.active:
+            row.active = True
+            totals[(day, 'active_users')] += 1
+
+    with transaction.atomic():
+        DailyMetric.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        UserDailyMetric.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        DailyMetric.objects.bulk_create(
+            [DailyMetric(date=day, metric=metric, value=value) for (day, metric), value in totals.items()],
+            batch_size=BATCH_SIZE,
+        )
+        UserDailyMetric.objects.bulk_create(per_user.values(), batch_size=BATCH_SIZE)
+        transaction.on_commit(lambda: cache.set(ROLLUP_VERSION_KEY, uuid.uuid4().hex, None))
+    return len(per_user)
+
+
+def next_rollup_start():
+    """First day that still needs rolling up (today's bucket is always partial)"""
+    last = DailyMetric.objects.aggregate(last=Max('date'))['last']
+    if last is not None:
+        return last
+    first_user = User.objects.aggregate(first=Min('date_joined'))['first']
+    return timezone.localdate(first_user) if first_user else timezone.localdate()
+
+
+def period_start(days):
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def get_period_totals(days):
+    start_date = period_start(days)
+    totals = dict(
+        DailyMetric.objects.filter(date__gte=start_date).values_list('metric').annotate(total=Sum('value'))
+    )
+    metrics = {metric: int(totals.get(metric, 0)) for metric, _ in DailyMetric.METRICS if metric != 'earnings'}
+    metrics['earnings'] = totals.get('earnings', Decimal('0'))
+    # Distinct over the window: a user active on several days counts once
+    metrics['active_users'] = UserDailyMetric.objects.filter(
+        date__gte=start_date, active=True
+    ).values('user_id').distinct().count()
+    return metrics
+
+
+def get_top_earners(days, limit=10):
+    return (
+        UserDailyMetric.objects.filter(date__gte=period_start(days), earnings__gt=0)
+        .values('user__username', 'user__profile__country')
+        .annotate(total_earned=Sum('earnings'))
+        .order_by('-total_earned')[:limit]
+    )
+
+
+def get_live_top_earners(days, limit=10):
+    """get_top_earners straight from the ledger, for before the first rollup"""
+    start, _ = _day_bounds(period_start(days), timezone.localdate())
+    return (
+        Transaction.objects.filter(status='completed', transaction_type__in=EARNING_TYPES, created_at__gte=start)
+        .values('user__username', 'user__profile__country')
+        .annotate(total_earned=Sum('amount'))
+        .order_by('-total_earned')[:limit]
+    )
+
+
+def get_top_posters(days, limit=10):
+    return (
+        UserDailyMetric.objects.filter(date__gte=period_start(days), content__gt=0)
+        .values('user_id')
+        .annotate(
+            username=F('user__username'),
+            job_count=Sum('jobs'),
+            course_count=Sum('courses'),
+            product_count=Sum('products'),
+            post_count=Sum('posts'),
+            total_content=Sum('content'),
+        )
+        .order_by('-total_content')[:limit]
+    )
+
+
+def get_last_rollup():
+    return DailyMetric.objects.aggregate(updated=Max('updated_at'))['updated']
+
+
+def get_period_summary(days):
+    """Everything the analytics page shows for a window, cached per rollup run and day"""
+    version = cache.get(ROLLUP_VERSION_KEY)
+    if version is None:
+        cache.add(ROLLUP_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(ROLLUP_VERSION_KEY)
+    # The window moves at midnight even when no rollup has run since
+    key = f'site_core:analytics:{version}:{timezone.localdate().isoformat()}:{days}'
+    summary = cache.get(key)
+    if summary is None:
+        updated_at = get_last_rollup()
+        top_earners = get_top_earners(days) if updated_at else get_live_top_earners(days)
+        summary = {
+            'totals': get_period_totals(days),
+            'top_earners': list(top_earners),
+            'top_posters': list(get_top_posters(days)),
+            'updated_at': updated_at,
+        }
+        cache.set(key, summary, SUMMARY_TIMEOUT)
+    return summary
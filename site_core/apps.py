@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class SiteCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'site_core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import images
+        from .db import configure_sqlite
+        from .http_cache import connect_signals
+        connect_signals()
+        images.connect_signals()
+        connection_created.connect(configure_sqlite, dispatch_uid='site_core.configure_sqlite')
+        # Register the background tasks defined in each app's tasks.py
+        autodiscover_modules('tasks')
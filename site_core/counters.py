@@ -0,0 +1,125 @@
+"""Buffered view/download counters.
+
+Detail pages used to bump ``views_count`` with a read-modify-write
+``save(update_fields=...)`` per hit, which takes the SQLite write lock on
+every request and loses increments when two requests race. Increments now
+accumulate in a per-process buffer and are written as
+``UPDATE ... SET field = field + n`` for whole groups of rows at once, when
+the buffer reaches ``COUNTER_FLUSH_THRESHOLD`` pending hits or
+``COUNTER_FLUSH_INTERVAL`` seconds after the first unflushed hit.
+
+Whatever is still buffered when the process exits is flushed by an atexit
+hook; servers that kill workers without running it should call the
+``flush_counters`` management command from their worker-exit hook.
+
+Under ``manage.py test``, site_core.test_runner.TestRunner switches the timer
+off and discards the buffer before each test and before the test databases
+are destroyed.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 10  # seconds
+DEFAULT_FLUSH_THRESHOLD = 500  # pending increments
+UPDATE_BATCH_SIZE = 500
+
+
+class CounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)  # (model label, pk, field) -> amount
+        self._size = 0
+        self._timer = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'COUNTER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def flush_threshold(self):
+        return getattr(settings, 'COUNTER_FLUSH_THRESHOLD', DEFAULT_FLUSH_THRESHOLD)
+
+    def increment(self, instance, field, amount=1):
+        with self._lock:
+            self._pending[(instance._meta.label, instance.pk, field)] += amount
+            self._size += amount
+            full = self._size >= self.flush_threshold
+            if not full and self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def pending(self, instance, field):
+        """Increments for instance.field not yet written to the database"""
+        with self._lock:
+            return self._pending.get((instance._meta.label, instance.pk, field), 0)
+
+    def flush(self):
+        """Write every buffered increment; returns the number of hits flushed"""
+        with self._lock:
+            pending = self._take()
+        if not pending:
+            return 0
+
+        # Rows that gained the same amount share one UPDATE ... WHERE pk IN (...)
+        grouped = defaultdict(list)
+        for (label, pk, field), amount in pending.items():
+            grouped[(label, field, amount)].append(pk)
+        try:
+            with transaction.atomic():
+                for (label, field, amount), pks in grouped.items():
+                    model = apps.get_model(label)
+                    for start in range(0, len(pks), UPDATE_BATCH_SIZE):
+                        model.objects.filter(pk__in=pks[start:start + UPDATE_BATCH_SIZE]).update(
+                            **{field: F(field) + amount}
+                        )
+        except Exception:
+            logger.exception("Failed to flush %d counter hits; keeping them buffered", sum(pending.values()))
+            with self._lock:
+                for key, amount in pending.items():
+                    self._pending[key] += amount
+                    self._size += amount
+            return 0
+        return sum(pending.values())
+
+    def discard(self):
+        """Drop every buffered increment without writing it; returns the number of hits dropped"""
+        with self._lock:
+            return sum(self._take().values())
+
+    def _take(self):
+        # Called with the lock held
+        pending, self._pending = self._pending, defaultdict(int)
+        self._size = 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return pending
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own connection; don't leak it
+            connection.close()
+
+
+counter_buffer = CounterBuffer()
+atexit.register(counter_buffer.flush)
+
+
+def increment_counter(instance, field, amount=1):
+    counter_buffer.increment(instance, field, amount)
@@ -0,0 +1,132 @@
+"""SQLite connection tuning and read-replica routing.
+
+``configure_sqlite`` runs on every new SQLite connection. It switches the
+database to WAL, so readers no longer wait for the counter, webhook and
+session writers, and applies the other pragmas in ``SQLITE_PRAGMAS``. A
+database alias may override them with its own ``PRAGMAS`` entry.
+
+ReplicaRouter sends writes, migrations and reads inside a transaction to
+``default``. Other reads go to a random alias from ``READ_REPLICAS``, but only
+inside ``replica_reads()``. ReplicaRoutingMiddleware opens that scope for GET
+and HEAD requests. Every other request, and anything outside a request
+(commands, tasks, tests), reads from the primary.
+
+After a POST the middleware sets a short-lived cookie. That client's reads then
+stay on the primary for ``REPLICA_STICKY_SECONDS``, so replication lag never
+hides the client's own write. A GET that writes pins the rest of its request
+and its client the same way.
+"""
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # safe with WAL: a power loss can drop the last commits, never corrupt
+    'busy_timeout': 5000,  # ms to wait for a writer's lock instead of failing with "database is locked"
+    'cache_size': -20000,  # KiB of page cache per connection
+    'mmap_size': 134217728,  # bytes of the file read through mmap
+    'temp_store': 'MEMORY',
+}
+DEFAULT_STICKY_SECONDS = 10
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver applying the SQLite pragmas to each new connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if pragmas is None:
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            try:
+                cursor.execute(f'PRAGMA {name} = {value}')
+            except OperationalError as e:
+                # e.g. switching a read-only replica file's journal mode
+                logger.warning("Could not set PRAGMA %s=%s on %s: %s", name, value, connection.alias, e)
+
+
+class RoutingState:
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Let reads in the block go to the replicas (or, with ``enabled=False``, keep them on the primary)"""
+    state = RoutingState(enabled)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def use_primary():
+    """Read from the primary for the rest of the block, e.g. right before a read-modify-write"""
+    return replica_reads(enabled=False)
+
+
+def replica_aliases():
+    return [alias for alias in getattr(settings, 'READ_REPLICAS', ()) if alias in connections]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replicas or state.wrote:
+            return DEFAULT_DB_ALIAS
+        replicas = replica_aliases()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, never migrated on their own
+        return db not in replica_aliases()
+
+
+class ReplicaRoutingMiddleware:
+    """Route the reads of safe, unpinned requests to READ_REPLICAS; pin clients to the primary after a write"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'READ_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        with replica_reads(safe and PIN_COOKIE not in request.COOKIES) as state:
+            response = self.get_response(request)
+        if not safe or state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS),
+                httponly=True, samesite='Lax',
+            )
+        return response
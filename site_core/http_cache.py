@@ -0,0 +1,195 @@
+"""Conditional GETs and anonymous page caching for the public listing/detail pages.
+
+Each tracked model has a version in the cache that post_save/post_delete (and
+explicit ``invalidate_models`` calls after bulk ``update()``s) replace with the
+time of the change. A response's validator is the Max(updated_at)/Count of the
+queryset it is built from, cached under the versions of the models it depends
+on, so a warm request computes its ETag and Last-Modified without touching the
+database. Matching If-None-Match/If-Modified-Since requests get a 304 before
+anything is rendered, and anonymous HTML is cached per ETag, so a save makes
+both the validators and the cached pages unreachable at once.
+"""
+import hashlib
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Count, Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .counters import increment_counter
+
+# Models whose changes invalidate public pages; every cached page also depends on the site-wide ones
+TRACKED_MODELS = [
+    'jobs.Job',
+    'courses.Course',
+    'products.Product',
+    'blog.BlogPost',
+    'blog.BlogComment',
+    'blog.Category',
+    'blog.Tag',
+    'site_core.Category',
+    'site_core.SiteSetting',
+]
+SITE_WIDE_MODELS = ['site_core.Category', 'site_core.SiteSetting']
+VERSION_KEY = 'http_cache:version:{}'
+
+
+def _timeout():
+    return getattr(settings, 'HTTP_CACHE_TIMEOUT', 600)
+
+
+def model_version(label):
+    """Time of the last change to a model, as a string (set lazily on first use)"""
+    key = VERSION_KEY.format(label.lower())
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, repr(time.time()), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_models(*models):
+    """Bump the version of each model; for callers that change rows with update()"""
+    now = repr(time.time())
+    cache.set_many({VERSION_KEY.format(model._meta.label_lower): now for model in models}, None)
+
+
+def _invalidate_sender(sender, **kwargs):
+    invalidate_models(sender)
+
+
+def _invalidate_m2m(sender, instance, model, **kwargs):
+    invalidate_models(type(instance), model)
+
+
+def connect_signals():
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        uid = f'http_cache_{model._meta.label_lower}'
+        post_save.connect(_invalidate_sender, sender=model, dispatch_uid=f'{uid}_save')
+        post_delete.connect(_invalidate_sender, sender=model, dispatch_uid=f'{uid}_delete')
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(_invalidate_m2m, sender=field.remote_field.through,
+                                dispatch_uid=f'{uid}_{field.name}')
+
+
+class Validator:
+    """ETag/Last-Modified of one response, plus the pk when it covers a single row"""
+
+    def __init__(self, etag, last_modified, count, pk):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.count = count
+        self.pk = pk
+
+    def conditional_response(self, request):
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def apply(self, response):
+        response.headers.setdefault('ETag', self.etag)
+        if self.last_modified:
+            response.headers.setdefault('Last-Modified', http_date(self.last_modified))
+        # Browsers may keep the page but must revalidate it on every use
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return response
+
+
+def get_validator(request, queryset, depends_on=(), variant=''):
+    """Validator for a response built from ``queryset`` at this URL.
+
+    ``depends_on`` lists extra model labels shown on the page; ``variant``
+    separates representations of one URL (e.g. the negotiated API format).
+    """
+    labels = sorted({queryset.model._meta.label, *SITE_WIDE_MODELS, *depends_on})
+    versions = [model_version(label) for label in labels]
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        sql = 'empty'
+    digest = hashlib.md5(f'{sql}|{versions}'.encode()).hexdigest()
+    key = f'http_cache:validator:{digest}'
+    state = cache.get(key)
+    if state is None:
+        stats = queryset.order_by().aggregate(updated=Max('updated_at'), count=Count('pk'), pk=Max('pk'))
+        updated = stats['updated'].timestamp() if stats['updated'] else 0
+        state = (updated, stats['count'], stats['pk'])
+        cache.set(key, state, _timeout())
+
+    updated, count, pk = state
+    # Deletes and dependency edits move no updated_at, so the versions count too
+    last_modified = int(max([updated, *(float(version) for version in versions)]))
+    seed = f'{digest}|{updated}|{count}|{request.get_full_path()}|{variant}'
+    etag = '"%s"' % hashlib.md5(seed.encode()).hexdigest()
+    return Validator(etag, last_modified, count, pk)
+
+
+def _is_cacheable_page(request, response):
+    return (
+        response.status_code == 200
+        and not response.cookies
+        # The page embeds a CSRF token, which must not be shared between visitors
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+class ConditionalPageMixin:
+    """Conditional GETs and page caching for anonymous visitors of a ListView/DetailView.
+
+    Set ``cache_depends_on`` to the other models a page renders and
+    ``hit_counter_field`` on detail views that count views, so that 304s and
+    cache hits still count.
+    """
+    cache_depends_on = ()
+    hit_counter_field = None
+
+    @property
+    def is_detail(self):
+        return 'pk' in self.kwargs or 'slug' in self.kwargs
+
+    def get_validator_queryset(self):
+        queryset = self.get_queryset()
+        if 'pk' in self.kwargs:
+            queryset = queryset.filter(pk=self.kwargs['pk'])
+        elif 'slug' in self.kwargs:
+            queryset = queryset.filter(**{self.get_slug_field(): self.kwargs['slug']})
+        return queryset
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated or len(get_messages(request)):
+            return super().dispatch(request, *args, **kwargs)
+
+        validator = get_validator(request, self.get_validator_queryset(), self.cache_depends_on)
+        if self.is_detail and not validator.count:
+            # Missing or not public: let the view decide (404, drafts, ...)
+            return super().dispatch(request, *args, **kwargs)
+
+        response = validator.conditional_response(request)
+        if response is None:
+            page = cache.get(f'http_cache:page:{validator.etag}')
+            if page is not None:
+                content, content_type = page
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+        if response is not None:
+            self.count_hit(validator)
+            return validator.apply(response)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if _is_cacheable_page(request, response):
+            cache.set(f'http_cache:page:{validator.etag}', (response.content, response['Content-Type']), _timeout())
+            response['X-Cache'] = 'MISS'
+            validator.apply(response)
+        return response
+
+    def count_hit(self, validator):
+        if self.hit_counter_field and validator.pk is not None:
+            increment_counter(self.model(pk=validator.pk), self.hit_counter_field)
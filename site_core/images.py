@@ -0,0 +1,260 @@
+"""Resized WebP/JPEG derivatives of uploaded images.
+
+Listing cards, avatars and blog headers used to load the uploaded originals,
+often multi-megabyte phone photos. Each variant in VARIANTS now has its own
+pair of files: a WebP, plus a JPEG fallback (PNG when the image has
+transparency). Both are stored under ``derivatives/`` with names taken from
+a hash of their content, so ``serve_derivative`` marks them cacheable
+forever. Re-uploading an image produces new names.
+
+Derivatives are generated in two ways:
+- at upload time, by a background task queued when one of IMAGE_FIELDS
+  gets a new file
+- lazily, when a page is rendered before that task ran. The ``{% picture %}``
+  tag then links to ``image_derivative`` with a signed token. The first
+  request generates the files and redirects to them.
+
+Lookups go through the cache, so rendering a card costs one cache get.
+Templates use ``{% picture %}`` / ``{% image_url %}`` from the ``images`` tag
+library; the API exposes the same URLs through ImageVariantsField.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_init, post_save
+from django.http import FileResponse, Http404
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+from PIL import Image, ImageOps
+
+from .models import ImageDerivative
+
+logger = logging.getLogger(__name__)
+
+# name -> (width, height, mode); 'cover' crops to fill the box, 'fit' keeps the whole image inside it.
+# Boxes are twice the CSS size the templates display them at, for high-density screens.
+VARIANTS = {
+    'thumb': (96, 96, 'cover'),  # h-10 w-10 table icons
+    'avatar': (256, 256, 'cover'),  # profile pictures up to w-32
+    'card': (768, 384, 'cover'),  # h-48 listing cards
+    'hero': (1600, 768, 'cover'),  # blog headers up to h-96
+    'gallery': (1600, 1600, 'fit'),
+}
+# model label.field -> variants generated when a new file is uploaded
+IMAGE_FIELDS = {
+    'products.Product.thumbnail': ('card', 'thumb'),
+    'products.ProductImage.image': ('gallery', 'thumb'),
+    'courses.Course.thumbnail': ('card', 'thumb'),
+    'accounts.UserProfile.profile_picture': ('avatar', 'thumb'),
+    'blog.BlogPost.featured_image': ('hero', 'card'),
+}
+FORMATS = ('webp', 'fallback')
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+CACHE_TIMEOUT = 24 * 3600
+PENDING_CACHE_TIMEOUT = 30  # seconds a "not generated yet" lookup is remembered
+SIGNING_SALT = 'site_core.images'
+DERIVATIVES_DIR = 'derivatives'
+VERSION = 1  # bump to regenerate everything after changing the encoders
+
+
+class DerivativeError(Exception):
+    """The source is missing or isn't a readable image"""
+
+
+def enabled():
+    return getattr(settings, 'IMAGE_DERIVATIVES_ENABLED', True)
+
+
+def source_prefixes():
+    """Upload directories derivatives may be generated from (never KYC documents and the like)"""
+    prefixes = set()
+    for path in IMAGE_FIELDS:
+        label, field_name = path.rsplit('.', 1)
+        upload_to = apps.get_model(label)._meta.get_field(field_name).upload_to
+        if isinstance(upload_to, str):
+            prefixes.add(upload_to.rstrip('/') + '/')
+    return tuple(sorted(prefixes))
+
+
+def _cache_key(source, variant):
+    return f'site_core:image:{VERSION}:{variant}:{hashlib.sha1(source.encode()).hexdigest()}'
+
+
+def get_derivatives(source, variant):
+    """{format: (url, width, height)} for a generated variant, or None while it doesn't exist yet"""
+    key = _cache_key(source, variant)
+    found = cache.get(key)
+    if found is None:
+        rows = ImageDerivative.objects.filter(source=source, variant=variant, version=VERSION)
+        found = {row.format: (default_storage.url(row.name), row.width, row.height) for row in rows}
+        cache.set(key, found, CACHE_TIMEOUT if len(found) == len(FORMATS) else PENDING_CACHE_TIMEOUT)
+    return found if len(found) == len(FORMATS) else None
+
+
+def lazy_url(source, variant, image_format):
+    """URL that generates the derivative on first request and redirects to it"""
+    token = signing.dumps([source, variant, image_format], salt=SIGNING_SALT, compress=True)
+    return reverse('image_derivative', args=[token])
+
+
+def read_token(token):
+    """(source, variant, format) from a lazy URL token; raises signing.BadSignature"""
+    source, variant, image_format = signing.loads(token, salt=SIGNING_SALT)
+    if variant not in VARIANTS or image_format not in FORMATS or not source.startswith(source_prefixes()):
+        raise signing.BadSignature('Not a derivative this site generates')
+    return source, variant, image_format
+
+
+def variant_urls(source, variant):
+    """{'webp': url, 'fallback': url, 'width': w, 'height': h}, using lazy URLs until generated"""
+    found = get_derivatives(source, variant)
+    if found:
+        webp_url, width, height = found['webp']
+        return {'webp': webp_url, 'fallback': found['fallback'][0], 'width': width, 'height': height}
+    width, height, mode = VARIANTS[variant]
+    return {
+        'webp': lazy_url(source, variant, 'webp'),
+        'fallback': lazy_url(source, variant, 'fallback'),
+        # A 'fit' variant's real size is only known once generated
+        'width': width if mode == 'cover' else None,
+        'height': height if mode == 'cover' else None,
+    }
+
+
+def _resize(image, variant):
+    width, height, mode = VARIANTS[variant]
+    if mode == 'cover':
+        if image.width <= width and image.height <= height:
+            return image.copy()
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.Resampling.LANCZOS)  # never upscales
+    return resized
+
+
+def _encode(image, image_format):
+    """(bytes, extension) of ``image`` in ``image_format``"""
+    buffer = BytesIO()
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if image_format == 'webp':
+        image.convert('RGBA' if has_alpha else 'RGB').save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+        return buffer.getvalue(), 'webp'
+    if has_alpha:
+        image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue(), 'png'
+    image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue(), 'jpg'
+
+
+def generate(source, variants, storage=None):
+    """Write every format of ``variants`` for ``source``; returns the ImageDerivative rows"""
+    storage = storage or default_storage
+    try:
+        with storage.open(source, 'rb') as handle:
+            original = Image.open(handle)
+            original.load()
+    except (OSError, ValueError) as e:
+        raise DerivativeError(f'Cannot read image {source}: {e}') from e
+    original = ImageOps.exif_transpose(original)
+
+    rows = []
+    for variant in variants:
+        resized = _resize(original, variant)
+        for image_format in FORMATS:
+            data, extension = _encode(resized, image_format)
+            digest = hashlib.sha256(data).hexdigest()
+            name = f'{DERIVATIVES_DIR}/{variant}/{digest[:2]}/{digest[2:18]}.{extension}'
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(data))
+            row, _ = ImageDerivative.objects.update_or_create(
+                source=source, variant=variant, format=image_format, version=VERSION,
+                defaults={'name': name, 'width': resized.width, 'height': resized.height, 'size': len(data)},
+            )
+            rows.append(row)
+        cache.delete(_cache_key(source, variant))
+    return rows
+
+
+def ensure(source, variant):
+    """The variant's derivatives, generating them if needed"""
+    return get_derivatives(source, variant) or {
+        row.format: (default_storage.url(row.name), row.width, row.height)
+        for row in generate(source, [variant])
+    }
+
+
+_fields_by_model = {}  # model -> {image field name: variants}
+_UNKNOWN = object()
+
+
+def _stored_names(sender, instance):
+    # Raw values from __dict__: reading a deferred field would cost a query per instance
+    names = {}
+    for field_name in _fields_by_model[sender]:
+        value = instance.__dict__.get(field_name, _UNKNOWN)
+        names[field_name] = value if value is _UNKNOWN else str(value or '')
+    return names
+
+
+def _remember_names(sender, instance, **kwargs):
+    instance._image_names = _stored_names(sender, instance)
+
+
+def _queue_new_uploads(sender, instance, raw=False, **kwargs):
+    if raw or not enabled():
+        return
+    from .tasks import generate_image_derivatives
+
+    previous = getattr(instance, '_image_names', {})
+    current = _stored_names(sender, instance)
+    for field_name, variants in _fields_by_model[sender].items():
+        name = current[field_name]
+        if name is not _UNKNOWN and name and name != previous.get(field_name):
+            generate_image_derivatives.schedule(
+                {'source': name, 'variants': list(variants)}, unique_key=f'image:{name}',
+            )
+    instance._image_names = current
+
+
+def connect_signals():
+    for path, variants in IMAGE_FIELDS.items():
+        label, field_name = path.rsplit('.', 1)
+        model = apps.get_model(label)
+        _fields_by_model.setdefault(model, {})[field_name] = variants
+        uid = f'images_{model._meta.label_lower}'
+        post_init.connect(_remember_names, sender=model, dispatch_uid=f'{uid}_init')
+        post_save.connect(_queue_new_uploads, sender=model, dispatch_uid=f'{uid}_save')
+
+
+@require_safe
+def image_derivative(request, token):
+    """Generate a variant on its first request, then redirect to its content-hashed file"""
+    try:
+        source, variant, image_format = read_token(token)
+        found = ensure(source, variant)
+    except (signing.BadSignature, DerivativeError):
+        raise Http404('No such image')
+    response = redirect(found[image_format][0])
+    patch_cache_control(response, public=True, max_age=CACHE_TIMEOUT)
+    return response
+
+
+@require_safe
+def serve_derivative(request, name):
+    """Serve a derivative file; its name changes with its content, so it may be cached forever"""
+    name = f'{DERIVATIVES_DIR}/{name}'
+    if '..' in name.split('/') or not default_storage.exists(name):
+        raise Http404('No such image')
+    response = FileResponse(default_storage.open(name, 'rb'))
+    patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
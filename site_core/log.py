@@ -0,0 +1,56 @@
+"""Logging formatter and filter wired up by ``settings.LOGGING``.
+
+StructuredFormatter writes one line per record: a readable line followed by
+``key=value`` pairs, or a JSON object when LOG_FORMAT=json. Either way it
+includes any fields passed as ``extra={...}``. Messages stay %-style, so the
+arguments are only interpolated when a handler actually emits the record.
+
+Hot paths log with ``extra={'sample_rate': 0.01}``. SamplingFilter lets that
+fraction of such records through and drops the rest. Records without a rate,
+and anything at WARNING or above, always pass.
+"""
+import json
+import logging
+import random
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'sample_rate'}
+
+
+def record_fields(record):
+    """The ``extra`` fields attached to ``record``"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, json=False, **kwargs):
+        super().__init__(**kwargs)
+        self.json = json
+
+    def format(self, record):
+        fields = record_fields(record)
+        timestamp = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds')
+        if self.json:
+            entry = {'time': timestamp, 'level': record.levelname, 'logger': record.name,
+                     'message': record.getMessage(), **fields}
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+
+        line = f'{timestamp} {record.levelname} {record.name}: {record.getMessage()}'
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Pass ``sample_rate`` of the records that carry one; everything else passes"""
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < rate
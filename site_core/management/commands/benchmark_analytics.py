@@ -0,0 +1,150 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from accounts.models import User
+from blog.models import BlogPost
+from jobs.models import Job
+from payments.models import Transaction
+from products.models import Product
+from site_core.analytics import (
+    ROLLUP_VERSION_KEY, get_period_summary, get_period_totals, get_top_earners, get_top_posters, rollup_days,
+)
+from site_core.models import Category
+
+HISTORY_DAYS = 90
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark admin analytics: the live per-request aggregates versus the daily rollups, '
+        'on a seeded dataset (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--content-ratio', type=float, default=0.5,
+                            help='Jobs, products and blog posts created per user')
+        parser.add_argument('--transactions-ratio', type=float, default=1.0,
+                            help='Sale/commission transactions per user')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed(options)
+            self.stdout.write(f'seeded in {time.perf_counter() - started:.1f}s')
+
+            started = time.perf_counter()
+            today = timezone.localdate()
+            rollup_days(today - timedelta(days=HISTORY_DAYS), today)
+            self.stdout.write(f'initial rollup of {HISTORY_DAYS} days {time.perf_counter() - started:.1f}s')
+            started = time.perf_counter()
+            rollup_days(today, today)
+            self.stdout.write(f'incremental rollup of today {time.perf_counter() - started:.2f}s')
+
+            for days in (7, 30, 90):
+                live_ms = self.timed(lambda: self.live(days), options['repeat'])
+                rollup_ms = self.timed(lambda: self.rollup(days), options['repeat'])
+                cache.delete(ROLLUP_VERSION_KEY)
+                first_ms = self.timed(lambda: get_period_summary(days), 1)
+                cached_ms = self.timed(lambda: get_period_summary(days), options['repeat'])
+                self.stdout.write(
+                    f'period={days:<3} live {live_ms:9.1f}ms   rollup rows {rollup_ms:7.1f}ms   '
+                    f'first view after rollup {first_ms:7.1f}ms   cached {cached_ms:6.2f}ms'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        now = timezone.now()
+        users = options['users']
+        stamp = time.time_ns()
+
+        def when():
+            return now - timedelta(seconds=self.rng.randrange(HISTORY_DAYS * 86400))
+
+        for start in range(0, users, 5000):
+            User.objects.bulk_create([
+                User(username=f'bench-{stamp}-{n}', referral_code=f'B{stamp % 10**9}{n}', password='!',
+                     date_joined=when(), last_login=when() if self.rng.random() < 0.6 else None)
+                for n in range(start, min(start + 5000, users))
+            ])
+        user_ids = list(User.objects.filter(username__startswith=f'bench-{stamp}-').values_list('pk', flat=True))
+
+        job_category = Category.objects.create(name=f'Bench {stamp}', category_type='job')
+        product_category = Category.objects.create(name=f'Bench {stamp}', category_type='product')
+        content = int(users * options['content_ratio'])
+        makers = {
+            Job: lambda owner: Job(
+                title='Job', description='Bench', category=job_category, job_type='contract', location='Lagos',
+                company_name='Bench', salary_min=1, salary_max=2, deadline=now, posted_by_id=owner),
+            Product: lambda owner: Product(
+                title='Product', description='Bench', seller_id=owner, price=1, category=product_category,
+                product_file='product_files/bench.zip'),
+            BlogPost: lambda owner: BlogPost(
+                title='Post', slug=f'bench-{stamp}-{self.rng.random()}', content='Bench', author_id=owner),
+        }
+        for model, make in makers.items():
+            rows = [make(self.rng.choice(user_ids)) for _ in range(content)]
+            model.objects.bulk_create(rows, batch_size=2000)
+            self.backdate(model, 'created_at', [row.pk for row in rows])
+
+        rows = [
+            Transaction(user_id=self.rng.choice(user_ids), transaction_type=self.rng.choice(['sale', 'commission']),
+                        amount=Decimal(self.rng.randrange(100, 50000)), status='completed',
+                        reference=f'BENCH{stamp}{n}')
+            for n in range(int(users * options['transactions_ratio']))
+        ]
+        Transaction.objects.bulk_create(rows, batch_size=2000)
+        self.backdate(Transaction, 'created_at', [row.pk for row in rows])
+
+    def backdate(self, model, field, pks):
+        """auto_now_add ignores explicit values, so spread rows over the history afterwards"""
+        buckets = {}
+        for pk in pks:
+            buckets.setdefault(self.rng.randrange(HISTORY_DAYS), []).append(pk)
+        now = timezone.now()
+        for days_ago, ids in buckets.items():
+            for start in range(0, len(ids), 900):
+                model.objects.filter(pk__in=ids[start:start + 900]).update(**{field: now - timedelta(days=days_ago)})
+
+    def live(self, days):
+        """The queries analytics_dashboard ran on every view before the rollups"""
+        start_date = timezone.now() - timedelta(days=days)
+        User.objects.filter(date_joined__gte=start_date).count()
+        User.objects.filter(last_login__gte=start_date).count()
+        for model in (Job, Product, BlogPost):
+            model.objects.filter(created_at__gte=start_date).count()
+        list(Transaction.objects.filter(
+            status='completed', created_at__gte=start_date, transaction_type__in=['sale', 'commission']
+        ).values('user__username', 'user__profile__country').annotate(total_earned=Sum('amount'))
+            .order_by('-total_earned')[:10])
+        list(User.objects.annotate(
+            total_content=Count('jobs_posted', filter=Q(jobs_posted__created_at__gte=start_date)) +
+            Count('courses_taught', filter=Q(courses_taught__created_at__gte=start_date)) +
+            Count('products', filter=Q(products__created_at__gte=start_date)) +
+            Count('blog_posts', filter=Q(blog_posts__created_at__gte=start_date))
+        ).filter(total_content__gt=0).order_by('-total_content')[:10])
+
+    def rollup(self, days):
+        get_period_totals(days)
+        list(get_top_earners(days))
+        list(get_top_posters(days))
+
+    def timed(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
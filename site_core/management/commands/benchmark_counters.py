@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from products.models import Product
+from site_core.counters import counter_buffer
+from site_core.models import Category
+
+
+def save_per_hit(self):
+    """The old increment_views: read-modify-write of the whole counter per hit"""
+    self.views_count += 1
+    self.save(update_fields=['views_count'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark a hot product detail page: one counter save per hit versus the '
+        'buffered counters, reporting requests/sec and increments that were lost'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Detail page hits per scenario')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent clients')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create(username=f'counter-bench-{time.time_ns()}')
+        category = Category.objects.create(name='Bench counters', category_type='product')
+        try:
+            for name, patcher in (
+                ('save per hit', mock.patch.object(Product, 'increment_views', save_per_hit)),
+                ('buffered', mock.patch.object(Product, 'increment_views', Product.increment_views)),
+            ):
+                product = Product.objects.create(
+                    title='Hot product', description='Benchmark', seller=user, price=100,
+                    category=category, product_file='product_files/bench.zip', status='approved'
+                )
+                with patcher:
+                    self.run_scenario(name, product, options['requests'], options['workers'])
+        finally:
+            user.delete()
+            category.delete()
+
+    def run_scenario(self, name, product, requests, workers):
+        url = reverse('product_detail', args=[product.pk])
+
+        def hit(_):
+            client = Client(HTTP_HOST='localhost')
+            try:
+                return client.get(url).status_code
+            except Exception:
+                return 'error'
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = list(pool.map(hit, range(requests)))
+        elapsed = time.perf_counter() - started
+        counter_buffer.flush()
+
+        ok = statuses.count(200)
+        product.refresh_from_db(fields=['views_count'])
+        self.stdout.write(
+            f'{name:<14} {requests / elapsed:8.1f} req/s  ok={ok}/{requests}  '
+            f'views_count={product.views_count}  lost={ok - product.views_count}'
+        )
@@ -0,0 +1,72 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.models import Job
+from site_core.models import Category, SiteSetting
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark anonymous traffic on the job list and detail pages: full renders, warm page cache '
+        'hits and conditional 304s (seeded rows are rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=300)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            job = self.seed(options['jobs'])
+            SiteSetting.get_solo()
+            client = Client(HTTP_HOST='localhost')
+            pages = [
+                ('list', reverse('jobs_list'), {}),
+                ('list, filtered', reverse('jobs_list'), {'job_type': 'contract', 'location': 'Lagos'}),
+                ('detail', reverse('job_detail', args=[job.pk]), {}),
+            ]
+            for name, url, params in pages:
+                rendered = self.run(options['requests'], lambda: (cache.clear(), client.get(url, params))[1], 200)
+                first = client.get(url, params)
+                cached = self.run(options['requests'], lambda: client.get(url, params), 200, 'HIT')
+                not_modified = self.run(
+                    options['requests'], lambda: client.get(url, params, HTTP_IF_NONE_MATCH=first['ETag']), 304
+                )
+                self.stdout.write(
+                    f'{name:<16} render {rendered:8.2f}ms   cache hit {cached:6.2f}ms   304 {not_modified:6.2f}ms   '
+                    f'({1000 / rendered:6.0f} -> {1000 / cached:6.0f} / {1000 / not_modified:6.0f} req/s)'
+                )
+            transaction.set_rollback(True)
+        cache.clear()
+
+    def seed(self, jobs):
+        stamp = time.time_ns()
+        owner = get_user_model().objects.create(username=f'http-bench-{stamp}', referral_code=f'HB{stamp % 10**12}')
+        category = Category.objects.create(name=f'HTTP bench {stamp}', category_type='job')
+        deadline = timezone.now() + timedelta(days=30)
+        Job.objects.bulk_create([
+            Job(title=f'Job {n}', description='Bench ' * 40, category=category, job_type='contract',
+                location='Lagos', company_name='Bench', salary_min=1, salary_max=2, deadline=deadline,
+                posted_by=owner, status='approved')
+            for n in range(jobs)
+        ], batch_size=2000)
+        return Job.objects.filter(posted_by=owner).latest('pk')
+
+    def run(self, count, fetch, status, cache_state=None):
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = fetch()
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status_code != status or (cache_state and response.get('X-Cache') != cache_state):
+                raise CommandError(f'unexpected response {response.status_code} {response.get("X-Cache")}')
+        return statistics.median(samples)
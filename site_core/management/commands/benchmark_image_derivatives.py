@@ -0,0 +1,99 @@
+import re
+import statistics
+import tempfile
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from products.models import Product
+from site_core import images
+from site_core.models import Category
+
+PICTURE_SOURCE = re.compile(r'<picture><source srcset="([^"]+)"')
+PICTURE = re.compile(r'<picture>.*?</picture>', re.S)
+IMG_SRC = re.compile(r'<img src="([^"]+)"')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark products/list.html with phone-sized product photos (rolled back, files in a temporary '
+        'MEDIA_ROOT): page weight and render time serving the originals against the resized derivatives'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                transaction.atomic():
+            marker = f'imgbench{time.time_ns()}'
+            user = get_user_model().objects.create(username=marker)
+            self.seed(user, marker, options['products'])
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)  # skip the anonymous page cache
+            url = f"{reverse('products_list')}?search={marker}"
+
+            self.measure('originals', client, url, options['runs'], enabled=False)
+            self.measure('lazy (first view)', client, url, options['runs'], enabled=True)
+            for product in Product.objects.filter(title__startswith=marker):
+                images.generate(product.thumbnail.name, images.IMAGE_FIELDS['products.Product.thumbnail'])
+            self.measure('derivatives', client, url, options['runs'], enabled=True)
+            transaction.set_rollback(True)
+
+    def seed(self, user, marker, count):
+        category = Category.objects.create(name=marker, category_type='product')
+        for n in range(count):
+            Product.objects.create(
+                title=f'{marker} {n}', description='Desc', seller=user, price=10, category=category,
+                product_file='product_files/p.zip', status='approved', thumbnail=self.photo(n),
+            )
+
+    def photo(self, seed):
+        # Upscaled noise plus fine grain: roughly a phone photo's detail, so the JPEG is MBs, not a flat colour's KBs
+        size = (4000, 3000)
+        channels = []
+        for shift in (0, 60, 120):
+            coarse = Image.effect_noise((80, 60), 60 + seed % 3 * 10).resize(size, Image.Resampling.BICUBIC)
+            grained = Image.blend(coarse, Image.effect_noise(size, 12), 0.05)
+            channels.append(grained.point(lambda v, s=shift: (v + s) % 256))
+        buffer = BytesIO()
+        Image.merge('RGB', channels).save(buffer, 'JPEG', quality=90)
+        return SimpleUploadedFile(f'photo{seed}.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def measure(self, name, client, url, runs, enabled):
+        timings = []
+        with override_settings(IMAGE_DERIVATIVES_ENABLED=enabled):
+            for _ in range(runs):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200
+        html = response.content.decode()
+        image_bytes, pending = self.image_bytes(html)
+        self.stdout.write(
+            f'{name:<18} render median {statistics.median(timings):7.1f} ms  html {len(html) / 1024:6.1f} KiB  '
+            f'images {image_bytes / 1024:9.1f} KiB  '
+            + (f'({pending} generated on request)' if pending else '')
+        )
+
+    def image_bytes(self, html):
+        """Bytes a WebP-capable browser downloads for the page's images, and how many are lazy URLs"""
+        urls = PICTURE_SOURCE.findall(html) + IMG_SRC.findall(PICTURE.sub('', html))
+        lazy_prefix = reverse('image_derivative', args=['-'])[:-2]
+        total = pending = 0
+        for url in urls:
+            if url.startswith(settings.MEDIA_URL):
+                total += default_storage.size(url[len(settings.MEDIA_URL):])
+            elif url.startswith(lazy_prefix):
+                pending += 1
+        return total, pending
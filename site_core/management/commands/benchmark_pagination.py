@@ -0,0 +1,72 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from payments.models import Transaction
+from site_core.pagination import KeysetPaginator
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark deep-page latency of OFFSET/COUNT paging against keyset cursors on a user\'s '
+        'transactions (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--page', type=int, default=5000)
+        parser.add_argument('--per-page', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        per_page, page = options['per_page'], options['page']
+        with transaction.atomic():
+            user = get_user_model().objects.create(username=f'page-bench-{time.time_ns()}')
+            started = time.perf_counter()
+            self.seed(user, options['rows'])
+            self.stdout.write(f"seeded {options['rows']} rows in {time.perf_counter() - started:.1f}s")
+
+            queryset = Transaction.objects.filter(user=user).select_related('payment_method')
+            ordered = queryset.order_by('-created_at', '-pk')
+            keyset = KeysetPaginator(queryset, per_page)
+            # The cursor a reader would hold after paging to the row before the target page
+            before = ordered[(page - 1) * per_page - 1]
+            cursor = keyset.encode_cursor(before)
+
+            for number in (1, page):
+                offset_ms = self.timed(lambda: list(Paginator(ordered, per_page).page(number)), options['repeat'])
+                self.stdout.write(f'offset page {number:<6} (COUNT + OFFSET) {offset_ms:8.1f}ms')
+            self.stdout.write(f"keyset page 1                     {self.timed(lambda: list(keyset.page()), options['repeat']):8.1f}ms")
+            keyset_ms = self.timed(lambda: list(keyset.page(cursor)), options['repeat'])
+            self.stdout.write(f'keyset page {page:<6} (cursor)         {keyset_ms:8.1f}ms')
+
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)
+            url = reverse('transactions_list')
+            view_ms = self.timed(lambda: client.get(url, {'cursor': cursor}), options['repeat'])
+            self.stdout.write(f'transactions_list page {page} view   {view_ms:8.1f}ms')
+            transaction.set_rollback(True)
+
+    def seed(self, user, rows):
+        stamp = time.time_ns()
+        for start in range(0, rows, 10000):
+            Transaction.objects.bulk_create([
+                Transaction(user=user, transaction_type='sale', amount=Decimal(n % 50000) / 100, status='completed',
+                            reference=f'PAGE{stamp}-{n}', description=f'Sale #{n}')
+                for n in range(start, min(start + 10000, rows))
+            ])
+
+    def timed(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
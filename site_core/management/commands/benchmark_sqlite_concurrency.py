@@ -0,0 +1,130 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from site_core.db import DEFAULT_PRAGMAS
+
+# SQLite's own defaults, i.e. what every connection ran with before configure_sqlite
+ROLLBACK_JOURNAL = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark mixed concurrent reads and writes on a scratch SQLite file: the default rollback '
+        'journal against WAL with the configured pragmas, with readers on the primary and on a '
+        'read-only replica alias'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+        replica_pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+        scenarios = [
+            ('rollback journal', ROLLBACK_JOURNAL, None),
+            ('WAL + pragmas', pragmas, None),
+            ('WAL + replica', pragmas, replica_pragmas),
+        ]
+        for name, primary_pragmas, reader_pragmas in scenarios:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.add_alias('bench_primary', path, primary_pragmas)
+                reader_alias = 'bench_primary'
+                if reader_pragmas is not None:
+                    # The same file opened read-only stands in for a replicated copy
+                    self.add_alias('bench_replica', f'file:{path}?mode=ro', reader_pragmas, uri=True)
+                    reader_alias = 'bench_replica'
+                try:
+                    self.seed(options['rows'])
+                    self.run_scenario(name, reader_alias, options)
+                finally:
+                    for alias in ('bench_primary', 'bench_replica'):
+                        if alias in connections.settings:
+                            connections[alias].close()
+                            del connections[alias]
+                            del connections.settings[alias]
+
+    def add_alias(self, alias, name, pragmas, uri=False):
+        # configure_settings() fills in the defaults but insists on a 'default' entry
+        configured = connections.configure_settings({
+            DEFAULT_DB_ALIAS: dict(connections.settings[DEFAULT_DB_ALIAS]),
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name, 'PRAGMAS': pragmas,
+                    'OPTIONS': {'uri': True} if uri else {}},
+        })
+        connections.settings[alias] = configured[alias]
+
+    def seed(self, rows):
+        with connections['bench_primary'].cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, hits INTEGER NOT NULL, body TEXT NOT NULL)')
+            cursor.executemany('INSERT INTO item (id, hits, body) VALUES (%s, 0, %s)',
+                               [(n, f'Item body {n} ' * 8) for n in range(1, rows + 1)])
+
+    def run_scenario(self, name, reader_alias, options):
+        rows = options['rows']
+        deadline = time.monotonic() + options['seconds']
+        results = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(alias, operation):
+            timings = []
+            errors = 0
+            try:
+                while time.monotonic() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        with connections[alias].cursor() as cursor:
+                            operation(cursor)
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections[alias].close()
+            with lock:
+                results['read' if operation is read else 'write'].extend(timings)
+                results['errors'] += errors
+
+        def read(cursor):
+            # A list page: one window of rows plus its total
+            start = random.randint(1, rows - 200)
+            cursor.execute('SELECT id, hits, body FROM item WHERE id BETWEEN %s AND %s ORDER BY id LIMIT 20',
+                           [start, start + 200])
+            cursor.fetchall()
+            cursor.execute('SELECT COUNT(*), SUM(hits) FROM item WHERE id BETWEEN %s AND %s', [start, start + 200])
+            cursor.fetchone()
+
+        def write(cursor):
+            # A counter bump or webhook write, each its own transaction
+            cursor.execute('UPDATE item SET hits = hits + 1 WHERE id = %s', [random.randint(1, rows)])
+
+        threads = [threading.Thread(target=worker, args=(reader_alias, read)) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=('bench_primary', write)) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        seconds = options['seconds']
+        reads, writes = results['read'], results['write']
+        self.stdout.write(
+            f'{name:<17} reads {len(reads) / seconds:8.0f}/s (p50 {self.quantile(reads, 0.5):6.2f} ms, '
+            f'p95 {self.quantile(reads, 0.95):7.2f} ms)  writes {len(writes) / seconds:7.0f}/s '
+            f'(p95 {self.quantile(writes, 0.95):7.2f} ms)  errors {results["errors"]}'
+        )
+
+    @staticmethod
+    def quantile(timings, fraction):
+        if len(timings) < 2:
+            return timings[0] if timings else 0.0
+        return statistics.quantiles(timings, n=100)[round(fraction * 100) - 1]
@@ -0,0 +1,65 @@
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+ASSET_RE = re.compile(r'(?:href|src)="(/[^"]+)"')
+ACCEPT_ENCODING = 'gzip, deflate, br'
+PIPELINES = (
+    ('plain storage', 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    ('hashed + precompressed', 'site_core.staticfiles.CompressedManifestStaticFilesStorage'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the bytes a first visit to the dashboard downloads from this site (HTML plus same-origin '
+        'static assets), collecting static files into a temporary STATIC_ROOT with the plain storage and with '
+        'the hashed, precompressed one'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create(username=f'static-bench-{time.time_ns()}')
+            for name, backend in PIPELINES:
+                storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': backend}}
+                with tempfile.TemporaryDirectory() as root, \
+                        override_settings(STATIC_ROOT=root, STORAGES=storages, DEBUG=False):
+                    call_command('collectstatic', interactive=False, verbosity=0)
+                    self.measure(name, user)
+            transaction.set_rollback(True)
+
+    def measure(self, name, user):
+        # A new client builds its handler, and so PrecompressedStaticMiddleware, from the overridden settings
+        client = Client(HTTP_HOST='localhost', HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING)
+        client.force_login(user)
+        page = client.get(reverse('dashboard'))
+        assert page.status_code == 200
+        html_bytes = len(page.content)
+
+        asset_bytes = original_bytes = revalidated = counted = 0
+        urls = [url for url in dict.fromkeys(ASSET_RE.findall(page.content.decode()))
+                if url.startswith(settings.STATIC_URL)]
+        for url in urls:
+            response = client.get(url)
+            if response.status_code != 200:
+                self.stdout.write(f'  {url}: {response.status_code}, not counted')
+                continue
+            counted += 1
+            asset_bytes += len(b''.join(response.streaming_content))
+            plain = Client(HTTP_HOST='localhost').get(url)
+            original_bytes += len(b''.join(plain.streaming_content))
+            if 'immutable' not in response.get('Cache-Control', ''):
+                revalidated += 1
+        self.stdout.write(
+            f'{name:<23} html {html_bytes / 1024:6.1f} KiB  static {asset_bytes / 1024:6.1f} KiB '
+            f'({original_bytes / 1024:.1f} KiB uncompressed, {counted} files)  '
+            f'total {(html_bytes + asset_bytes) / 1024:6.1f} KiB  revalidated on repeat visits: {revalidated}'
+        )
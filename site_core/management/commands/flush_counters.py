@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from site_core.counters import counter_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Write this process's buffered view/download counters to the database. "
+        "Call it from the server's worker-exit hook, e.g. gunicorn's worker_exit: "
+        "call_command('flush_counters')"
+    )
+
+    def handle(self, *args, **options):
+        flushed = counter_buffer.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} counter increments'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from site_core.perf import metric_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Write this process's buffered request metrics to the database. "
+        "Call it from the server's worker-exit hook alongside flush_counters"
+    )
+
+    def handle(self, *args, **options):
+        flushed = metric_buffer.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed metrics of {flushed} request(s)'))
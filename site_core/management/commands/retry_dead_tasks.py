@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from site_core.models import DeadLetterTask
+
+
+class Command(BaseCommand):
+    help = 'Queue dead-lettered background tasks again with a fresh set of attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Dead letter ids to retry')
+        parser.add_argument('--name', help='Retry every dead task with this task name')
+        parser.add_argument('--all', action='store_true', help='Retry every dead task')
+
+    def handle(self, *args, **options):
+        if not (options['ids'] or options['name'] or options['all']):
+            raise CommandError('Pass dead letter ids, --name or --all')
+        dead = DeadLetterTask.objects.order_by('pk')
+        if options['ids']:
+            dead = dead.filter(pk__in=options['ids'])
+        if options['name']:
+            dead = dead.filter(name=options['name'])
+
+        count = 0
+        for entry in dead:
+            entry.requeue()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Queued {count} task(s) again'))
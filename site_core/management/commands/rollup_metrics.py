@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from site_core.analytics import next_rollup_start, rollup_days
+
+
+class Command(BaseCommand):
+    help = (
+        'Roll up signups, active users, content created and earnings into daily metric rows. '
+        'Incremental by default: recomputes from the last rolled-up day through today. Run hourly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='Recompute from this date (YYYY-MM-DD)')
+        parser.add_argument('--days', type=int, help='Recompute the last N days')
+        parser.add_argument('--chunk-days', type=int, default=7, help='Days recomputed per transaction')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['since'] and options['days']:
+            raise CommandError('Use either --since or --days, not both')
+        if options['since']:
+            start = options['since']
+        elif options['days']:
+            start = today - timedelta(days=options['days'] - 1)
+        else:
+            start = next_rollup_start()
+
+        day = start
+        while day <= today:
+            chunk_end = min(day + timedelta(days=options['chunk_days'] - 1), today)
+            rows = rollup_days(day, chunk_end)
+            self.stdout.write(f'{day} .. {chunk_end}: {rows} user-day rows')
+            day = chunk_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up metrics from {start} to {today}'))
@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from site_core.task_queue import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background tasks (mail, Monnify provisioning, ...). Keep one or more running '
+        'under a process supervisor, or use --burst from cron to drain the queue and exit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help='Only run tasks from this queue (repeatable; default: all queues)')
+        parser.add_argument('--concurrency', type=int, default=1, help='Tasks run at once by this worker')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due')
+        parser.add_argument('--max-tasks', type=int, help='Exit after running this many tasks')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['queues'], options['concurrency'], options['poll_interval'])
+
+        def stop(signum, frame):
+            self.stdout.write('Finishing running tasks, then stopping')
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(f"Worker {worker.name} running {', '.join(options['queues'] or ['all queues'])}")
+        processed = worker.run(burst=options['burst'], max_tasks=options['max_tasks'])
+        self.stdout.write(self.style.SUCCESS(f'Ran {processed} task(s), {worker.failed} failed'))
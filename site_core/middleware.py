@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+
+from .models import _request_site_settings
+from .perf import UNRESOLVED, instrument_cache, measure, metric_buffer
+
+
+class PerformanceMiddleware:
+    """Record wall time, queries, cache lookups and outbound HTTP of every request (see site_core.perf)"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for alias in settings.CACHES:
+            instrument_cache(caches[alias])
+        status_code = 500
+        started = time.perf_counter()
+        with measure() as stats:
+            try:
+                response = self.get_response(request)
+                status_code = response.status_code
+                return response
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                match = getattr(request, 'resolver_match', None)
+                metric_buffer.record(match.view_name if match else UNRESOLVED, elapsed_ms, status_code, stats)
+
+
+class SiteSettingsMiddleware:
+    """Memoize SiteSetting.get_solo() for the lifetime of a single request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request_site_settings.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _request_site_settings.reset(token)
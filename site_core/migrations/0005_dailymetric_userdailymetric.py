@@ -0,0 +1,52 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('site_core', '0004_remove_sitesetting_manual_payment_account_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('metric', models.CharField(choices=[('signups', 'Signups'), ('active_users', 'Active Users'), ('jobs', 'Jobs Created'), ('courses', 'Courses Created'), ('products', 'Products Created'), ('posts', 'Blog Posts Created'), ('earnings', 'Earnings')], max_length=20)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date', 'metric'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserDailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('active', models.BooleanField(default=False)),
+                ('jobs', models.PositiveIntegerField(default=0)),
+                ('courses', models.PositiveIntegerField(default=0)),
+                ('products', models.PositiveIntegerField(default=0)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('content', models.PositiveIntegerField(default=0)),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailymetric',
+            constraint=models.UniqueConstraint(fields=('date', 'metric'), name='unique_daily_metric'),
+        ),
+        migrations.AddConstraint(
+            model_name='userdailymetric',
+            constraint=models.UniqueConstraint(fields=('date', 'user'), name='unique_user_daily_metric'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_core', '0005_dailymetric_userdailymetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetterTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('queue', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('failed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-failed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BackgroundTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('queue', models.CharField(default='default', max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('unique_key', models.CharField(blank=True, max_length=150)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField()),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['run_after', 'pk'],
+                'indexes': [models.Index(fields=['status', 'queue', 'run_after'], name='bgtask_claim_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundtask',
+            constraint=models.UniqueConstraint(condition=models.Q(('unique_key', ''), _negated=True), fields=('name', 'unique_key'), name='unique_background_task_key'),
+        ),
+    ]
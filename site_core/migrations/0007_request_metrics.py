@@ -0,0 +1,66 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_core', '0006_background_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=200)),
+                ('hour', models.DateTimeField()),
+                ('sql_hash', models.CharField(max_length=40)),
+                ('sql', models.TextField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-hour', '-total_ms'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RequestMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=200)),
+                ('hour', models.DateTimeField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('queries', models.PositiveIntegerField(default=0)),
+                ('query_ms', models.FloatField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+                ('cache_misses', models.PositiveIntegerField(default=0)),
+                ('http_calls', models.PositiveIntegerField(default=0)),
+                ('http_ms', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-hour', 'url_name'],
+                'indexes': [models.Index(fields=['hour'], name='requestmetric_hour_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='requestmetric',
+            constraint=models.UniqueConstraint(fields=('url_name', 'hour'), name='unique_request_metric'),
+        ),
+        migrations.AddIndex(
+            model_name='querymetric',
+            index=models.Index(fields=['hour'], name='querymetric_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='querymetric',
+            constraint=models.UniqueConstraint(fields=('url_name', 'hour', 'sql_hash'), name='unique_query_metric'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_core', '0007_request_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('variant', models.CharField(max_length=20)),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('fallback', 'JPEG/PNG fallback')], max_length=10)),
+                ('version', models.PositiveSmallIntegerField(default=1)),
+                ('name', models.CharField(max_length=255)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='imagederivative',
+            constraint=models.UniqueConstraint(fields=('source', 'variant', 'format', 'version'), name='unique_image_derivative'),
+        ),
+    ]
@@ -1,7 +1,21 @@
-from django.db import models
+import copy
+import threading
+import uuid
+from contextvars import ContextVar
+
+from django.db import models, transaction
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+SITE_SETTINGS_CACHE_KEY = 'site_core:site_settings'
+SITE_SETTINGS_VERSION_KEY = 'site_core:site_settings:version'
+MONNIFY_BANKS_CACHE_KEY = 'site_core:monnify_banks:active'
+
+# Request-scoped memo, installed by site_core.middleware.SiteSettingsMiddleware
+_request_site_settings = ContextVar('request_site_settings', default=None)
+
 
 class MonnifyBank(models.Model):
     bank_code = models.CharField(max_length=10, unique=True)
@@ -17,6 +31,35 @@ class MonnifyBank(models.Model):
     def __str__(self):
         return f"{self.bank_name} ({self.bank_code})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_after_write()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_after_write()
+        return result
+
+    @classmethod
+    def _invalidate_after_write(cls):
+        cls.invalidate_cache()
+        if transaction.get_connection().in_atomic_block:
+            # Readers may re-cache the old list before we commit; drop it again afterwards
+            transaction.on_commit(cls.invalidate_cache)
+
+    @classmethod
+    def get_active(cls):
+        """Active banks ordered by name, from the shared cache (MONNIFY_BANKS_CACHE_TTL)"""
+        banks = cache.get(MONNIFY_BANKS_CACHE_KEY)
+        if banks is None:
+            banks = list(cls.objects.filter(is_active=True).order_by('bank_name'))
+            cache.set(MONNIFY_BANKS_CACHE_KEY, banks, getattr(settings, 'MONNIFY_BANKS_CACHE_TTL', 3600))
+        return banks
+
+    @classmethod
+    def invalidate_cache(cls):
+        cache.delete(MONNIFY_BANKS_CACHE_KEY)
+
 class SiteSetting(models.Model):
     CURRENCY_CHOICES = [
         ('NGN', 'Nigerian Naira (NGN)'),
@@ -82,14 +125,84 @@ class SiteSetting(models.Model):
     def __str__(self):
         return "Site Settings"
 
+    _local_lock = threading.Lock()
+    _local_version = None
+    _local_instance = None
+
     def save(self, *args, **kwargs):
         self.pk = 1
         super().save(*args, **kwargs)
+        self._remember_for_request(self)
+        self._invalidate_after_write()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_after_write()
+        return result
+
+    @classmethod
+    def _invalidate_after_write(cls):
+        cls.invalidate_cache()
+        if transaction.get_connection().in_atomic_block:
+            # Readers may re-cache the old row before we commit; bump again afterwards
+            transaction.on_commit(cls.invalidate_cache)
 
     @classmethod
     def get_solo(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        """Return the settings row, served from the request memo, process copy or shared cache.
+
+        Each tier is checked against a version stamp held in the shared cache,
+        so a save in any process is seen by all others on their next request.
+        """
+        memo = _request_site_settings.get()
+        if memo is not None and 'instance' in memo:
+            return memo['instance']
+
+        version = cache.get(SITE_SETTINGS_VERSION_KEY)
+        instance = None
+        if version is not None:
+            if cls._local_version == version:
+                instance = cls._local_instance
+            else:
+                cached = cache.get(SITE_SETTINGS_CACHE_KEY)
+                if cached and cached[0] == version:
+                    instance = cached[1]
+                    cls._store_local(version, instance)
+
+        if instance is None:
+            instance, created = cls.objects.get_or_create(pk=1)
+            if created:
+                # Creating the row bumped the version; the instance we hold is current
+                version = cache.get(SITE_SETTINGS_VERSION_KEY)
+            if version is None:
+                cache.add(SITE_SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+                version = cache.get(SITE_SETTINGS_VERSION_KEY)
+            cache.set(SITE_SETTINGS_CACHE_KEY, (version, instance), None)
+            cls._store_local(version, instance)
+
+        # Hand out a copy so request code cannot mutate the process-wide instance
+        instance = copy.copy(instance)
+        cls._remember_for_request(instance)
+        return instance
+
+    @classmethod
+    def invalidate_cache(cls):
+        """Bump the shared version stamp; every process reloads on its next read"""
+        cache.set(SITE_SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+        cache.delete(SITE_SETTINGS_CACHE_KEY)
+        cls._store_local(None, None)
+
+    @classmethod
+    def _store_local(cls, version, instance):
+        with cls._local_lock:
+            cls._local_version = version
+            cls._local_instance = instance
+
+    @staticmethod
+    def _remember_for_request(instance):
+        memo = _request_site_settings.get()
+        if memo is not None:
+            memo['instance'] = instance
 
 class Category(models.Model):
     CATEGORY_TYPES = [
@@ -134,4 +247,196 @@ class AdminNotification(models.Model):
 
     def is_current(self):
         from django.utils import timezone
-        return self.is_active and self.start_date <= timezone.now() <= self.end_date
\ No newline at end of file
+        return self.is_active and self.start_date <= timezone.now() <= self.end_date
+
+class DailyMetric(models.Model):
+    """Platform-wide totals per day, filled in by the rollup_metrics command"""
+    METRICS = [
+        ('signups', 'Signups'),
+        ('active_users', 'Active Users'),
+        ('jobs', 'Jobs Created'),
+        ('courses', 'Courses Created'),
+        ('products', 'Products Created'),
+        ('posts', 'Blog Posts Created'),
+        ('earnings', 'Earnings'),
+    ]
+
+    date = models.DateField()
+    metric = models.CharField(max_length=20, choices=METRICS)
+    value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'metric'], name='unique_daily_metric'),
+        ]
+        ordering = ['-date', 'metric']
+
+    def __str__(self):
+        return f"{self.date} {self.metric}: {self.value}"
+
+
+class UserDailyMetric(models.Model):
+    """Per-user activity per day; only users with activity that day get a row"""
+    date = models.DateField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_metrics')
+    active = models.BooleanField(default=False)
+    jobs = models.PositiveIntegerField(default=0)
+    courses = models.PositiveIntegerField(default=0)
+    products = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+    content = models.PositiveIntegerField(default=0)
+    earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'user'], name='unique_user_daily_metric'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.user_id}"
+
+
+class BackgroundTask(models.Model):
+    """A queued call of a registered task; see site_core.task_queue"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+    ]
+
+    name = models.CharField(max_length=100)
+    queue = models.CharField(max_length=50, default='default')
+    payload = models.JSONField(default=dict)
+    # Set for tasks that must not be queued twice at once (e.g. one provisioning per KYC)
+    unique_key = models.CharField(max_length=150, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_after'], name='bgtask_claim_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'unique_key'], condition=~models.Q(unique_key=''),
+                                    name='unique_background_task_key'),
+        ]
+        ordering = ['run_after', 'pk']
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class DeadLetterTask(models.Model):
+    """A task that failed permanently or ran out of attempts, kept for inspection and requeueing"""
+    name = models.CharField(max_length=100)
+    queue = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-failed_at']
+
+    def __str__(self):
+        return f"{self.name} (failed {self.failed_at:%Y-%m-%d %H:%M})"
+
+    def requeue(self):
+        """Queue the task again with a fresh set of attempts and drop this entry"""
+        from .task_queue import get_task
+
+        registered = get_task(self.name)
+        with transaction.atomic():
+            task = BackgroundTask.objects.create(
+                name=self.name, queue=self.queue, payload=self.payload, run_after=timezone.now(),
+                max_attempts=registered.max_attempts if registered else BackgroundTask._meta.get_field('max_attempts').default,
+            )
+            self.delete()
+        return task
+
+
+class RequestMetric(models.Model):
+    """Per-view request timings for one hour, flushed from site_core.perf's in-memory histograms"""
+    url_name = models.CharField(max_length=200)
+    hour = models.DateTimeField()
+    requests = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    histogram = models.JSONField(default=list)  # request counts per site_core.perf.BUCKETS_MS bucket
+    queries = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0)
+    cache_misses = models.PositiveIntegerField(default=0)
+    http_calls = models.PositiveIntegerField(default=0)
+    http_ms = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['url_name', 'hour'], name='unique_request_metric'),
+        ]
+        indexes = [models.Index(fields=['hour'], name='requestmetric_hour_idx')]
+        ordering = ['-hour', 'url_name']
+
+    def __str__(self):
+        return f"{self.url_name} {self.hour:%Y-%m-%d %H:00}"
+
+
+class QueryMetric(models.Model):
+    """SQL statements run while serving a view, aggregated per hour by their parameterised text"""
+    url_name = models.CharField(max_length=200)
+    hour = models.DateTimeField()
+    sql_hash = models.CharField(max_length=40)
+    sql = models.TextField()
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['url_name', 'hour', 'sql_hash'], name='unique_query_metric'),
+        ]
+        indexes = [models.Index(fields=['hour'], name='querymetric_hour_idx')]
+        ordering = ['-hour', '-total_ms']
+
+    def __str__(self):
+        return f"{self.url_name}: {self.sql[:60]}"
+
+
+class ImageDerivative(models.Model):
+    """A resized copy of an uploaded image, see site_core.images"""
+    FORMATS = [
+        ('webp', 'WebP'),
+        ('fallback', 'JPEG/PNG fallback'),
+    ]
+
+    source = models.CharField(max_length=255)
+    variant = models.CharField(max_length=20)
+    format = models.CharField(max_length=10, choices=FORMATS)
+    version = models.PositiveSmallIntegerField(default=1)
+    name = models.CharField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'variant', 'format', 'version'],
+                                    name='unique_image_derivative'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.variant} {self.format}"
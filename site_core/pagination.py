@@ -0,0 +1,155 @@
+"""Keyset (cursor) pagination on (created_at, id).
+
+OFFSET paging makes the database step over every skipped row, and the page
+count needs a COUNT(*) of the whole filtered set, so both get slower as tables
+grow. A keyset page filters on the last row already shown instead::
+
+    WHERE created_at <= :t AND (created_at < :t OR id < :id)
+    ORDER BY created_at DESC, id DESC LIMIT :n
+
+which is an index range scan however deep the page is. Cursors are opaque
+URL-safe tokens. The total is never computed unless a caller asks for
+``paginator.count``; ``page.capped_count`` gives a cheap "1000+" figure.
+"""
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_PARAM = 'cursor'
+COUNT_CAP = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage(Sequence):
+    """One page of rows; mirrors the parts of django.core.paginator.Page the templates use"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} rows>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @cached_property
+    def capped_count(self):
+        return self.paginator.capped_count()
+
+    @property
+    def count_is_capped(self):
+        return self.capped_count > self.paginator.count_cap
+
+
+class KeysetPaginator:
+    """Pages a queryset by (field, pk), newest first unless ``descending=False``"""
+
+    def __init__(self, queryset, per_page, field='created_at', descending=True, count_cap=COUNT_CAP):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.field = field
+        self.descending = descending
+        self.count_cap = count_cap
+
+    @cached_property
+    def count(self):
+        """Exact total; a full COUNT(*), so only for callers that really need it"""
+        return self.queryset.order_by().count()
+
+    def capped_count(self):
+        """Count up to count_cap + 1 rows, enough to show "N" or "1000+" cheaply"""
+        return self.queryset.order_by()[:self.count_cap + 1].count()
+
+    def encode_cursor(self, row, backwards=False):
+        value = getattr(row, self.field)
+        position = [value.isoformat() if hasattr(value, 'isoformat') else value, row.pk]
+        if backwards:
+            position.append(1)
+        return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            value = self.queryset.model._meta.get_field(self.field).to_python(position[0])
+            pk = int(position[1])
+        except (binascii.Error, ValueError, TypeError, IndexError, KeyError, ValidationError):
+            raise InvalidCursor(cursor)
+        if value is None:
+            raise InvalidCursor(cursor)
+        return value, pk, len(position) > 2
+
+    def page(self, cursor=None):
+        """Rows after (or, for a backwards cursor, before) the cursor position"""
+        value = pk = None
+        backwards = False
+        if cursor:
+            value, pk, backwards = self.decode_cursor(cursor)
+
+        # Walking backwards reverses the scan, then the rows are flipped back
+        descending = self.descending != backwards
+        prefix = '-' if descending else ''
+        queryset = self.queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')
+        if cursor:
+            lookup = 'lt' if descending else 'gt'
+            # The redundant <= / >= bound lets the index seek straight to the
+            # cursor; on its own the OR below would scan from the first row
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}e': value}),
+                Q(**{f'{self.field}__{lookup}': value}) | Q(**{f'pk__{lookup}': pk}),
+            )
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = cursor is not None, more
+
+        return KeysetPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor(rows[-1]) if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if rows and has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        """Like Paginator.get_page: a bad cursor falls back to the first page"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class KeysetPaginationMixin:
+    """ListView mixin: ``page_obj`` becomes a KeysetPage selected by ?cursor="""
+    keyset_field = 'created_at'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, field=self.keyset_field)
+        page = paginator.get_page(self.request.GET.get(CURSOR_PARAM))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,390 @@
+"""Request-level performance instrumentation.
+
+PerformanceMiddleware times every request and counts what it spent along the
+way: SQL queries and their time, cache hits and misses, and outbound HTTP
+calls (reported through ``record_http``, which the Monnify client calls).
+Each request's numbers are added to per-process histograms keyed by URL name
+and hour. Each SQL statement, with its parameters left as placeholders, is
+added to a per-statement tally.
+
+Both are written to RequestMetric and QueryMetric the way site_core.counters
+writes view counters. A flush happens once ``PERF_FLUSH_THRESHOLD`` requests
+are buffered, or ``PERF_FLUSH_INTERVAL`` seconds after the first one. Another
+flush runs at exit. Flushes run on a background thread, never on the request
+that triggers them. Under ``manage.py test``, site_core.test_runner.TestRunner
+switches the timer off and discards the buffer before each test.
+
+Timings land in fixed log-spaced buckets. Percentiles read back from the
+table are therefore bucket upper bounds, capped at the slowest request seen.
+"""
+import atexit
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.db import connection, connections, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import QueryMetric, RequestMetric
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 60  # seconds
+DEFAULT_FLUSH_THRESHOLD = 1000  # buffered requests
+# Upper bounds of the timing buckets in ms; one more bucket holds everything slower
+BUCKETS_MS = (1, 2, 3, 5, 7, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000,
+              5000, 10000)
+MAX_STATEMENTS = 2000  # distinct statements buffered between flushes; new ones past this are dropped
+MAX_SQL_LENGTH = 4000
+UNRESOLVED = '<unresolved>'
+
+_PLACEHOLDER_LIST = re.compile(r'\((?:%s, )+%s\)')
+_REPEATED_ROWS = re.compile(r'(\(%s, \.\.\.\))(?:, \(%s, \.\.\.\))+')
+_MISSING = object()
+
+_current = ContextVar('perf_request_stats', default=None)
+
+
+def normalize_sql(sql):
+    """Collapse IN lists and multi-row VALUES so one statement shape is one entry"""
+    sql = _PLACEHOLDER_LIST.sub('(%s, ...)', sql)
+    return _REPEATED_ROWS.sub(r'\1, ...', sql)[:MAX_SQL_LENGTH]
+
+
+class RequestStats:
+    """What one request spent; also the execute_wrapper that counts its queries"""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_ms = 0.0
+        self.statements = {}  # normalised sql -> [count, total ms, max ms]
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.http_calls = 0
+        self.http_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.query_ms += elapsed
+            entry = self.statements.setdefault(normalize_sql(sql), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+
+@contextmanager
+def measure():
+    """Collect RequestStats for the enclosed block on every database connection"""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            yield stats
+    finally:
+        _current.reset(token)
+
+
+def record_http(elapsed_ms):
+    """Count an outbound HTTP call against the request being measured, if any"""
+    stats = _current.get()
+    if stats is not None:
+        stats.http_calls += 1
+        stats.http_ms += elapsed_ms
+
+
+def _count_cache(hits, misses):
+    stats = _current.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def instrument_cache(cache):
+    """Make ``cache`` count its hits and misses against the request being measured.
+
+    Cache instances are per thread, so this wraps the instance's own ``get``
+    and ``get_many`` once; calls made outside a measured block are not counted.
+    BaseCache.get_many already goes through ``get``, so it is only wrapped on
+    backends that override it.
+    """
+    if getattr(cache, '_perf_instrumented', False):
+        return cache
+    get, get_many = cache.get, cache.get_many
+
+    def counted_get(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        if value is _MISSING:
+            _count_cache(0, 1)
+            return default
+        _count_cache(1, 0)
+        return value
+
+    def counted_get_many(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        _count_cache(len(found), len(keys) - len(found))
+        return found
+
+    cache.get = counted_get
+    if type(cache).get_many is not BaseCache.get_many:
+        cache.get_many = counted_get_many
+    cache._perf_instrumented = True
+    return cache
+
+
+def _new_entry():
+    return {
+        'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'histogram': [0] * (len(BUCKETS_MS) + 1),
+        'queries': 0, 'query_ms': 0.0, 'cache_hits': 0, 'cache_misses': 0, 'http_calls': 0, 'http_ms': 0.0,
+    }
+
+
+def _merge_histogram(target, source):
+    if len(target) < len(source):
+        target.extend([0] * (len(source) - len(target)))
+    for index, count in enumerate(source):
+        target[index] += count
+    return target
+
+
+class MetricBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}  # (url name, hour) -> totals
+        self._statements = {}  # (url name, hour, sql) -> [count, total ms, max ms]
+        self._size = 0
+        self._timer = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'PERF_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def flush_threshold(self):
+        return getattr(settings, 'PERF_FLUSH_THRESHOLD', DEFAULT_FLUSH_THRESHOLD)
+
+    def record(self, url_name, elapsed_ms, status_code, stats):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            entry = self._requests.get((url_name, hour))
+            if entry is None:
+                entry = self._requests[(url_name, hour)] = _new_entry()
+            entry['requests'] += 1
+            entry['errors'] += status_code >= 500
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['histogram'][bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+            entry['queries'] += stats.queries
+            entry['query_ms'] += stats.query_ms
+            entry['cache_hits'] += stats.cache_hits
+            entry['cache_misses'] += stats.cache_misses
+            entry['http_calls'] += stats.http_calls
+            entry['http_ms'] += stats.http_ms
+            for sql, (count, total_ms, max_ms) in stats.statements.items():
+                key = (url_name, hour, sql)
+                tally = self._statements.get(key)
+                if tally is None:
+                    if len(self._statements) >= MAX_STATEMENTS:
+                        continue
+                    tally = self._statements[key] = [0, 0.0, 0.0]
+                tally[0] += count
+                tally[1] += total_ms
+                tally[2] = max(tally[2], max_ms)
+
+            self._size += 1
+            if self._size >= self.flush_threshold:
+                # Written on a background thread so the request that filled the buffer doesn't wait for it
+                self._schedule_flush(0)
+            elif self.flush_interval > 0:
+                self._schedule_flush(self.flush_interval)
+
+    def _schedule_flush(self, delay):
+        # Called with the lock held; an earlier flush already due is never pushed back
+        if self._timer is not None:
+            if delay or not self._timer.interval:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Write the buffered metrics; returns the number of requests flushed"""
+        with self._lock:
+            requests, statements = self._take()
+        if not requests:
+            return 0
+        try:
+            with transaction.atomic():
+                _write_requests(requests)
+                _write_statements(statements)
+        except Exception:
+            # Metrics are best effort: losing a flush must never break the request that triggered it
+            logger.exception("Failed to flush metrics of %d view(s)", len(requests))
+            return 0
+        return sum(entry['requests'] for entry in requests.values())
+
+    def discard(self):
+        """Drop the buffered metrics without writing them; returns the number of requests dropped"""
+        with self._lock:
+            requests, _ = self._take()
+        return sum(entry['requests'] for entry in requests.values())
+
+    def _take(self):
+        # Called with the lock held
+        requests, self._requests = self._requests, {}
+        statements, self._statements = self._statements, {}
+        self._size = 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return requests, statements
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+
+def _write_requests(pending):
+    # Make sure every row exists, then lock and add to them, so concurrent flushes never collide
+    RequestMetric.objects.bulk_create(
+        [RequestMetric(url_name=url_name, hour=hour) for url_name, hour in pending], ignore_conflicts=True,
+    )
+    rows = RequestMetric.objects.select_for_update().filter(
+        url_name__in={url_name for url_name, _ in pending}, hour__in={hour for _, hour in pending},
+    )
+    updated = []
+    for row in rows:
+        entry = pending.get((row.url_name, row.hour))
+        if entry is None:
+            continue
+        for field in ('requests', 'errors', 'total_ms', 'queries', 'query_ms', 'cache_hits', 'cache_misses',
+                      'http_calls', 'http_ms'):
+            setattr(row, field, getattr(row, field) + entry[field])
+        row.max_ms = max(row.max_ms, entry['max_ms'])
+        row.histogram = _merge_histogram(list(row.histogram), entry['histogram'])
+        updated.append(row)
+    RequestMetric.objects.bulk_update(
+        updated,
+        ['requests', 'errors', 'total_ms', 'max_ms', 'histogram', 'queries', 'query_ms', 'cache_hits',
+         'cache_misses', 'http_calls', 'http_ms'],
+        batch_size=500,
+    )
+
+
+def _write_statements(pending):
+    if not pending:
+        return
+    hashed = {
+        (url_name, hour, hashlib.sha1(sql.encode()).hexdigest()): (sql, tally)
+        for (url_name, hour, sql), tally in pending.items()
+    }
+    QueryMetric.objects.bulk_create(
+        [QueryMetric(url_name=url_name, hour=hour, sql_hash=sql_hash, sql=sql)
+         for (url_name, hour, sql_hash), (sql, _) in hashed.items()],
+        ignore_conflicts=True, batch_size=500,
+    )
+    rows = QueryMetric.objects.select_for_update().filter(
+        hour__in={hour for _, hour, _ in hashed}, sql_hash__in={sql_hash for _, _, sql_hash in hashed},
+    )
+    updated = []
+    for row in rows:
+        found = hashed.get((row.url_name, row.hour, row.sql_hash))
+        if found is None:
+            continue
+        count, total_ms, max_ms = found[1]
+        row.count += count
+        row.total_ms += total_ms
+        row.max_ms = max(row.max_ms, max_ms)
+        updated.append(row)
+    QueryMetric.objects.bulk_update(updated, ['count', 'total_ms', 'max_ms'], batch_size=500)
+
+
+metric_buffer = MetricBuffer()
+atexit.register(metric_buffer.flush)
+
+
+def percentile(histogram, fraction, max_ms=None):
+    """Upper bound of the bucket holding the ``fraction`` quantile, capped at ``max_ms``"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = max(1, math.ceil(total * fraction))
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            bound = BUCKETS_MS[index] if index < len(BUCKETS_MS) else max_ms
+            return min(bound, max_ms) if max_ms is not None else bound
+    return max_ms
+
+
+def view_summary(hours=24):
+    """Per-URL-name totals and p50/p95/p99 over the last ``hours`` hours, slowest p95 first"""
+    since = timezone.now() - timedelta(hours=hours)
+    views = {}
+    for row in RequestMetric.objects.filter(hour__gte=since.replace(minute=0, second=0, microsecond=0)):
+        merged = views.setdefault(row.url_name, _new_entry())
+        for field in ('requests', 'errors', 'total_ms', 'queries', 'query_ms', 'cache_hits', 'cache_misses',
+                      'http_calls', 'http_ms'):
+            merged[field] += getattr(row, field)
+        merged['max_ms'] = max(merged['max_ms'], row.max_ms)
+        _merge_histogram(merged['histogram'], row.histogram)
+
+    summary = []
+    for url_name, merged in views.items():
+        requests = merged['requests'] or 1
+        lookups = merged['cache_hits'] + merged['cache_misses']
+        summary.append({
+            'url_name': url_name,
+            'requests': merged['requests'],
+            'errors': merged['errors'],
+            'avg_ms': merged['total_ms'] / requests,
+            'p50_ms': percentile(merged['histogram'], 0.50, merged['max_ms']),
+            'p95_ms': percentile(merged['histogram'], 0.95, merged['max_ms']),
+            'p99_ms': percentile(merged['histogram'], 0.99, merged['max_ms']),
+            'max_ms': merged['max_ms'],
+            'avg_queries': merged['queries'] / requests,
+            'avg_query_ms': merged['query_ms'] / requests,
+            'cache_hit_ratio': merged['cache_hits'] / lookups if lookups else None,
+            'avg_http_ms': merged['http_ms'] / requests,
+        })
+    summary.sort(key=lambda view: (view['p95_ms'] or 0, view['requests']), reverse=True)
+    return summary
+
+
+def worst_queries(hours=24, limit=20):
+    """Statements with the most total time over the last ``hours`` hours, per URL name"""
+    since = timezone.now() - timedelta(hours=hours)
+    rows = (
+        QueryMetric.objects.filter(hour__gte=since.replace(minute=0, second=0, microsecond=0))
+        .values('url_name', 'sql_hash')
+        .annotate(statement=Max('sql'), calls=Sum('count'), total=Sum('total_ms'), slowest=Max('max_ms'))
+        .order_by('-total')[:limit]
+    )
+    return [
+        {'url_name': row['url_name'], 'sql': row['statement'], 'count': row['calls'], 'total_ms': row['total'],
+         'avg_ms': row['total'] / row['calls'] if row['calls'] else 0, 'max_ms': row['slowest']}
+        for row in rows
+    ]
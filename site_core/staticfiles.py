@@ -0,0 +1,228 @@
+"""Hashed, minified and precompressed static files, and a middleware serving them.
+
+``collectstatic`` with CompressedManifestStaticFilesStorage minifies the CSS
+and then writes each file under a content-hashed name, as
+ManifestStaticFilesStorage does. The hash is therefore taken over the bytes
+that are served. It then writes ``.gz`` and ``.br`` siblings of every
+text-like file. A sibling is kept only when it is meaningfully smaller.
+Minification uses a conservative built-in pass for CSS and ``rjsmin`` for
+JavaScript; JavaScript is left as is without rjsmin. ``.br`` files need the
+``brotli`` package. Both are optional.
+
+PrecompressedStaticMiddleware answers STATIC_URL requests from STATIC_ROOT
+right after SecurityMiddleware has added its headers, before the rest run:
+- it picks the smallest encoding the client accepts
+- hashed names get ``Cache-Control: public, max-age=31536000, immutable``
+- other names get a short max-age
+
+It lists STATIC_ROOT once, when the process starts, so restart the workers
+after collectstatic. In DEBUG it steps aside for the development static
+view. A front-end server with gzip_static/brotli_static can serve the same
+files instead.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only .gz siblings are written without it
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # rjsmin is optional; JavaScript is compressed but not minified without it
+    rjsmin = None
+
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.eot')
+MIN_SAVING = 0.05  # fraction a compressed sibling must save to be kept
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # preferred first
+IMMUTABLE = 'public, max-age=31536000, immutable'
+DEFAULT_MAX_AGE = 60  # seconds, for files referenced by their unhashed name
+
+# String literals are copied verbatim; comments other than /*! licences */ are dropped
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*(!?).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r' ?([{};,>]) ?')
+
+
+def _squeeze(css):
+    return _CSS_PUNCTUATION.sub(r'\1', _CSS_SPACE.sub(' ', css)).replace(';}', '}').replace(': ', ':')
+
+
+def minify_css(css):
+    """Drop comments and insignificant whitespace outside string literals"""
+    parts = []
+    pending = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(css):
+        pending.append(css[position:match.start()])
+        position = match.end()
+        if match.group(1) is None and not match.group(2):
+            pending.append(' ')  # a comment still separates the tokens around it
+            continue
+        parts.append(_squeeze(''.join(pending)))
+        parts.append(match.group(0))
+        pending = []
+    pending.append(css[position:])
+    parts.append(_squeeze(''.join(pending)))
+    return ''.join(parts).strip()
+
+
+def minify(name, content):
+    """Minified ``content`` of the static file ``name``, or None when there is nothing to do for it"""
+    base, extension = os.path.splitext(name)
+    if base.endswith('.min') or extension not in ('.css', '.js'):
+        return None
+    try:
+        text = content.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    if extension == '.css':
+        return minify_css(text).encode('utf-8')
+    return rjsmin.jsmin(text).encode('utf-8') if rjsmin else None
+
+
+def compress(content):
+    """{suffix: bytes} of the encodings worth storing next to ``content``"""
+    siblings = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        siblings['.br'] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in siblings.items() if len(data) <= len(content) * (1 - MIN_SAVING)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # Before the first collectstatic with this storage there is no manifest: keep plain names
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            # Hash the minified bytes, so a hashed name always matches what is served under it
+            paths = {name: self.minify_source(name, source) for name, source in paths.items()}
+        collected = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if hashed_name and not isinstance(processed, Exception):
+                collected[name] = collected[hashed_name] = True
+        if dry_run:
+            return
+        for name in collected:
+            if name.endswith(COMPRESSIBLE):
+                self.optimize(name)
+
+    def minify_source(self, name, source):
+        """Minify the collected copy of ``name``; returns the (storage, path) to hash it from"""
+        storage, path = source
+        if not name.endswith(('.css', '.js')):
+            return source
+        with storage.open(path) as handle:
+            content = handle.read()
+        minified = minify(name, content)
+        if minified is None or len(minified) >= len(content):
+            return source
+        self._replace(name, minified)
+        return self, name
+
+    def optimize(self, name):
+        """Write the compressed siblings of ``name``"""
+        with self.open(name) as handle:
+            content = handle.read()
+        for suffix, data in compress(content).items():
+            self._replace(name + suffix, data)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+
+def accepted_encodings(header):
+    """Content codings the Accept-Encoding ``header`` allows"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    """A collected file; ``variants`` maps '' and each precompressed encoding to (path, size)"""
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.variants = {'': (path, stat.st_size)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                self.variants[encoding] = (path + suffix, os.path.getsize(path + suffix))
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.cache_control = IMMUTABLE if immutable else f'public, max-age={DEFAULT_MAX_AGE}'
+
+    def pick(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return ''
+
+
+def index_static_root(root, hashed_names):
+    """{relative URL path: StaticFile} of everything collected into ``root``"""
+    files = {}
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(suffixes):
+                continue
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[relative] = StaticFile(path, relative in hashed_names)
+    return files
+
+
+class PrecompressedStaticMiddleware:
+    """Serve collected static files, precompressed and with far-future caching for hashed names"""
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.files = index_static_root(settings.STATIC_ROOT, hashed_names)
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return self.get_response(request)
+        static_file = self.files.get(request.path_info[len(self.prefix):])
+        if static_file is None:
+            return self.get_response(request)
+
+        encoding = static_file.pick(request.headers.get('Accept-Encoding', ''))
+        etag = f'{static_file.etag[:-1]}-{encoding}"' if encoding else static_file.etag
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            path, size = static_file.variants[encoding]
+            response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+            del response['Content-Disposition']
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = static_file.cache_control
+        if len(static_file.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        return response
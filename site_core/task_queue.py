@@ -0,0 +1,274 @@
+"""A small database-backed job queue for side effects that should not run inside a request.
+
+Views used to send mail and call Monnify inline, so a slow SMTP server or API
+round trip was added to the response time (and an exception there failed the
+request). Side effects are now registered as tasks and queued as rows::
+
+    @task('accounts.notify_kyc_submission', queue='mail')
+    def notify_kyc_submission(kyc_id):
+        ...
+
+    notify_kyc_submission.enqueue(kyc_id=kyc.pk)
+
+A row is created in the caller's transaction, so a task only becomes visible
+to workers once the data it refers to is committed, and disappears with it on
+rollback. Payloads are JSON; pass ids rather than model instances.
+
+Workers (``manage.py run_tasks``) claim due rows with a conditional UPDATE,
+run them and delete them on success. Tasks are not wrapped in a transaction;
+each one opens its own atomic blocks around the writes that belong together. A failure is
+retried with exponential backoff until ``max_attempts``; after that, or on a
+PermanentTaskError, the task moves to DeadLetterTask, from where
+``manage.py retry_dead_tasks`` or the admin can queue it again. Queues listed
+in ``TASK_QUEUE_CONCURRENCY`` never have more than that many tasks running at
+once across all workers, and a task whose worker died is queued again after
+``TASK_LOCK_TIMEOUT`` seconds.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BackgroundTask, DeadLetterTask
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_TIMEOUT = 600  # seconds
+DEFAULT_RETRY_DELAY = 30  # seconds, doubled after every failed attempt
+MAX_RETRY_DELAY = 6 * 60 * 60
+CLAIM_BATCH = 20
+
+_registry = {}
+
+
+class TaskError(Exception):
+    """Raised by a task to fail this attempt; it is retried until max_attempts"""
+
+
+class PermanentTaskError(TaskError):
+    """Raised by a task that cannot succeed on retry; it goes straight to the dead letters"""
+
+
+class Task:
+    def __init__(self, func, name, queue, max_attempts):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def __call__(self, **payload):
+        """Run the task inline"""
+        return self.func(**payload)
+
+    def enqueue(self, **payload):
+        return self.schedule(payload)
+
+    def schedule(self, payload, unique_key='', delay=None):
+        """Queue a call; with ``unique_key``, return the queued one instead of adding a second"""
+        task = BackgroundTask(
+            name=self.name,
+            queue=self.queue,
+            payload=payload,
+            unique_key=unique_key,
+            max_attempts=self.max_attempts,
+            run_after=timezone.now() + (delay or timedelta()),
+        )
+        if not unique_key:
+            task.save()
+            return task
+        try:
+            with transaction.atomic():
+                task.save()
+        except IntegrityError:
+            return BackgroundTask.objects.get(name=self.name, unique_key=unique_key)
+        return task
+
+
+def task(name, queue='default', max_attempts=5):
+    """Register a function as a task under ``name``"""
+    def decorator(func):
+        if name in _registry:
+            raise ValueError(f'Task {name!r} is already registered')
+        _registry[name] = Task(func, name, queue, max_attempts)
+        return _registry[name]
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def _lock_timeout():
+    return getattr(settings, 'TASK_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+
+
+def _retry_delay(attempts):
+    base = getattr(settings, 'TASK_RETRY_DELAY', DEFAULT_RETRY_DELAY)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY))
+
+
+def _concurrency_limits():
+    return getattr(settings, 'TASK_QUEUE_CONCURRENCY', {})
+
+
+def claim(worker, queues=None):
+    """Lock the next due task for ``worker``, or return None when there is nothing to run"""
+    now = timezone.now()
+    limits = _concurrency_limits()
+    due = BackgroundTask.objects.filter(status=BackgroundTask.PENDING, run_after__lte=now)
+    if queues:
+        due = due.filter(queue__in=queues)
+    if limits:
+        running = dict(
+            BackgroundTask.objects.filter(status=BackgroundTask.RUNNING, queue__in=limits)
+            .order_by().values_list('queue').annotate(n=Count('pk'))
+        )
+        full = [queue for queue, limit in limits.items() if running.get(queue, 0) >= limit]
+        if full:
+            due = due.exclude(queue__in=full)
+
+    for pk, queue in due.order_by('run_after', 'pk').values_list('pk', 'queue')[:CLAIM_BATCH]:
+        # Another worker may claim the row (or fill the queue) between the
+        # SELECT and here, so the UPDATE re-checks both and only one wins
+        claimed = BackgroundTask.objects.filter(pk=pk, status=BackgroundTask.PENDING)
+        if queue in limits:
+            running = (
+                BackgroundTask.objects.filter(queue=OuterRef('queue'), status=BackgroundTask.RUNNING)
+                .order_by().values('queue').annotate(n=Count('pk')).values('n')
+            )
+            claimed = claimed.annotate(
+                running=Coalesce(Subquery(running, output_field=IntegerField()), Value(0))
+            ).filter(running__lt=limits[queue])
+        if claimed.update(status=BackgroundTask.RUNNING, locked_by=worker, locked_at=now,
+                          attempts=F('attempts') + 1):
+            return BackgroundTask.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Run a claimed task; returns True if it succeeded"""
+    registered = get_task(job.name)
+    try:
+        if registered is None:
+            raise PermanentTaskError(f'No task registered as {job.name!r}')
+        # No wrapping transaction: a task that calls out and then writes commits its own atomic blocks,
+        # so a later failure cannot roll back the record of a side effect that already happened
+        registered.func(**job.payload)
+    except Exception as exc:
+        logger.warning('Task %s #%s failed (attempt %s of %s): %s',
+                       job.name, job.pk, job.attempts, job.max_attempts, exc)
+        fail(job, traceback.format_exc(), permanent=isinstance(exc, PermanentTaskError))
+        return False
+    BackgroundTask.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+    return True
+
+
+def fail(job, error, permanent=False):
+    """Schedule a retry of a failed task, or move it to the dead letters"""
+    with transaction.atomic():
+        if permanent or job.attempts >= job.max_attempts:
+            DeadLetterTask.objects.create(
+                name=job.name, queue=job.queue, payload=job.payload, attempts=job.attempts,
+                last_error=error, created_at=job.created_at,
+            )
+            BackgroundTask.objects.filter(pk=job.pk).delete()
+            logger.error('Task %s #%s moved to the dead letters after %s attempt(s)', job.name, job.pk, job.attempts)
+        else:
+            BackgroundTask.objects.filter(pk=job.pk).update(
+                status=BackgroundTask.PENDING, locked_by='', locked_at=None, last_error=error,
+                run_after=timezone.now() + _retry_delay(job.attempts),
+            )
+
+
+def release_stale(timeout=None):
+    """Fail tasks whose worker has held them longer than the lock timeout; returns how many"""
+    cutoff = timezone.now() - timedelta(seconds=_lock_timeout() if timeout is None else timeout)
+    stale = list(BackgroundTask.objects.filter(status=BackgroundTask.RUNNING, locked_at__lt=cutoff))
+    for job in stale:
+        fail(job, f'Worker {job.locked_by} did not finish the task within the lock timeout')
+    return len(stale)
+
+
+class Worker:
+    """Runs queued tasks on ``concurrency`` threads until stopped (or, in burst mode, until idle)"""
+
+    def __init__(self, queues=None, concurrency=1, poll_interval=1.0):
+        self.queues = list(queues or [])
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.name = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self, burst=False, max_tasks=None):
+        self._max_tasks = max_tasks
+        release_stale()
+        if self.concurrency == 1:
+            self._loop(burst, self.name)
+        else:
+            threads = [
+                threading.Thread(target=self._thread, args=(burst, f'{self.name}:{n}'), daemon=True)
+                for n in range(self.concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return self.processed
+
+    def _thread(self, burst, name):
+        try:
+            self._loop(burst, name)
+        finally:
+            connection.close()
+
+    def _take_slot(self):
+        with self._lock:
+            if self._max_tasks is not None and self.processed >= self._max_tasks:
+                return False
+            self.processed += 1
+            return True
+
+    def _loop(self, burst, name):
+        last_sweep = time.monotonic()
+        while not self.stopping.is_set():
+            close_old_connections()
+            if time.monotonic() - last_sweep > _lock_timeout() / 2:
+                release_stale()
+                last_sweep = time.monotonic()
+            if not self._take_slot():
+                return
+            job = claim(name, self.queues)
+            if job is None:
+                with self._lock:
+                    self.processed -= 1
+                if burst:
+                    return
+                self.stopping.wait(self.poll_interval)
+                continue
+            if not execute(job):
+                with self._lock:
+                    self.failed += 1
+
+
+def run_pending(queues=None, max_tasks=None):
+    """Run every due task in this thread and return how many ran (tests, cron-style callers)"""
+    return Worker(queues).run(burst=True, max_tasks=max_tasks)
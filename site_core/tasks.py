@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .images import DerivativeError, generate, get_derivatives
+from .task_queue import PermanentTaskError, task
+
+
+@task('site_core.send_email', queue='mail')
+def send_email(subject, message, recipient_list, from_email=None):
+    """Send a plain-text email; SMTP errors fail the attempt so it is retried"""
+    send_mail(subject, message, from_email or settings.DEFAULT_FROM_EMAIL, recipient_list)
+
+
+@task('site_core.generate_image_derivatives', queue='images')
+def generate_image_derivatives(source, variants):
+    """Resize a new upload into its variants; an unreadable or deleted source is not retried"""
+    missing = [variant for variant in variants if get_derivatives(source, variant) is None]
+    if not missing:
+        return
+    try:
+        generate(source, missing)
+    except DerivativeError as e:
+        raise PermanentTaskError(str(e)) from e
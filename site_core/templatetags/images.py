@@ -0,0 +1,40 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from site_core import images
+
+register = template.Library()
+
+
+def _variant(field, variant):
+    if not field:
+        return None
+    if not images.enabled():
+        return {'webp': None, 'fallback': field.url, 'width': None, 'height': None}
+    return images.variant_urls(field.name, variant)
+
+
+@register.simple_tag
+def image_url(field, variant):
+    """URL of the JPEG/PNG fallback of ``field``'s variant (the original while derivatives are disabled)"""
+    urls = _variant(field, variant)
+    return urls['fallback'] if urls else ''
+
+
+@register.simple_tag
+def picture(field, variant, alt='', **attrs):
+    """<picture> with ``field``'s WebP variant and a fallback <img>; other keyword arguments become img attributes"""
+    urls = _variant(field, variant)
+    if not urls:
+        return ''
+    attrs = {'loading': 'lazy', 'decoding': 'async', **attrs}
+    for name in ('width', 'height'):
+        if urls[name]:
+            attrs.setdefault(name, urls[name])
+    img = format_html(
+        '<img src="{}" alt="{}"{}>', urls['fallback'], alt,
+        format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items())),
+    )
+    if not urls['webp']:
+        return img
+    return format_html('<picture><source srcset="{}" type="image/webp">{}</picture>', urls['webp'], img)
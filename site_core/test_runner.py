@@ -0,0 +1,51 @@
+"""Test runner that keeps per-process write buffers from outliving the test that filled them.
+
+Flush timers are switched off, so buffers are only written when a test
+flushes them.
+
+Counter increments point at rows of one test and request metrics describe its
+requests. Flushed during a later test, increments would land on whatever rows
+reuse those pks. Flushed at exit, once the test database is gone, either
+would land in the configured database.
+"""
+import unittest
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from .counters import counter_buffer
+from .perf import metric_buffer
+
+FLUSH_INTERVAL_SETTINGS = ('COUNTER_FLUSH_INTERVAL', 'PERF_FLUSH_INTERVAL')
+
+
+def discard_buffers():
+    counter_buffer.discard()
+    metric_buffer.discard()
+
+
+class BufferResetMixin:
+    def startTest(self, test):
+        discard_buffers()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._saved_intervals = {name: getattr(settings, name) for name in FLUSH_INTERVAL_SETTINGS}
+        for name in FLUSH_INTERVAL_SETTINGS:
+            setattr(settings, name, 0)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, value in self._saved_intervals.items():
+            setattr(settings, name, value)
+        super().teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        resultclass = super().get_resultclass() or unittest.TextTestResult
+        return type(resultclass.__name__, (BufferResetMixin, resultclass), {})
+
+    def teardown_databases(self, old_config, **kwargs):
+        discard_buffers()
+        super().teardown_databases(old_config, **kwargs)
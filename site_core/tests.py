@@ -1,3 +1,770 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.templatetags.static import static as static_url
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import KYCVerification, VirtualAccount
+from accounts.views import send_kyc_submission_notification
+from blog.models import BlogPost
+from jobs.models import Job
+from payments.fake_monnify import FakeMonnifyServer
+from payments.models import Transaction
+from payments.monnify_client import reset_monnify_clients
+from payments.monnify_service import MonnifyService
+from products.models import Product
+from . import images
+from .analytics import get_period_summary, get_period_totals, get_top_posters
+from .counters import counter_buffer, increment_counter
+from .db import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, replica_reads, use_primary
+from .http_cache import invalidate_models
+from .log import SamplingFilter, StructuredFormatter
+from .models import (
+    BackgroundTask, Category, DeadLetterTask, ImageDerivative, QueryMetric, RequestMetric, SiteSetting,
+    UserDailyMetric,
+)
+from .pagination import InvalidCursor, KeysetPaginator
+from .perf import BUCKETS_MS, instrument_cache, measure, metric_buffer, normalize_sql, percentile
+from .staticfiles import PrecompressedStaticMiddleware, accepted_encodings, minify, minify_css
+from .task_queue import PermanentTaskError, TaskError, claim, release_stale, run_pending, task
+
+User = get_user_model()
+
+task_calls = []
+
+
+@task('site_core.tests.record')
+def record_task(value):
+    task_calls.append(value)
+
+
+@task('site_core.tests.flaky', max_attempts=2)
+def flaky_task(permanent=False):
+    raise PermanentTaskError('never works') if permanent else TaskError('try again')
+
+
+@task('site_core.tests.call_out_then_save', max_attempts=2)
+def call_out_then_save_task(name):
+    if Category.objects.filter(name=name).exists():
+        return
+    task_calls.append(name)  # stands in for a provider call
+    with transaction.atomic():
+        Category.objects.create(name=name, category_type='product')
+    raise TaskError('failed after saving')
+
+
+class SiteSettingCacheTests(TestCase):
+    def setUp(self):
+        SiteSetting.invalidate_cache()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.client.force_login(self.user)
+
+    def site_setting_queries(self, queries):
+        return [q['sql'] for q in queries if 'site_core_sitesetting' in q['sql']]
+
+    def test_warm_page_render_issues_no_site_setting_queries(self):
+        self.client.get(reverse('transfer_money'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transfer_money'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.site_setting_queries(queries.captured_queries), [])
+
+    def test_cold_request_queries_once(self):
+        SiteSetting.objects.create(site_title='Cold')
+        SiteSetting.invalidate_cache()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('add_money'))
+        self.assertEqual(len(self.site_setting_queries(queries.captured_queries)), 1)
+
+    def test_save_invalidates_cached_copy(self):
+        settings_row = SiteSetting.get_solo()
+        settings_row.site_title = 'Renamed'
+        settings_row.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(SiteSetting.get_solo().site_title, 'Renamed')
+        with self.assertNumQueries(0):
+            self.assertEqual(SiteSetting.get_solo().site_title, 'Renamed')
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=0, COUNTER_FLUSH_THRESHOLD=1000)
+class CounterBufferTests(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user(username='seller', password='testpass123')
+        category = Category.objects.create(name='Templates', category_type='product')
+        self.products = [
+            Product.objects.create(
+                title=f'Product {n}', description='Desc', seller=seller, price=10,
+                category=category, product_file='product_files/p.zip', status='approved'
+            )
+            for n in range(3)
+        ]
+
+    def test_hits_are_buffered_then_flushed_in_grouped_updates(self):
+        for product in self.products:
+            for _ in range(2):
+                product.increment_views()
+        self.products[0].increment_downloads()
+
+        with self.assertNumQueries(0):
+            self.products[0].increment_views()
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).views_count, 0)
+        self.assertEqual(counter_buffer.pending(self.products[0], 'views_count'), 3)
+
+        # views +3 for one row, views +2 for two rows, downloads +1: three UPDATEs in one transaction
+        with self.assertNumQueries(5):
+            self.assertEqual(counter_buffer.flush(), 8)
+        counts = dict(Product.objects.values_list('pk', 'views_count'))
+        self.assertEqual([counts[p.pk] for p in self.products], [3, 2, 2])
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).download_count, 1)
+
+    @override_settings(COUNTER_FLUSH_THRESHOLD=3)
+    def test_threshold_triggers_flush(self):
+        product = self.products[0]
+        for _ in range(3):
+            product.increment_views()
+        self.assertEqual(Product.objects.get(pk=product.pk).views_count, 3)
+        self.assertEqual(counter_buffer.pending(product, 'views_count'), 0)
+
+        # The threshold counts hits, however they were batched
+        increment_counter(product, 'views_count', 2)
+        self.assertEqual(counter_buffer.pending(product, 'views_count'), 2)
+        increment_counter(self.products[1], 'views_count')
+        self.assertEqual(Product.objects.get(pk=product.pk).views_count, 5)
+
+    def test_detail_page_does_not_write_per_hit(self):
+        url = reverse('product_detail', args=[self.products[0].pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')])
+        counter_buffer.flush()
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).views_count, 2)
+
+
+class AnalyticsRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.seller = User.objects.create_user(username='maker', password='testpass123')
+        category = Category.objects.create(name='Tools', category_type='product')
+        for n in range(2):
+            Product.objects.create(
+                title=f'Tool {n}', description='Desc', seller=self.seller, price=10,
+                category=category, product_file='product_files/p.zip', status='approved'
+            )
+        Transaction.objects.create(user=self.seller, transaction_type='sale', amount=Decimal('75'), status='completed')
+        self.seller.last_login = timezone.now()
+        self.seller.save(update_fields=['last_login'])
+
+    def test_rollup_matches_live_counts_and_is_idempotent(self):
+        call_command('rollup_metrics', stdout=StringIO())
+        call_command('rollup_metrics', stdout=StringIO())
+
+        totals = get_period_totals(7)
+        self.assertEqual(totals['signups'], 2)
+        self.assertEqual(totals['products'], 2)
+        self.assertEqual(totals['active_users'], 1)
+        self.assertEqual(totals['earnings'], Decimal('75'))
+        self.assertEqual(UserDailyMetric.objects.filter(user=self.seller).count(), 1)
+
+        poster = get_top_posters(7)[0]
+        self.assertEqual((poster['username'], poster['product_count'], poster['total_content']), ('maker', 2, 2))
+
+    def test_analytics_view_reads_rollups(self):
+        call_command('rollup_metrics', stdout=StringIO())
+        self.client.force_login(self.staff)
+        self.client.get(reverse('analytics'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('analytics'), {'period': '30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['new_products'], 2)
+        self.assertEqual(response.context['top_earners'][0]['total_earned'], Decimal('75'))
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('products_product', sql)
+        self.assertNotIn('payments_transaction', sql)
+
+    def test_summary_before_first_rollup_and_across_midnight(self):
+        self.assertEqual(get_period_summary(7)['top_earners'][0]['total_earned'], Decimal('75'))
+
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=tomorrow):
+            Transaction.objects.create(user=self.seller, transaction_type='commission', amount=Decimal('5'),
+                                       status='completed')
+            self.assertEqual(get_period_summary(7)['top_earners'][0]['total_earned'], Decimal('80'))
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', password='testpass123')
+        for n in range(7):
+            Transaction.objects.create(user=self.user, transaction_type='sale', amount=Decimal(n + 1),
+                                       status='completed')
+        # Rows sharing a timestamp must still be split cleanly by id
+        Transaction.objects.filter(amount__in=[3, 4, 5]).update(created_at=timezone.now())
+        self.expected = list(Transaction.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.paginator = KeysetPaginator(Transaction.objects.filter(user=self.user), 3)
+
+    def pks(self, page):
+        return [txn.pk for txn in page]
+
+    def test_walks_forward_and_back_without_gaps_or_repeats(self):
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertEqual(self.pks(first) + self.pks(second) + self.pks(third), self.expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+
+        back = self.paginator.page(third.previous_cursor)
+        self.assertEqual(self.pks(back), self.pks(second))
+        self.assertEqual(self.pks(self.paginator.page(back.previous_cursor)), self.pks(first))
+        self.assertFalse(self.paginator.page(back.previous_cursor).has_previous())
+
+    def test_page_query_has_no_count_or_offset(self):
+        cursor = self.paginator.page().next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.paginator.page(cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_capped_count(self):
+        page = KeysetPaginator(Transaction.objects.all(), 3, count_cap=5).page()
+        self.assertEqual(page.capped_count, 6)
+        self.assertTrue(page.count_is_capped)
+
+    def test_bad_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator.page('not-a-cursor')
+        self.assertEqual(self.pks(self.paginator.get_page('not-a-cursor')), self.expected[:3])
+
+    def test_transactions_list_follows_cursor_links(self):
+        for n in range(20):
+            Transaction.objects.create(user=self.user, transaction_type='sale', amount=Decimal('1'),
+                                       status='completed')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions_list'), {'transaction_type': 'sale'})
+        page = response.context['page_obj']
+        self.assertContains(response, f'?cursor={page.next_cursor}&transaction_type=sale')
+
+
+class HttpCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='poster', password='testpass123')
+        self.category = Category.objects.create(name='Tech', category_type='job')
+        SiteSetting.get_solo()  # created on first use, which would itself invalidate the first page
+        self.job = Job.objects.create(
+            title='Backend developer', description='Build things', category=self.category, job_type='full_time',
+            location='Lagos', company_name='Acme', salary_min=1000, salary_max=2000,
+            deadline=timezone.now() + timedelta(days=30), posted_by=self.user, status='approved'
+        )
+        self.list_url = reverse('jobs_list')
+
+    def test_anonymous_list_is_cached_and_revalidated(self):
+        first = self.client.get(self.list_url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertIn('max-age=0', first['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.list_url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_query_params_get_their_own_etag(self):
+        plain = self.client.get(self.list_url)
+        filtered = self.client.get(self.list_url, {'search': 'nothing-matches'})
+        self.assertNotEqual(plain['ETag'], filtered['ETag'])
+        self.assertNotContains(filtered, 'Backend developer')
+
+    def test_saves_and_bulk_updates_invalidate(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.job.title = 'Frontend developer'
+        self.job.save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Frontend developer')
+
+        etag = response['ETag']
+        Job.objects.filter(pk=self.job.pk).update(title='Data engineer')
+        invalidate_models(Job)
+        self.assertContains(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag), 'Data engineer')
+
+    def test_detail_304_still_counts_the_view(self):
+        url = reverse('job_detail', args=[self.job.pk])
+        etag = self.client.get(url)['ETag']
+        pending = counter_buffer.pending(self.job, 'views_count')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(counter_buffer.pending(self.job, 'views_count'), pending + 1)
+
+    def test_logged_in_users_are_not_cached(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.list_url)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('X-Cache'))
+
+    def test_api_conditional_get(self):
+        BlogPost.objects.create(title='Post', slug='post', content='Body', author=self.user, status='published')
+        self.client.force_login(self.user)
+        url = reverse('blog-post-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):  # session and user come from the cache
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+
+@override_settings(TASK_QUEUE_CONCURRENCY={'limited': 1}, TASK_RETRY_DELAY=30)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        task_calls.clear()
+
+    def test_task_runs_and_is_removed(self):
+        record_task.enqueue(value=7)
+        self.assertEqual(task_calls, [])
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(task_calls, [7])
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_failure_is_retried_with_backoff_then_dead_lettered(self):
+        queued = flaky_task.enqueue()
+        run_pending()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (BackgroundTask.PENDING, 1))
+        self.assertGreater(queued.run_after, timezone.now() + timedelta(seconds=20))
+        self.assertIn('try again', queued.last_error)
+
+        # Not due yet, so a burst run leaves it alone
+        self.assertEqual(run_pending(), 0)
+        BackgroundTask.objects.update(run_after=timezone.now())
+        run_pending()
+        self.assertFalse(BackgroundTask.objects.exists())
+        dead = DeadLetterTask.objects.get()
+        self.assertEqual((dead.name, dead.attempts), ('site_core.tests.flaky', 2))
+
+    def test_permanent_error_skips_retries_and_dead_letters_can_be_requeued(self):
+        flaky_task.enqueue(permanent=True)
+        run_pending()
+        self.assertEqual(DeadLetterTask.objects.get().attempts, 1)
+
+        call_command('retry_dead_tasks', '--all', stdout=StringIO())
+        requeued = BackgroundTask.objects.get()
+        self.assertEqual((requeued.payload, requeued.attempts, requeued.max_attempts), ({'permanent': True}, 0, 2))
+        self.assertFalse(DeadLetterTask.objects.exists())
+
+    def test_retry_sees_what_the_failed_attempt_committed(self):
+        call_out_then_save_task.enqueue(name='Reserved')
+        run_pending()
+        BackgroundTask.objects.update(run_after=timezone.now())
+        run_pending()
+        self.assertEqual(task_calls, ['Reserved'])
+        self.assertTrue(Category.objects.filter(name='Reserved').exists())
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_unique_key_is_queued_once(self):
+        first = record_task.schedule({'value': 1}, unique_key='once')
+        second = record_task.schedule({'value': 2}, unique_key='once')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_concurrency_limit_holds_back_a_full_queue(self):
+        BackgroundTask.objects.create(name='site_core.tests.record', queue='limited', status=BackgroundTask.RUNNING,
+                                      run_after=timezone.now(), locked_at=timezone.now(), locked_by='other')
+        held = record_task.schedule({'value': 1})
+        BackgroundTask.objects.filter(pk=held.pk).update(queue='limited')
+        free = record_task.enqueue(value=2)
+
+        self.assertEqual(claim('worker').pk, free.pk)
+        self.assertIsNone(claim('worker'))
+
+    def test_task_of_a_dead_worker_is_released(self):
+        stale = record_task.enqueue(value=3)
+        BackgroundTask.objects.filter(pk=stale.pk).update(
+            status=BackgroundTask.RUNNING, attempts=1, locked_by='gone', locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(release_stale(), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.locked_by), (BackgroundTask.PENDING, ''))
+
+    @override_settings(ADMINS=[('Ops', 'ops@example.com')])
+    def test_kyc_submission_notification_is_mailed_by_the_worker(self):
+        kyc = self.create_kyc()
+        send_kyc_submission_notification(kyc.user, kyc)
+        self.assertEqual(len(mail.outbox), 0)
+
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(kyc.user.username, mail.outbox[0].body)
+
+    def test_kyc_approval_provisions_accounts_in_the_background(self):
+        server = FakeMonnifyServer().start()
+        self.addCleanup(server.stop)
+        self.addCleanup(reset_monnify_clients)
+        staff = User.objects.create_user(username='reviewer', password='x', is_staff=True)
+        kyc = self.create_kyc()
+        self.client.force_login(staff)
+
+        with override_settings(MONNIFY_BASE_URL=server.url, MONNIFY_API_KEY=server.api_key,
+                               MONNIFY_SECRET_KEY=server.secret_key, MONNIFY_CONTRACT_CODE='0000000000'):
+            for _ in range(2):
+                self.client.post(reverse('kyc_detail', args=[kyc.pk]), {'action': 'approve'})
+            self.assertEqual(server.stats['requests'], 0)
+            self.assertEqual(BackgroundTask.objects.count(), 1)
+            kyc.refresh_from_db()
+            self.assertEqual(kyc.status, 'pending')
+
+            run_pending()
+
+        kyc.refresh_from_db()
+        self.assertEqual((kyc.status, kyc.reviewed_by), ('approved', staff))
+        accounts = VirtualAccount.objects.filter(user=kyc.user)
+        self.assertEqual(accounts.count(), 3)
+        self.assertEqual(accounts.filter(is_primary=True).count(), 1)
+        self.assertTrue(kyc.user.notifications.filter(notification_type='approval').exists())
+
+    def create_kyc(self):
+        user = User.objects.create_user(username='applicant', email='applicant@example.com', password='x',
+                                        referral_code='APPLICANT')
+        return KYCVerification.objects.create(
+            user=user, id_type='nin', id_number='123', legal_first_name='Ada', legal_last_name='Obi',
+            date_of_birth='1990-01-01', address='1 Road', city='Lagos', state='Lagos',
+            id_document_front='kyc_documents/front.jpg',
+        )
+
+
+@override_settings(PERF_FLUSH_INTERVAL=0, PERF_FLUSH_THRESHOLD=1000)
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        RequestMetric.objects.all().delete()
+        QueryMetric.objects.all().delete()
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_requests_are_recorded_per_url_name(self):
+        for _ in range(2):
+            self.client.get(reverse('analytics'))
+        self.assertFalse(RequestMetric.objects.exists())
+        self.assertEqual(metric_buffer.flush(), 2)
+
+        metric = RequestMetric.objects.get(url_name='analytics')
+        self.assertEqual((metric.requests, metric.errors), (2, 0))
+        self.assertEqual(sum(metric.histogram), 2)
+        self.assertGreater(metric.queries, 0)
+        self.assertGreaterEqual(metric.max_ms, metric.total_ms / 2)
+        self.assertTrue(QueryMetric.objects.filter(url_name='analytics', sql__startswith='SELECT').exists())
+
+        # A second flush adds to the same hour's rows
+        self.client.get(reverse('analytics'))
+        metric_buffer.flush()
+        metric.refresh_from_db()
+        self.assertEqual((metric.requests, sum(metric.histogram)), (3, 3))
+
+    def test_cache_lookups_and_outbound_http_are_counted(self):
+        instrument_cache(cache)
+        cache.set('perf:a', 1)
+        with measure() as stats:
+            cache.get('perf:a')
+            cache.get('perf:b')
+            cache.get_many(['perf:a', 'perf:b', 'perf:c'])
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 3))
+        # Outside a measured block nothing is counted
+        self.assertEqual(cache.get('perf:a'), 1)
+        self.assertEqual(stats.cache_hits, 2)
+
+        with FakeMonnifyServer() as server, measure() as stats:
+            with override_settings(MONNIFY_BASE_URL=server.url, MONNIFY_API_KEY=server.api_key,
+                                   MONNIFY_SECRET_KEY=server.secret_key):
+                try:
+                    MonnifyService().verify_transaction('MNFY|missing')
+                finally:
+                    reset_monnify_clients()
+        self.assertEqual(stats.http_calls, 1)
+        self.assertGreater(stats.http_ms, 0)
+
+    def test_statements_differing_only_in_list_length_share_an_entry(self):
+        self.assertEqual(
+            normalize_sql('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            normalize_sql('SELECT * FROM t WHERE id IN (%s, %s)'),
+        )
+        self.assertEqual(
+            normalize_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (%s, ...), ...',
+        )
+
+    def test_percentiles_are_bucket_bounds_capped_at_the_slowest_request(self):
+        histogram = [0] * (len(BUCKETS_MS) + 1)
+        histogram[BUCKETS_MS.index(10)] = 90
+        histogram[BUCKETS_MS.index(500)] = 10
+        self.assertEqual(percentile(histogram, 0.50), 10)
+        self.assertEqual(percentile(histogram, 0.95), 500)
+        self.assertEqual(percentile(histogram, 0.99, max_ms=320), 320)
+        self.assertIsNone(percentile([0] * len(histogram), 0.5))
+
+    def test_staff_page_shows_views_and_worst_queries(self):
+        self.client.get(reverse('analytics'))
+        response = self.client.get(reverse('performance_dashboard'), {'hours': '1'})
+        self.assertEqual(response.status_code, 200)
+        views = {view['url_name']: view for view in response.context['views']}
+        self.assertEqual(views['analytics']['requests'], 1)
+        self.assertIsNotNone(views['analytics']['p95_ms'])
+        self.assertTrue(response.context['queries'])
+        self.assertContains(response, 'SELECT')
+
+        self.client.force_login(User.objects.create_user(username='member', password='x'))
+        self.assertEqual(self.client.get(reverse('performance_dashboard')).status_code, 302)
+
+
+class StructuredLoggingTests(TestCase):
+    def make_record(self, level=logging.INFO, **extra):
+        logger = logging.getLogger('site_core.tests.logging')
+        return logger.makeRecord(logger.name, level, __file__, 1, 'Paid %s', ('NGN 100',), None, extra=extra)
+
+    def test_extra_fields_are_rendered_as_text_or_json(self):
+        record = self.make_record(user_id=7, reference='MNFY|1')
+        line = StructuredFormatter().format(record)
+        self.assertIn('INFO site_core.tests.logging: Paid NGN 100 user_id=7 reference=MNFY|1', line)
+
+        entry = json.loads(StructuredFormatter(json=True).format(self.make_record(user_id=7)))
+        self.assertEqual((entry['level'], entry['message'], entry['user_id']), ('INFO', 'Paid NGN 100', 7))
+
+    def test_only_records_with_a_sample_rate_are_sampled(self):
+        sampling = SamplingFilter()
+        self.assertTrue(sampling.filter(self.make_record()))
+        self.assertFalse(sampling.filter(self.make_record(sample_rate=0)))
+        self.assertTrue(sampling.filter(self.make_record(sample_rate=1)))
+        self.assertTrue(sampling.filter(self.make_record(logging.WARNING, sample_rate=0)))
+        self.assertNotIn('sample_rate', StructuredFormatter().format(self.make_record(sample_rate=1)))
+
+
+@override_settings(READ_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Only routing decisions are under test; the 'replica' alias is never connected to"""
+
+    def setUp(self):
+        connections.settings['replica'] = {**connections.settings['default'], 'TEST': {'MIRROR': 'default'}}
+        self.addCleanup(connections.settings.pop, 'replica')
+        self.router = ReplicaRouter()
+        self.routed = []
+
+    def view(self, request):
+        self.routed.append(self.router.db_for_read(Category))
+        if request.GET.get('write'):
+            self.router.db_for_write(Category)
+            self.routed.append(self.router.db_for_read(Category))
+        return HttpResponse()
+
+    def test_reads_use_replicas_only_inside_replica_reads(self):
+        self.assertEqual(self.router.db_for_read(Category), 'default')
+        with replica_reads() as state:
+            self.assertEqual(self.router.db_for_read(Category), 'replica')
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Category), 'default')
+            self.assertEqual(self.router.db_for_write(Category), 'default')
+            self.assertTrue(state.wrote)
+            # Read your own write
+            self.assertEqual(self.router.db_for_read(Category), 'default')
+        with self.settings(READ_REPLICAS=['missing']), replica_reads():
+            self.assertEqual(self.router.db_for_read(Category), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'site_core'))
+        self.assertTrue(self.router.allow_migrate('default', 'site_core'))
+
+    def test_middleware_pins_clients_to_the_primary_after_a_write(self):
+        middleware = ReplicaRoutingMiddleware(self.view)
+        factory = RequestFactory()
+
+        response = middleware(factory.get('/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+        response = middleware(factory.get('/', {'write': '1'}))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        pinned = factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        middleware(pinned)
+        self.assertEqual(self.routed, ['replica', 'default', 'replica', 'default', 'default'])
+
+    @override_settings(READ_REPLICAS=[])
+    def test_middleware_is_skipped_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(self.view)
+
+
+class SqlitePragmaTests(TestCase):
+    def test_new_connections_run_in_wal_mode(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')},
+                                      alias='pragma_test')
+            try:
+                # connection_created runs configure_sqlite
+                wrapper.ensure_connection()
+                with wrapper.cursor() as cursor:
+                    values = {}
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'temp_store'):
+                        cursor.execute(f'PRAGMA {name}')
+                        values[name] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        # synchronous NORMAL is 1, temp_store MEMORY is 2
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'temp_store': 2})
+
+
+def photo(name='photo.jpg', size=(2400, 1600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buffer, 'JPEG', quality=95)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, IMAGE_DERIVATIVES_ENABLED=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        seller = User.objects.create_user(username='seller', password='testpass123')
+        category = Category.objects.create(name='Templates', category_type='product')
+        self.product = Product.objects.create(
+            title='Kit', description='Desc', seller=seller, price=10, category=category,
+            product_file='product_files/p.zip', status='approved', thumbnail=photo(),
+        )
+        self.source = self.product.thumbnail.name
+
+    def test_upload_queues_generation_once(self):
+        queued = BackgroundTask.objects.get(name='site_core.generate_image_derivatives')
+        self.assertEqual(queued.payload, {'source': self.source, 'variants': ['card', 'thumb']})
+        self.product.title = 'Renamed'
+        self.product.save()
+        Product.objects.get(pk=self.product.pk).save()
+        self.assertEqual(BackgroundTask.objects.filter(name='site_core.generate_image_derivatives').count(), 1)
+
+        run_pending()
+        card = images.get_derivatives(self.source, 'card')
+        self.assertEqual((card['webp'][1], card['webp'][2]), (768, 384))
+        self.assertTrue(card['fallback'][0].endswith('.jpg'))
+        self.assertEqual(ImageDerivative.objects.filter(source=self.source).count(), 4)
+
+    def test_names_follow_content(self):
+        rows = images.generate(self.source, ['thumb'])
+        for row in rows:
+            self.assertTrue(default_storage.exists(row.name))
+            self.assertEqual((row.width, row.height), (96, 96))
+        with default_storage.open(rows[0].name) as handle:
+            self.assertEqual(Image.open(handle).format, 'WEBP')
+        # Regenerating the same image reuses the same files
+        self.assertEqual([row.name for row in images.generate(self.source, ['thumb'])], [row.name for row in rows])
+
+    def test_lazy_url_generates_and_redirects(self):
+        urls = images.variant_urls(self.source, 'card')
+        self.assertIn('/images/', urls['webp'])
+        response = self.client.get(urls['webp'])
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].endswith('.webp'))
+
+        served = self.client.get(response['Location'])
+        self.assertEqual(served.status_code, 200)
+        self.assertIn('immutable', served['Cache-Control'])
+        self.assertEqual(b''.join(served.streaming_content)[:4], b'RIFF')
+        # Now generated, the page links to the file itself
+        self.assertEqual(images.variant_urls(self.source, 'card')['webp'], response['Location'])
+
+    def test_lazy_url_rejects_tampered_and_foreign_tokens(self):
+        token = images.lazy_url(self.source, 'card', 'webp').split('/')[-2]
+        self.assertEqual(self.client.get(reverse('image_derivative', args=[token[:-2] + 'xx'])).status_code, 404)
+        kyc = images.lazy_url('kyc_documents/passport.jpg', 'card', 'webp')
+        self.assertEqual(self.client.get(kyc).status_code, 404)
+        self.assertEqual(self.client.get('/media/derivatives/../product_files/p.zip').status_code, 404)
+
+    def test_picture_tag(self):
+        images.generate(self.source, ['card'])
+        template = Template("{% load images %}{% picture product.thumbnail 'card' alt=product.title class='w-full' %}")
+        html = template.render(Context({'product': self.product}))
+        card = images.get_derivatives(self.source, 'card')
+        self.assertInHTML(
+            f'<picture><source srcset="{card["webp"][0]}" type="image/webp">'
+            f'<img src="{card["fallback"][0]}" alt="Kit" class="w-full" loading="lazy" decoding="async" '
+            f'width="768" height="384"></picture>', html,
+        )
+        with self.settings(IMAGE_DERIVATIVES_ENABLED=False):
+            html = template.render(Context({'product': self.product}))
+        self.assertNotIn('<picture>', html)
+        self.assertIn(self.product.thumbnail.url, html)
+        self.assertEqual(Template("{% load images %}{% picture field 'card' %}").render(Context({'field': None})), '')
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def test_minify_css_keeps_strings_and_meaningful_spaces(self):
+        css = '/* note */ a , b > c { color : red ; content: "a ,  b" ; }\n/*! licence */\n.x  .y{width:calc(100% - 1px);}'
+        self.assertEqual(minify_css(css),
+                         'a,b>c{color :red;content:"a ,  b"}/*! licence */ .x .y{width:calc(100% - 1px)}')
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, br;q=0'), {'gzip', 'deflate'})
+
+    def test_collectstatic_output_is_served_precompressed(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, DEBUG=False):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            middleware = PrecompressedStaticMiddleware(lambda request: HttpResponse('app'))
+            hashed_url = static_url('css/style.css')
+            self.assertRegex(hashed_url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+            with open(os.path.join(root, 'css', 'style.css'), 'rb') as handle:
+                original = handle.read()
+            # The name is hashed from the minified bytes it serves
+            self.assertIn(hashlib.md5(original).hexdigest()[:12], hashed_url)
+            with open(finders.find('css/style.css'), 'rb') as handle:
+                self.assertEqual(original, minify('css/style.css', handle.read()))
+
+            factory = RequestFactory()
+            response = middleware(factory.get(hashed_url, HTTP_ACCEPT_ENCODING='gzip, deflate'))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            compressed = b''.join(response.streaming_content)
+            self.assertLess(len(compressed), len(original) / 2)
+            self.assertEqual(gzip.decompress(compressed), original)
+
+            plain = middleware(factory.get(hashed_url))
+            self.assertNotIn('Content-Encoding', plain)
+            self.assertEqual(b''.join(plain.streaming_content), original)
+            etag = response['ETag']
+            self.assertEqual(
+                middleware(factory.get(hashed_url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)).status_code,
+                304,
+            )
+            self.assertEqual(middleware(factory.get('/static/css/style.css'))['Cache-Control'], 'public, max-age=60')
+            self.assertEqual(middleware(factory.get('/static/missing.css')).content, b'app')
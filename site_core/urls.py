@@ -17,6 +17,7 @@ urlpatterns = [
     
     # Financial Management
     path('financial/', views.financial_management, name='financial_management'),
+    path('financial/export/', views.export_transactions, name='export_transactions'),
     path('transactions/<int:transaction_id>/<str:action>/', views.process_transaction, name='process_transaction'),
     path('notifications/toggle/<int:notification_id>/', views.toggle_notification, name='toggle_notification'),
     path('notifications/delete/<int:notification_id>/', views.delete_notification, name='delete_notification'),
@@ -26,6 +27,7 @@ urlpatterns = [
     
     # Analytics
     path('analytics/', views.analytics_dashboard, name='analytics'),
+    path('performance/', views.performance_dashboard, name='performance_dashboard'),
     
     # Notifications
     path('notifications/', views.notification_management, name='notification_management'),
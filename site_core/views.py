@@ -14,13 +14,18 @@ from accounts.models import User, UserProfile
 from payments.models import Transaction
 from affiliates.models import Referral, AffiliateSale
 from .models import SiteSetting, Category, AdminNotification
+from .analytics import get_period_summary
+from .perf import metric_buffer, view_summary, worst_queries
+from .pagination import CURSOR_PARAM, KeysetPaginator
 from .forms import SiteSettingForm, CategoryForm, AdminNotificationForm
-from payments.monnify_service import MonnifyService
+from accounts.tasks import queue_kyc_provisioning
 from django.db import transaction
-from accounts.models import KYCVerification, VirtualAccount, User
-from .models import MonnifyBank
+from accounts.models import KYCVerification, User
 from payments.models import PaymentMethod, ManualDeposit
 from payments.forms import PaymentMethodForm
+from transactions.exports import ADMIN_COLUMNS, export_response, filter_transactions
+from transactions.forms import TransactionFilterForm
+from django.http import HttpResponseBadRequest
 
 
 
@@ -113,18 +118,20 @@ def toggle_payment_method(request, method_id):
 
 @staff_member_required
 def admin_dashboard(request):
-    # Basic Statistics
+    # Basic Statistics and pending approvals, one query per model
     total_users = User.objects.count()
-    total_jobs = Job.objects.count()
-    total_courses = Course.objects.count()
-    total_products = Product.objects.count()
-    total_blog_posts = BlogPost.objects.count()
-    
-    # Pending approvals
-    pending_jobs = Job.objects.filter(status='pending').count()
-    pending_courses = Course.objects.filter(status='pending').count()
-    pending_products = Product.objects.filter(status='pending').count()
-    pending_blog_posts = BlogPost.objects.filter(status='pending').count()
+    content_counts = {
+        name: model.objects.aggregate(total=Count('id'), pending=Count('id', filter=Q(status='pending')))
+        for name, model in (('jobs', Job), ('courses', Course), ('products', Product), ('blog_posts', BlogPost))
+    }
+    total_jobs = content_counts['jobs']['total']
+    total_courses = content_counts['courses']['total']
+    total_products = content_counts['products']['total']
+    total_blog_posts = content_counts['blog_posts']['total']
+    pending_jobs = content_counts['jobs']['pending']
+    pending_courses = content_counts['courses']['pending']
+    pending_products = content_counts['products']['pending']
+    pending_blog_posts = content_counts['blog_posts']['pending']
     
     # KYC Statistics
     kyc_stats = KYCVerification.objects.aggregate(
@@ -148,13 +155,7 @@ def admin_dashboard(request):
     # Top Performers (Last 7 days)
     week_ago = timezone.now() - timedelta(days=7)
     
-    top_earners = Transaction.objects.filter(
-        status='completed',
-        created_at__gte=week_ago,
-        transaction_type__in=['sale', 'commission']
-    ).values('user__username').annotate(
-        total_earned=Sum('amount')
-    ).order_by('-total_earned')[:5]
+    top_earners = get_period_summary(7)['top_earners'][:5]
     
     top_referrers = Referral.objects.filter(
         joined_at__gte=week_ago
@@ -234,44 +235,9 @@ def kyc_detail(request, kyc_id):
         action = request.POST.get('action')
         
         if action == 'approve' and kyc.status == 'pending':
-            # --- VIRTUAL ACCOUNT CREATION LOGIC ---
-            monnify_service = MonnifyService()
-            kyc_data = {
-                'legal_first_name': kyc.legal_first_name,
-                'legal_last_name': kyc.legal_last_name,
-            }
-            
-            # Use all active banks if user has no preference, otherwise use their preferences
-            preferred_banks = list(kyc.user.bank_preferences.filter(is_active=True).values_list('bank__bank_code', flat=True))
-            if not preferred_banks:
-                 preferred_banks = list(MonnifyBank.objects.filter(is_active=True).values_list('bank_code', flat=True))
-
-
-            account_data, error = monnify_service.create_reserved_account(kyc.user, kyc_data, preferred_banks)
-
-            if account_data and account_data.get('accounts'):
-                # Delete old accounts if any, to prevent duplicates on re-approval
-                VirtualAccount.objects.filter(user=kyc.user).delete()
-
-                for account in account_data['accounts']:
-                    VirtualAccount.objects.create(
-                        user=kyc.user,
-                        account_number=account['accountNumber'], # 823]
-                        account_name=account['accountName'], # 823]
-                        bank_name=account['bankName'], # 823]
-                        bank_code=account['bankCode'], # 824]
-                        reference=account_data['accountReference'] # 824]
-                    )
-                
-                kyc.status = 'approved' # 825]
-                kyc.rejection_reason = '' # Clear any previous rejection reason
-                kyc.monnify_customer_reference = account_data.get('customerReference', '') # 825]
-                kyc.reviewed_at = timezone.now() # 825]
-                kyc.reviewed_by = request.user # 825]
-                kyc.save()
-                messages.success(request, f"KYC for {kyc.user.username} has been approved and virtual accounts have been created.")
-            else:
-                messages.error(request, f"Failed to create virtual accounts for {kyc.user.username}: {error}")
+            # Monnify is called by a background worker; the KYC turns approved once the accounts exist
+            queue_kyc_provisioning(kyc, request.user.pk)
+            messages.success(request, f"KYC for {kyc.user.username} is being approved; virtual accounts are being created.")
 
         elif action == 'reject' and kyc.status == 'pending':
             reason = request.POST.get('rejection_reason', 'No reason provided.')
@@ -312,9 +278,7 @@ def user_management(request):
     elif status == 'inactive':
         users = users.filter(is_active=False)
     
-    paginator = Paginator(users, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = KeysetPaginator(users, 20, field='date_joined').get_page(request.GET.get(CURSOR_PARAM))
     
     context = {
         'page_obj': page_obj,
@@ -425,6 +389,18 @@ def financial_management(request):
     }
     return render(request, 'admin_panel/financial_management.html', context)
 
+@staff_member_required
+def export_transactions(request):
+    """Stream all transactions (optionally one user's) as CSV or JSONL with the list filters"""
+    form = TransactionFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest('Invalid filters')
+    transactions = filter_transactions(Transaction.objects.all(), form.cleaned_data)
+    username = request.GET.get('user', '').strip()
+    if username:
+        transactions = transactions.filter(user__username=username)
+    return export_response(transactions, request.GET.get('format', 'csv'), 'all-transactions', ADMIN_COLUMNS)
+
 @staff_member_required
 def process_transaction(request, transaction_id, action):
     transaction = get_object_or_404(Transaction, id=transaction_id)
@@ -444,53 +420,44 @@ def process_transaction(request, transaction_id, action):
 def analytics_dashboard(request):
     # Time period filter
     period = request.GET.get('period', '7')
-    days = int(period)
-    start_date = timezone.now() - timedelta(days=days)
-    
-    # User analytics
-    new_users = User.objects.filter(date_joined__gte=start_date).count()
-    active_users = User.objects.filter(last_login__gte=start_date).count()
-    
-    # Content analytics
-    new_jobs = Job.objects.filter(created_at__gte=start_date).count()
-    new_courses = Course.objects.filter(created_at__gte=start_date).count()
-    new_products = Product.objects.filter(created_at__gte=start_date).count()
-    new_posts = BlogPost.objects.filter(created_at__gte=start_date).count()
-    
-    # Top performers
-    top_earners = Transaction.objects.filter(
-        status='completed',
-        created_at__gte=start_date,
-        transaction_type__in=['sale', 'commission']
-    ).values('user__username', 'user__profile__country').annotate(
-        total_earned=Sum('amount')
-    ).order_by('-total_earned')[:10]
-    
-    top_posters = User.objects.annotate(
-        job_count=Count('posted_jobs', filter=Q(posted_jobs__created_at__gte=start_date)),
-        course_count=Count('courses_taught', filter=Q(courses_taught__created_at__gte=start_date)),
-        product_count=Count('products', filter=Q(products__created_at__gte=start_date)),
-        post_count=Count('blog_posts', filter=Q(blog_posts__created_at__gte=start_date)),
-        total_content=Count('posted_jobs', filter=Q(posted_jobs__created_at__gte=start_date)) +
-                     Count('courses_taught', filter=Q(courses_taught__created_at__gte=start_date)) +
-                     Count('products', filter=Q(products__created_at__gte=start_date)) +
-                     Count('blog_posts', filter=Q(blog_posts__created_at__gte=start_date))
-    ).filter(total_content__gt=0).order_by('-total_content')[:10]
-    
+    days = int(period) if period.isdigit() and int(period) > 0 else 7
+
+    # Served from the daily rollups (see site_core.analytics / rollup_metrics)
+    summary = get_period_summary(days)
+    totals = summary['totals']
+
     context = {
         'period': period,
-        'new_users': new_users,
-        'active_users': active_users,
-        'new_jobs': new_jobs,
-        'new_courses': new_courses,
-        'new_products': new_products,
-        'new_posts': new_posts,
-        'top_earners': top_earners,
-        'top_posters': top_posters,
+        'total_users': User.objects.count(),
+        'new_users': totals['signups'],
+        'active_users': totals['active_users'],
+        'new_jobs': totals['jobs'],
+        'new_courses': totals['courses'],
+        'new_products': totals['products'],
+        'new_posts': totals['posts'],
+        'top_earners': summary['top_earners'],
+        'top_posters': summary['top_posters'],
+        'metrics_updated_at': summary['updated_at'],
     }
     return render(request, 'admin_panel/analytics.html', context)
 
 
+PERFORMANCE_WINDOWS = {'1': 1, '6': 6, '24': 24, '168': 168}  # ?hours= choices
+
+
+@staff_member_required
+def performance_dashboard(request):
+    hours = PERFORMANCE_WINDOWS.get(request.GET.get('hours'), 24)
+    # Include this process's unflushed requests; other workers flush on their own schedule
+    metric_buffer.flush()
+    context = {
+        'hours': str(hours),
+        'views': view_summary(hours),
+        'queries': worst_queries(hours),
+    }
+    return render(request, 'admin_panel/performance.html', context)
+
+
 from django.views.decorators.http import require_POST
 
 @staff_member_required
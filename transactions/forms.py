@@ -7,6 +7,7 @@ class TransactionFilterForm(forms.Form):
         ('add_money', 'Add Money'),
         ('withdraw', 'Withdraw'),
         ('transfer', 'Transfer'),
+        ('transfer_in', 'Transfer Received'),
         ('sale', 'Sale'),
         ('commission', 'Commission'),
     ]
@@ -0,0 +1,114 @@
+import csv
+import io
+import resource
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from payments.models import Transaction
+from transactions.exports import ADMIN_COLUMNS, export_response
+
+
+class PeakRSS:
+    """Samples resident memory in a background thread (Linux /proc, else ru_maxrss)"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.baseline = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the streaming transaction export on seeded rows (rolled back afterwards), '
+        'recording throughput and peak RSS, against building the whole file in memory'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--naive-rows', type=int, default=100000,
+                            help='Rows for the in-memory comparison (0 to skip)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create(username=f'export-bench-{time.time_ns()}')
+            started = time.perf_counter()
+            self.seed(user, options['rows'])
+            self.stdout.write(f"seeded {options['rows']} rows in {time.perf_counter() - started:.1f}s")
+
+            queryset = Transaction.objects.filter(user=user)
+            for export_format in ('csv', 'jsonl'):
+                self.measure(f'streaming {export_format}', lambda: self.stream(queryset, export_format))
+            if options['naive_rows']:
+                naive = Transaction.objects.filter(pk__in=queryset.order_by('pk').values('pk')[:options['naive_rows']])
+                self.measure('in-memory csv', lambda: self.in_memory(naive))
+            transaction.set_rollback(True)
+
+    def seed(self, user, rows):
+        stamp = time.time_ns()
+        for start in range(0, rows, 10000):
+            Transaction.objects.bulk_create([
+                Transaction(user=user, transaction_type='sale', amount=Decimal(n % 50000) / 100, status='completed',
+                            reference=f'EXP{stamp}-{n}', description=f'Sale of product #{n % 997}')
+                for n in range(start, min(start + 10000, rows))
+            ])
+
+    def stream(self, queryset, export_format):
+        response = export_response(queryset, export_format, 'bench', ADMIN_COLUMNS)
+        rows = size = 0
+        for chunk in response.streaming_content:
+            rows += chunk.count(b'\n')
+            size += len(chunk)
+        return rows - (export_format == 'csv'), size
+
+    def in_memory(self, queryset):
+        """What a naive export does: load every instance, build the file, then send it"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for txn in list(queryset.select_related('user', 'payment_method')):
+            writer.writerow([txn.user.username, txn.reference, txn.created_at.isoformat(), txn.transaction_type,
+                             txn.status, txn.amount, txn.currency, txn.payment_method, txn.description,
+                             txn.completed_at])
+        body = buffer.getvalue().encode()
+        return len(list(queryset.values('pk'))), len(body)
+
+    def measure(self, name, func):
+        with PeakRSS() as rss:
+            started = time.perf_counter()
+            rows, size = func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:<16} {rows:>9} rows  {elapsed:6.1f}s  {rows / elapsed:9.0f} rows/s  '
+            f'{size / elapsed / 2**20:6.1f} MiB/s  peak RSS +{(rss.peak - rss.baseline) / 2**20:7.1f} MiB'
+        )
@@ -0,0 +1,63 @@
+import contextlib
+import os
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from transactions.models import Notification
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the notifications page for a user with many notifications (rolled back afterwards), "
+        "with and without the debug print loop it used to run before paginating"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notifications', type=int, default=50000)
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create(username=f'notify-bench-{time.time_ns()}')
+            self.seed(user, options['notifications'])
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)
+            url = reverse('notifications_list')
+
+            for name, before in (('with print loop', self.print_loop), ('current', None)):
+                timings = []
+                for _ in range(options['runs']):
+                    started = time.perf_counter()
+                    if before:
+                        before(user)
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    assert response.status_code == 200
+                self.stdout.write(
+                    f"{name:<16} {options['notifications']:>7} notifications  "
+                    f"median {statistics.median(timings):8.1f} ms  max {max(timings):8.1f} ms"
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, user, count):
+        for start in range(0, count, 5000):
+            Notification.objects.bulk_create([
+                Notification(user=user, notification_type='transaction', title=f'Payment #{n}',
+                             message='You received a payment', is_read=n % 3 == 0)
+                for n in range(start, min(start + 5000, count))
+            ])
+
+    def print_loop(self, user):
+        """The debug block notifications_list ran on every request, printing to /dev/null (its cheapest case)"""
+        notifications = Notification.objects.filter(user=user)
+        with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+            print(f"Total notifications: {notifications.count()}")
+            for notification in notifications:
+                print(f"Notification: {notification.title} - Read: {notification.is_read}")
+            print(f"Unread count: {notifications.filter(is_read=False).count()}")
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.models import Transaction
+from transactions.exports import ADMIN_COLUMNS, CHUNK_SIZE, EXPORT_FORMATS, filter_transactions, iter_export
+from transactions.forms import TransactionFilterForm
+
+
+class Command(BaseCommand):
+    help = 'Stream transactions to a CSV or JSONL file with the same filters as the transactions page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--user', help='Only this username')
+        parser.add_argument('--type', dest='transaction_type', default='')
+        parser.add_argument('--status', default='')
+        parser.add_argument('--start-date', default='', help='YYYY-MM-DD')
+        parser.add_argument('--end-date', default='', help='YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        form = TransactionFilterForm({
+            'transaction_type': options['transaction_type'],
+            'status': options['status'],
+            'start_date': options['start_date'],
+            'end_date': options['end_date'],
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        transactions = filter_transactions(Transaction.objects.all(), form.cleaned_data)
+        if options['user']:
+            transactions = transactions.filter(user__username=options['user'])
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else None
+        write = output.write if output else lambda line: self.stdout.write(line, ending='')
+        rows = -1 if options['format'] == 'csv' else 0  # don't count the CSV header
+        try:
+            for line in iter_export(transactions, options['format'], ADMIN_COLUMNS, options['chunk_size']):
+                write(line)
+                rows += 1
+        finally:
+            if output:
+                output.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Exported {rows} transactions to {options['output']}"))
@@ -1,3 +1,79 @@
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from payments.models import Transaction
+from transactions.models import Notification
+
+User = get_user_model()
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        for transaction_type, amount in (('add_money', '100'), ('sale', '40'), ('sale', '15')):
+            Transaction.objects.create(
+                user=self.user, transaction_type=transaction_type, amount=Decimal(amount), status='completed',
+                description='Line with, a comma'
+            )
+        Transaction.objects.create(user=other, transaction_type='sale', amount=Decimal('9'), status='completed',
+                                   description='Not mine')
+        self.client.force_login(self.user)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_streams_only_own_filtered_rows(self):
+        response = self.client.get(reverse('transactions_export'), {'transaction_type': 'sale'})
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = self.read(response).strip().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['reference', 'created_at', 'type'])
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all('"Line with, a comma"' in line for line in lines[1:]))
+
+    def test_jsonl_export(self):
+        response = self.client.get(reverse('transactions_export'), {'format': 'jsonl'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['amount'] for row in rows], ['100.00', '40.00', '15.00'])
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get(reverse('transactions_export'), {'start_date': 'not-a-date'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_management_command_exports_all_users(self):
+        out = StringIO()
+        call_command('export_transactions', '--format', 'jsonl', '--type', 'sale', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted(row['user'] for row in rows), ['exporter', 'exporter', 'other'])
+
+
+class NotificationsListTests(TestCase):
+    def test_page_loads_one_page_of_notifications(self):
+        user = User.objects.create_user(username='reader', password='testpass123')
+        Notification.objects.bulk_create([
+            Notification(user=user, notification_type='system', title=f'Note {n}', message='Hi', is_read=n % 2 == 0)
+            for n in range(45)
+        ])
+        self.client.force_login(user)
 
-# Create your tests here.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('notifications_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['unread_count'], 22)
+        self.assertEqual(len(response.context['notifications']), 20)
+        row_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "transactions_notification"' in query['sql'] and '"title"' in query['sql']
+        ]
+        self.assertTrue(row_queries)
+        self.assertTrue(all('LIMIT' in sql for sql in row_queries), row_queries)
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('transactions/', views.transactions_list, name='transactions_list'),
+    path('transactions/export/', views.transactions_export, name='transactions_export'),
     path('transactions/<int:pk>/', views.transaction_detail, name='transaction_detail'),
 
     path('notifications/', views.notifications_list, name='notifications_list'),
@@ -1,12 +1,18 @@
+import logging
+
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.db.models import Q
+from django.http import HttpResponseBadRequest
 from django.shortcuts import render
 from payments.models import Transaction
+from site_core.pagination import CURSOR_PARAM, KeysetPaginator
 from .models import Notification
+from .exports import export_response, filter_transactions
 from .forms import TransactionFilterForm
 from .utils import mask_email
 
+logger = logging.getLogger(__name__)
+
 
 from django.shortcuts import redirect, get_object_or_404
 from django.views.decorators.http import require_POST
@@ -33,23 +39,9 @@ def transactions_list(request):
     
     form = TransactionFilterForm(request.GET)
     if form.is_valid():
-        transaction_type = form.cleaned_data.get('transaction_type')
-        status = form.cleaned_data.get('status')
-        start_date = form.cleaned_data.get('start_date')
-        end_date = form.cleaned_data.get('end_date')
-        
-        if transaction_type:
-            transactions = transactions.filter(transaction_type=transaction_type)
-        if status:
-            transactions = transactions.filter(status=status)
-        if start_date:
-            transactions = transactions.filter(created_at__date__gte=start_date)
-        if end_date:
-            transactions = transactions.filter(created_at__date__lte=end_date)
+        transactions = filter_transactions(transactions, form.cleaned_data)
     
-    paginator = Paginator(transactions, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = KeysetPaginator(transactions, 20).get_page(request.GET.get(CURSOR_PARAM))
     
     context = {
         'page_obj': page_obj,
@@ -58,6 +50,15 @@ def transactions_list(request):
     }
     return render(request, 'transactions/list.html', context)
 
+@login_required
+def transactions_export(request):
+    """Stream the user's transactions as CSV (default) or JSONL, honouring the list filters"""
+    form = TransactionFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest('Invalid filters')
+    transactions = filter_transactions(Transaction.objects.filter(user=request.user), form.cleaned_data)
+    return export_response(transactions, request.GET.get('format', 'csv'), 'transactions')
+
 @login_required
 def transaction_detail(request, pk):
     transaction = Transaction.objects.filter(user=request.user, pk=pk).first()
@@ -73,18 +74,10 @@ def transaction_detail(request, pk):
 @login_required
 def notifications_list(request):
     notifications = Notification.objects.filter(user=request.user)
-    
-    # Debug: Print notification count
-    print(f"Total notifications: {notifications.count()}")
-    for notification in notifications:
-        print(f"Notification: {notification.title} - Read: {notification.is_read}")
-    
     unread_count = notifications.filter(is_read=False).count()
-    print(f"Unread count: {unread_count}")
-    
-    paginator = Paginator(notifications, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    logger.debug("Notifications page", extra={'user_id': request.user.pk, 'unread': unread_count, 'sample_rate': 0.01})
+
+    page_obj = KeysetPaginator(notifications, 20).get_page(request.GET.get(CURSOR_PARAM))
     
     context = {
         'page_obj': page_obj,
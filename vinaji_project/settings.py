@@ -36,6 +36,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'site_core.staticfiles.PrecompressedStaticMiddleware',
+    'site_core.middleware.PerformanceMiddleware',
+    'site_core.db.ReplicaRoutingMiddleware',
+    'site_core.middleware.SiteSettingsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,6 +76,115 @@ DATABASES = {
     }
 }
 
+# Point the project at another backend (e.g. PostgreSQL) without editing this file
+if os.environ.get('DATABASE_ENGINE'):
+    DATABASES['default'] = {
+        'ENGINE': os.environ['DATABASE_ENGINE'],
+        'NAME': os.environ.get('DATABASE_NAME', 'vinaji'),
+        'USER': os.environ.get('DATABASE_USER', ''),
+        'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+        'HOST': os.environ.get('DATABASE_HOST', ''),
+        'PORT': os.environ.get('DATABASE_PORT', ''),
+    }
+
+# Every SQLite connection runs these pragmas (site_core.db.configure_sqlite); WAL lets reads proceed
+# while counters, webhooks and sessions write. An alias can override them with its own 'PRAGMAS'.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_KIB', 20000)),  # negative: KiB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 2**20)),  # bytes
+    'temp_store': 'MEMORY',
+}
+
+# Read replicas: comma-separated replica database NAMEs (SQLite read copies, e.g. LiteFS) or HOSTs
+# (other engines). Reads of GET requests go to them; a client that just wrote is pinned to the primary.
+READ_REPLICAS = []
+for number, replica in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    replica_key = 'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], replica_key: replica.strip(), 'TEST': {'MIRROR': 'default'}}
+    READ_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['site_core.db.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+# Shared cache tier (site settings, counters, ...). Use Redis/Memcached in production
+# so every worker process sees the same entries, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Site search backend; empty picks FTS5 on SQLite builds that have it and the icontains scan elsewhere
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', '')
+
+# Switches off flush timers and empties the counter/metric buffers between tests
+TEST_RUNNER = 'site_core.test_runner.TestRunner'
+
+# View/download counters are buffered per process and flushed in batches
+COUNTER_FLUSH_INTERVAL = int(os.environ.get('COUNTER_FLUSH_INTERVAL', 10))  # seconds
+COUNTER_FLUSH_THRESHOLD = int(os.environ.get('COUNTER_FLUSH_THRESHOLD', 500))  # pending hits
+
+# Platform-wide dashboard leaderboards are shared by all users and recomputed this often
+DASHBOARD_LEADERBOARD_TTL = int(os.environ.get('DASHBOARD_LEADERBOARD_TTL', 300))  # seconds
+
+# ETag validators and anonymous page copies for public listing/detail pages
+HTTP_CACHE_TIMEOUT = int(os.environ.get('HTTP_CACHE_TIMEOUT', 600))  # seconds
+
+# Background task queue (manage.py run_tasks): tasks running at once per queue across all workers,
+# and how long a worker may hold a task before it is presumed dead and the task retried
+TASK_QUEUE_CONCURRENCY = {
+    'monnify': int(os.environ.get('TASK_QUEUE_MONNIFY_CONCURRENCY', 4)),
+    'images': int(os.environ.get('TASK_QUEUE_IMAGES_CONCURRENCY', 2)),  # CPU-bound resizing
+}
+TASK_LOCK_TIMEOUT = int(os.environ.get('TASK_LOCK_TIMEOUT', 600))  # seconds
+TASK_RETRY_DELAY = int(os.environ.get('TASK_RETRY_DELAY', 30))  # seconds, doubled per failed attempt
+
+# Concurrent Monnify calls when approving KYCs in bulk (the Monnify client pools 20 connections)
+KYC_PROVISIONING_WORKERS = int(os.environ.get('KYC_PROVISIONING_WORKERS', 8))
+
+# Active Monnify banks are cached for the bank pickers; saves and syncs drop the copy early
+MONNIFY_BANKS_CACHE_TTL = int(os.environ.get('MONNIFY_BANKS_CACHE_TTL', 3600))  # seconds
+
+# Per-view timings, query/cache/HTTP accounting for site-admin/performance/, buffered per process
+PERF_METRICS_ENABLED = os.environ.get('PERF_METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+PERF_FLUSH_INTERVAL = int(os.environ.get('PERF_FLUSH_INTERVAL', 60))  # seconds
+PERF_FLUSH_THRESHOLD = int(os.environ.get('PERF_FLUSH_THRESHOLD', 1000))  # buffered requests
+
+# Logging: one line per record (LOG_FORMAT=json for JSON objects) with any extra={...} fields.
+# LOG_LEVEL gates everything; LOG_LEVELS overrides it per module, e.g. "payments=DEBUG,site_core.perf=WARNING".
+# Records logged with extra={'sample_rate': r} are sampled down to that fraction.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING').upper()
+LOG_LEVELS = dict(
+    item.strip().split('=', 1) for item in os.environ.get('LOG_LEVELS', '').split(',') if '=' in item
+)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {'()': 'site_core.log.SamplingFilter'},
+        'require_debug_false': {'()': 'django.utils.log.RequireDebugFalse'},
+    },
+    'formatters': {
+        'structured': {'()': 'site_core.log.StructuredFormatter', 'json': os.environ.get('LOG_FORMAT') == 'json'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'structured', 'filters': ['sampling']},
+        'mail_admins': {
+            'level': 'ERROR', 'class': 'django.utils.log.AdminEmailHandler', 'filters': ['require_debug_false'],
+        },
+    },
+    'root': {'handlers': ['console'], 'level': LOG_LEVEL},
+    'loggers': {
+        # Propagates to the console handler; replaces Django's default console handler so nothing prints twice
+        'django': {'handlers': ['mail_admins'], 'level': LOG_LEVELS.get('django', LOG_LEVEL)},
+        **{name: {'level': level.strip().upper()} for name, level in LOG_LEVELS.items() if name != 'django'},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -96,13 +209,42 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# collectstatic writes content-hashed, minified copies with .gz/.br siblings (site_core.staticfiles);
+# PrecompressedStaticMiddleware serves them with far-future caching when DEBUG is off
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'site_core.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Purchased product files: signed download links stay valid this long. PROTECTED_DOWNLOADS_SERVER picks who
+# sends the bytes: '' streams them from Django, 'nginx' answers with X-Accel-Redirect to
+# PROTECTED_DOWNLOADS_INTERNAL_URL (an `internal` location aliasing MEDIA_ROOT), 'sendfile' sets X-Sendfile
+PRODUCT_DOWNLOAD_URL_TTL = int(os.environ.get('PRODUCT_DOWNLOAD_URL_TTL', 3600))  # seconds
+PROTECTED_DOWNLOADS_SERVER = os.environ.get('PROTECTED_DOWNLOADS_SERVER', '')
+PROTECTED_DOWNLOADS_INTERNAL_URL = os.environ.get('PROTECTED_DOWNLOADS_INTERNAL_URL', '/protected-media/')
+
+# Resized WebP/JPEG copies of uploaded images (site_core.images); off serves the originals as before
+IMAGE_DERIVATIVES_ENABLED = os.environ.get('IMAGE_DERIVATIVES_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.User'
 
+# Signed-in users (with their profile) are loaded from the cache instead of one query per request.
+# ModelBackend stays listed only so sessions created before the switch keep working until they expire.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))  # seconds
+
+# Sessions are read from the cache and written through to the database. Use a shared CACHE_BACKEND when
+# running several workers; SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies needs no storage at all
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from payments.webhooks import monnify_webhook
+from products.views import protected_media
+from site_core.images import image_derivative, serve_derivative
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -21,6 +23,11 @@ urlpatterns = [
     path('site-admin/', include('site_core.urls')),
     path('api/', include('api.urls')),
     path('webhooks/monnify/', monnify_webhook, name='monnify_webhook'),
+    path('images/<str:token>/', image_derivative, name='image_derivative'),
+    # Normally served by the web server with the same far-future headers; matched before DEBUG's media route
+    path(f"{settings.MEDIA_URL.strip('/')}/derivatives/<path:name>", serve_derivative, name='serve_derivative'),
+    # Purchased files only leave through products' signed download links; the web server must deny this too
+    path(f"{settings.MEDIA_URL.strip('/')}/product_files/<path:name>", protected_media),
     
 
 ]